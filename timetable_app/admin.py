@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import Faculty, Course, Timetable, TimetableStatus
+from .models import Faculty, Course, Timetable, TimetableStatus, SolverJob, ImportJob
 
 admin.site.register(Faculty)
 admin.site.register(Course)
 admin.site.register(Timetable)
 admin.site.register(TimetableStatus)
+admin.site.register(SolverJob)
+admin.site.register(ImportJob)
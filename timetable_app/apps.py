@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class TimetableAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'timetable_app'
+
+    def ready(self):
+        # Keeps the in-memory occupancy index in step with Timetable writes
+        from . import occupancy  # noqa: F401
+        # Drops cached add_timetable boards on course and faculty edits
+        from . import board  # noqa: F401
+        # Rebuilds student and faculty projections when a section is finalized or its rows, classes or courses change
+        from . import projections  # noqa: F401
@@ -0,0 +1,186 @@
+import logging
+
+from django.core.exceptions import ValidationError
+
+from .encoding import EMPTY
+from .validators import validate_timetable_constraints
+
+logger = logging.getLogger(__name__)
+
+
+class NodeLimitReached(Exception):
+    pass
+
+
+class BacktrackingSolver:
+    """Exact search for one section's timetable (an alternative to the GA).
+
+    Every remaining required hour of a course is one variable whose values
+    are (day, slot, class_idx) placements. The search is depth-first with:
+
+    - MRV: the course with the fewest free cells per hour still needed goes next;
+    - forward checking: after each placement the domains of all courses are
+      filtered against it (only the same day can be affected, every rule
+      looks at one day), and a course whose remaining cells cannot hold its
+      hours (main courses never sit in adjacent slots) is a dead end;
+    - conflict-directed backjumping: every pruned value remembers the depth
+      that removed it, so a dead end jumps straight back to the deepest
+      placement responsible instead of the previous one.
+
+    Hours of one course are interchangeable, so they are placed in cell
+    order. ``solve`` returns the grid, or None once it has proved that no
+    timetable exists; it raises NodeLimitReached when the budget runs out.
+    """
+
+    def __init__(self, problem, node_limit=5000):
+        from .ga import can_assign
+
+        self.can_assign = can_assign
+        self.problem = problem
+        self.encoding = encoding = problem.encoding
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.grid = encoding.empty()
+        self.depths = {}  # (day, slot): depth of the placement there
+        self.remaining = {
+            int(course): int(hours)
+            for course, hours in enumerate(encoding.required - encoding.locked_course_counts)
+            if encoding.required[course]
+        }
+        self.domains = {course: set() for course in self.remaining}
+        self.pruned = {course: {} for course in self.remaining}  # value: depth that removed it
+        for day, slot in encoding.free_cells():
+            for course in self.domains:
+                for class_idx in encoding.course_classes[course]:
+                    if can_assign(problem, self.grid, class_idx, day, slot):
+                        self.domains[course].add((day, slot, int(class_idx)))
+
+    def solve(self):
+        if any(hours < 0 for hours in self.remaining.values()):
+            return None  # locked cells already exceed a requirement
+        if self._wiped_out() is not None:
+            return None
+        solved, _ = self._search(0)
+        return self.grid if solved else None
+
+    def _cells(self, course):
+        return {(day, slot) for day, slot, _ in self.domains[course]}
+
+    def _capacity(self, course):
+        """Most hours the course can still get: one per free cell, never two adjacent for a main course."""
+        cells = sorted(self._cells(course))
+        if not self.encoding.main_course_mask[course]:
+            return len(cells)
+        capacity, last = 0, None
+        for day, slot in cells:
+            # Leftmost-first is optimal on a line of slots
+            if last != (day, slot - 1):
+                capacity += 1
+                last = (day, slot)
+        return capacity
+
+    def _culprits(self, course):
+        return set(self.pruned[course].values())
+
+    def _wiped_out(self):
+        """Depths to blame if some hours can no longer be placed, else None."""
+        open_courses = [course for course, hours in self.remaining.items() if hours]
+        for course in open_courses:
+            if self._capacity(course) < self.remaining[course]:
+                return self._culprits(course)
+        # One class per cell, so all remaining hours together need as many distinct cells
+        cells = set().union(*(self._cells(course) for course in open_courses)) if open_courses else set()
+        if len(cells) < sum(self.remaining[course] for course in open_courses):
+            return set().union(*(self._culprits(course) for course in open_courses))
+        return None
+
+    def _choose(self):
+        """MRV: the open course with the least slack between capacity and hours needed."""
+        open_courses = [course for course, hours in self.remaining.items() if hours]
+        if not open_courses:
+            return None
+        return min(open_courses, key=lambda course: (self._capacity(course) - self.remaining[course], course))
+
+    def _day_depths(self, day):
+        return {depth for (d, _), depth in self.depths.items() if d == day}
+
+    def _consistent(self, day):
+        """Re-check every placed gene of ``day``; some rules are not symmetric in the order of placement."""
+        p, encoding = self.problem, self.encoding
+        overlay = encoding.overlay(self.grid)
+        genes = [(d, s, main_id) for d, s, main_id, _ in encoding.locked_genes if d == day]
+        genes += [(day, slot + 1, encoding.main_ids[class_idx]) for slot, class_idx in enumerate(self.grid[day - 1]) if class_idx]
+        for d, s, main_id in genes:
+            try:
+                validate_timetable_constraints(main_id, d, s, p.current_year, p.current_semester, p.section, p.dept, p.timetable_cache, overlay)
+            except ValidationError:
+                return False
+        return True
+
+    def _place(self, depth, course, value):
+        day, slot, class_idx = value
+        self.grid[day - 1, slot - 1] = class_idx
+        self.depths[(day, slot)] = depth
+        self.remaining[course] -= 1
+        if not self._consistent(day):
+            return False
+        order = (day, slot)
+        for other, domain in self.domains.items():
+            for candidate in list(domain):
+                d, s, idx = candidate
+                if other == course and (d, s) <= order:
+                    pass  # hours of one course are placed in cell order
+                elif d != day:
+                    continue
+                elif (d, s) != order and self.can_assign(self.problem, self.grid, idx, d, s):
+                    continue
+                domain.discard(candidate)
+                self.pruned[other][candidate] = depth
+        return True
+
+    def _unplace(self, depth, course, value):
+        day, slot, _ = value
+        self.grid[day - 1, slot - 1] = EMPTY
+        del self.depths[(day, slot)]
+        self.remaining[course] += 1
+        for other, pruned in self.pruned.items():
+            for candidate in [c for c, d in pruned.items() if d == depth]:
+                del pruned[candidate]
+                self.domains[other].add(candidate)
+
+    def _search(self, depth):
+        """(solved, conflict set): the depths whose placements caused a failure below this one."""
+        course = self._choose()
+        if course is None:
+            return True, set()
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise NodeLimitReached(f"Backtracking gave up after {self.node_limit} nodes")
+
+        conflict = self._culprits(course)
+        for value in sorted(self.domains[course]):
+            if self._place(depth, course, value):
+                blamed = self._wiped_out()
+                if blamed is None:
+                    solved, blamed = self._search(depth + 1)
+                    if solved:
+                        return True, set()
+            else:
+                blamed = self._day_depths(value[0]) | {depth}
+            self._unplace(depth, course, value)
+            if depth not in blamed:
+                return False, blamed  # this placement is not to blame: jump further back
+            conflict |= blamed - {depth}
+        return False, conflict
+
+
+def solve_exact(problem, node_limit=5000):
+    """Run the backtracking engine on ``problem``.
+
+    Returns the solved grid, None if no timetable exists, and raises
+    NodeLimitReached when the node budget is used up first.
+    """
+    solver = BacktrackingSolver(problem, node_limit)
+    grid = solver.solve()
+    logger.info(f"Backtracking {'solved' if grid is not None else 'proved infeasible'} {problem.dept}-{problem.section} in {solver.nodes} nodes")
+    return grid
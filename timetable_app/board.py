@@ -0,0 +1,99 @@
+import logging
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Timetable, Class, Course, Faculty
+from .occupancy import version_name as occupancy_version_name
+from . import versions
+
+logger = logging.getLogger(__name__)
+
+# Course and faculty edits change names and hours on every board
+MASTER_VERSION = 'master'
+
+BoardClass = namedtuple('BoardClass', ['main_id', 'course_name', 'course_type', 'hours_per_week', 'venue', 'faculty'])
+BoardEntry = namedtuple('BoardEntry', ['main_id', 'course', 'venue'])
+# grid: {day: {slot: [BoardEntry, ...]}}; required / assigned: course name -> slots
+Board = namedtuple('Board', ['classes', 'grid', 'days', 'slots', 'tt_courses', 'dept_courses', 'assigned', 'current_course'])
+
+
+def next_course(tt_courses, dept_courses, assigned):
+    """The first course, TT courses before department ones, with slots still to assign."""
+    for course, required in list(tt_courses.items()) + list(dept_courses.items()):
+        if assigned.get(course, 0) < required:
+            return course
+    return None
+
+
+def build_board(academic_year, semester, section, dept):
+    """The add_timetable board of a section, in three queries: classes, their faculty, their rows."""
+    classes = list(
+        Class.objects.filter(academic_year=academic_year, semester=semester).filter(
+            Q(section_id=section) | Q(section_id__isnull=True) | Q(section_id=""),
+            Q(dept=dept) | Q(dept__isnull=True) | Q(dept=""),
+        ).select_related('course').prefetch_related('faculty').order_by('main_id')
+    )
+
+    tt_courses, dept_courses = {}, {}
+    for c in classes:
+        if c.course.course_type == 'tt':
+            tt_courses[c.course.name] = c.course.hours_per_week
+        elif c.course.course_type == 'dept':
+            dept_courses[c.course.name] = c.course.hours_per_week
+    if 'ITT' in dept_courses:
+        dept_courses = {'ITT': dept_courses.pop('ITT'), **dept_courses}
+
+    by_id = {c.main_id: c for c in classes}
+    grid, assigned = {}, {}
+    for main_id, day, slot in Timetable.objects.filter(main_id__in=list(by_id)).values_list('main_id', 'day', 'slot').order_by('id'):
+        c = by_id[main_id]
+        grid.setdefault(day, {}).setdefault(slot, []).append(BoardEntry(main_id, str(c.course), c.venue))
+        assigned[c.course.name] = assigned.get(c.course.name, 0) + 1
+
+    return Board(
+        classes=[
+            BoardClass(c.main_id, c.course.name, c.course.course_type, c.course.hours_per_week, c.venue, tuple(str(f) for f in c.faculty.all()))
+            for c in classes
+        ],
+        grid=grid,
+        days=sorted(grid),
+        slots=sorted({slot for cells in grid.values() for slot in cells}),
+        tt_courses=tt_courses,
+        dept_courses=dept_courses,
+        assigned=assigned,
+        current_course=next_course(tt_courses, dept_courses, assigned),
+    )
+
+
+def section_board(academic_year, semester, section, dept):
+    """The section's board from the cache, rebuilt when the year's rows or classes, or any course or faculty, changed.
+
+    The key carries the year's occupancy token and the master data token,
+    read from the database in one query; writers replace them in their own
+    transaction, so no process reads a board older than the last commit.
+    """
+    occupancy_token, master_token = versions.tokens(occupancy_version_name(academic_year), MASTER_VERSION)
+    key = f"board:{academic_year}:{semester}:{section}:{dept}:{occupancy_token}:{master_token}"
+    board = cache.get(key)
+    if board is None:
+        board = build_board(academic_year, semester, section, dept)
+        cache.set(key, board)
+    return board
+
+
+def master_data_changed():
+    """Drop every cached board; for bulk writes to Course or Faculty, which send no signals."""
+    versions.bump(MASTER_VERSION)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+def master_data_saved(sender, raw=False, **kwargs):
+    if not raw:
+        master_data_changed()
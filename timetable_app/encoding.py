@@ -0,0 +1,135 @@
+import numpy as np
+
+# Grid shape: 6 days x 8 slots, cell value is a class index (0 = empty)
+DAY_COUNT = 6
+SLOT_COUNT = 8
+EMPTY = 0
+
+
+class GridOverlay:
+    """temp_timetable view of one grid plus the locked cells.
+
+    Answers the ``.get((day, slot), default)`` lookups the validators make
+    straight from the grid, so operators never rebuild a dict of Class
+    instances. It reads the grid live, so in-place edits are visible.
+    """
+    __slots__ = ('grid', 'encoding')
+
+    def __init__(self, grid, encoding):
+        self.grid = grid
+        self.encoding = encoding
+
+    def get(self, key, default=()):
+        day, slot = key
+        if not (1 <= day <= DAY_COUNT and 1 <= slot <= SLOT_COUNT):
+            return default
+        locked = self.encoding.locked_main_ids.get(key, [])
+        class_idx = self.grid[day - 1, slot - 1]
+        if class_idx:
+            return locked + [self.encoding.main_ids[class_idx]]
+        return locked or default
+
+
+class TimetableEncoding:
+    """Small-int encoding of one solve.
+
+    Classes are numbered 1..n (0 marks an empty cell) and course names are
+    interned to 0..m-1, so an individual is a single 6x8 array and a
+    population of hundreds takes a few KB. Locked cells may hold several
+    classes; they are the same for every individual and are kept here
+    instead of in the grids.
+    """
+
+    def __init__(self, classes, requirements, locked_assignments):
+        # classes: iterable of (main_id, course_name, course_type)
+        classes = sorted(classes)
+        self.main_ids = [None] + [main_id for main_id, _, _ in classes]
+        self.class_index = {main_id: idx for idx, main_id in enumerate(self.main_ids) if idx}
+        self.course_names = sorted({name for _, name, _ in classes} | set(requirements))
+        self.course_index = {name: idx for idx, name in enumerate(self.course_names)}
+        self.dtype = np.uint8 if len(self.main_ids) <= 256 else np.uint16
+
+        self.class_course = np.array([-1] + [self.course_index[name] for _, name, _ in classes], dtype=np.int16)
+        self.main_course_mask = np.zeros(len(self.course_names), dtype=bool)
+        for _, name, course_type in classes:
+            if course_type == 'none':
+                self.main_course_mask[self.course_index[name]] = True
+        self.required = np.zeros(len(self.course_names), dtype=np.int16)
+        for name, hours in requirements.items():
+            self.required[self.course_index[name]] = hours
+        self.course_classes = [
+            np.flatnonzero(self.class_course == course) for course in range(len(self.course_names))
+        ]
+
+        self.locked_main_ids = {}
+        self.locked_courses = {}
+        self.locked_genes = []
+        self.locked_mask = np.zeros((DAY_COUNT, SLOT_COUNT), dtype=bool)
+        self.locked_day_counts = np.zeros((DAY_COUNT, len(self.course_names)), dtype=np.int16)
+        for (day, slot), assignments in locked_assignments.items():
+            for main_id, course_name in assignments:
+                if main_id not in self.class_index:
+                    continue
+                course = self.course_index[course_name]
+                self.locked_main_ids.setdefault((day, slot), []).append(main_id)
+                self.locked_courses.setdefault((day, slot), set()).add(course)
+                self.locked_genes.append((day, slot, main_id, course_name))
+                self.locked_mask[day - 1, slot - 1] = True
+                self.locked_day_counts[day - 1, course] += 1
+        self.locked_course_counts = self.locked_day_counts.sum(axis=0)
+
+    def empty(self):
+        return np.zeros((DAY_COUNT, SLOT_COUNT), dtype=self.dtype)
+
+    def encode(self, genes):
+        """Grid from (day, slot, main_id, course_name) genes; locked cells are skipped."""
+        grid = self.empty()
+        for day, slot, main_id, _ in genes:
+            if not self.locked_mask[day - 1, slot - 1] and main_id in self.class_index:
+                grid[day - 1, slot - 1] = self.class_index[main_id]
+        return grid
+
+    def genes(self, grid):
+        """Locked genes followed by the grid's genes, as (day, slot, main_id, course_name)."""
+        genes = list(self.locked_genes)
+        for d, s in zip(*np.nonzero(grid)):
+            class_idx = grid[d, s]
+            genes.append((int(d) + 1, int(s) + 1, self.main_ids[class_idx], self.course_names[self.class_course[class_idx]]))
+        return genes
+
+    def overlay(self, grid):
+        return GridOverlay(grid, self)
+
+    def free_cells(self, grid=None):
+        """Unlocked (day, slot) cells, or only the empty ones of ``grid``."""
+        free = ~self.locked_mask if grid is None else (~self.locked_mask) & (grid == EMPTY)
+        return [(int(d) + 1, int(s) + 1) for d, s in zip(*np.nonzero(free))]
+
+    def assigned_cells(self, grid):
+        return [(int(d) + 1, int(s) + 1) for d, s in zip(*np.nonzero(grid))]
+
+    def course_counts(self, grid):
+        """Slots per course (locked included), indexed by course."""
+        assigned = self.class_course[grid[grid != EMPTY]]
+        return self.locked_course_counts + np.bincount(assigned, minlength=len(self.course_names)).astype(np.int16)
+
+    def day_course_counts(self, grid):
+        """Slots per (day, course) (locked included)."""
+        counts = self.locked_day_counts.copy()
+        for d, s in zip(*np.nonzero(grid)):
+            counts[d, self.class_course[grid[d, s]]] += 1
+        return counts
+
+    def courses_at(self, grid, day, slot):
+        """Course indices placed at (day, slot); empty outside the grid."""
+        if not (1 <= day <= DAY_COUNT and 1 <= slot <= SLOT_COUNT):
+            return set()
+        courses = set(self.locked_courses.get((day, slot), ()))
+        class_idx = grid[day - 1, slot - 1]
+        if class_idx:
+            courses.add(int(self.class_course[class_idx]))
+        return courses
+
+    def repeats_neighbour(self, grid, day, slot, course):
+        """True if ``course`` already sits in the slot before or after (day, slot)."""
+        return course in self.courses_at(grid, day, slot - 1) or course in self.courses_at(grid, day, slot + 1)
@@ -1,17 +1,26 @@
 from django import forms
-from .models import Timetable, Class
+from .models import Timetable, Class, ImportJob
+
+IMPORT_MODES = ImportJob._meta.get_field('mode').choices
 
 class FacultyUploadForm(forms.Form):
     file = forms.FileField()
+    mode = forms.ChoiceField(choices=IMPORT_MODES, initial='insert', label='Existing IDs')
+    background = forms.BooleanField(required=False, label='Import in the background')
     
 class StudentUploadForm(forms.Form):
     file = forms.FileField()
+    mode = forms.ChoiceField(choices=IMPORT_MODES, initial='insert', label='Existing IDs')
+    background = forms.BooleanField(required=False, label='Import in the background')
     
 class CourseUploadForm(forms.Form):
     file = forms.FileField()
+    mode = forms.ChoiceField(choices=IMPORT_MODES, initial='insert', label='Existing IDs')
+    background = forms.BooleanField(required=False, label='Import in the background')
     
 class RegistrationUploadForm(forms.Form):
     file = forms.FileField()
+    background = forms.BooleanField(required=False, label='Import in the background')
     
 class ClassForm(forms.ModelForm):
     class Meta:
@@ -1,352 +1,360 @@
+import json
 import random
-from collections import defaultdict
+import time
+from collections import defaultdict, namedtuple
+import numpy as np
 from .models import Timetable, Class, TimetableStatus, Course
-from .validators import validate_timetable_constraints
+from .validators import validate_timetable_constraints, EXEMPT_VENUES
+from .occupancy import occupancy_index, record_rows
+from .encoding import TimetableEncoding, EMPTY, SLOT_COUNT
+from .scoring import PopulationScorer, ScoreState
+from .parallel import breeding_pool
+from .backtracking import solve_exact, NodeLimitReached
+from .profiling import profiled, profiling, note
+from . import projections
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
 
 import logging
 logger = logging.getLogger(__name__)
 
-# Define course slot requirements
-COURSE_SLOT_REQUIREMENTS = {}
 # Time slots and days
 TIME_SLOTS = [1, 2, 3, 4, 5, 6, 7, 8]
 DAYS = [1, 2, 3, 4, 5, 6]
 
-# Dictionary to hold pre-assigned (locked) timetable slots
-locked_slots = set()  # Format: (day, slot)
-locked_assignments = defaultdict(list)  # Format: (day, slot): [(main_id, course_name), ...]
+# Best individuals carried from one restart of a solve into the next
+ELITE_ARCHIVE_SIZE = 5
 
-def fitness(individual, current_year, current_semester, section, dept, timetable_cache=None):
+# What run_ga_logic reports: restarts is the number of in-process restarts, restart_seconds the time of each attempt,
+# profile the SolveProfile report when profiling is on
+SolveResult = namedtuple('SolveResult', ['best_fitness', 'requirements_met', 'restarts', 'restart_seconds', 'created', 'profile'], defaults=[None])
+
+# All per-solve state, as plain picklable data (no model instances). Every operator takes it as
+# its first argument and nothing is kept at module level, so several sections can solve at once
+# in threads or processes.
+GAProblem = namedtuple('GAProblem', ['current_year', 'current_semester', 'section', 'dept', 'timetable_cache', 'encoding', 'scorer', 'requirements'])
+
+@profiled('fitness')
+def fitness(problem, individual):
+    p, encoding = problem, problem.encoding
     score = 0
     course_distribution = defaultdict(int)
-    temp_timetable = defaultdict(list)
-    for day, slot, main_id, _ in individual:
-        if main_id not in all_classes:
-            logger.error(f"Invalid main_id {main_id} in fitness")
-            score -= 50
-            continue
-        temp_timetable[(day, slot)].append(all_classes[main_id])
-
-    for day, slot, main_id, course_name in individual:
-        if main_id not in all_classes:
-            logger.error(f"Invalid main_id {main_id} in fitness validation")
-            score -= 50
-            continue
+    temp_timetable = encoding.overlay(individual)
+    for day, slot, main_id, course_name in encoding.genes(individual):
         try:
-            validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
+            validate_timetable_constraints(main_id, day, slot, p.current_year, p.current_semester, p.section, p.dept, p.timetable_cache, temp_timetable)
             score += 5
             course_distribution[course_name] += 1
         except ValidationError as e:
             score -= 50
             logger.debug(f"Fitness penalty for main_id {main_id}, day {day}, slot {slot}: {e}")
-    for course, required_slots in COURSE_SLOT_REQUIREMENTS.items():
+    for course, required_slots in p.requirements.items():
         diff = abs(course_distribution[course] - required_slots)
         score -= diff * 50
     return score
 
-def generate_population(current_year, current_semester, section, dept, size=20, timetable_cache=None):
-    print("entered population")
-    population = []
-    for _ in range(size):
-        individual = [(day, slot, main_id, course_name) 
-                      for (day, slot), assignments in locked_assignments.items() 
-                      for main_id, course_name in assignments if main_id in all_classes]
-
-        course_slots_remaining = COURSE_SLOT_REQUIREMENTS.copy()
-        for _, _, _, course in individual:
-            if course in course_slots_remaining:
-                course_slots_remaining[course] -= 1
-        available_slots = [(day, slot) for day in DAYS for slot in TIME_SLOTS if (day, slot) not in locked_slots]
-        main_courses = {cls.course.name for cls in all_classes.values() if cls.course.course_type == 'none'}
-        temp_timetable = defaultdict(list)
-        for day, slot, main_id, _ in individual:
-            if main_id not in all_classes:
-                print(f"Invalid main_id {main_id} in locked assignments")
+def can_assign(problem, individual, class_idx, day, slot):
+    """True if class_idx may go at (day, slot) of ``individual``; the cell must be empty."""
+    p, encoding = problem, problem.encoding
+    main_id = encoding.main_ids[class_idx]
+    course = encoding.class_course[class_idx]
+    course_name = encoding.course_names[course]
+    try:
+        validate_timetable_constraints(main_id, day, slot, p.current_year, p.current_semester, p.section, p.dept, p.timetable_cache, encoding.overlay(individual))
+        if encoding.main_course_mask[course] and encoding.repeats_neighbour(individual, day, slot, course):
+            raise ValidationError(f"Cannot assign {course_name} consecutively in slot {slot} on day {day}")
+    except ValidationError as e:
+        logger.debug(f"Validation failed for {course_name} on day {day}, slot {slot}: {e}")
+        return False
+    return True
+
+def try_assign(problem, individual, class_idx, day, slot, state=None):
+    """Place class_idx at (day, slot) if it passes validation; the cell must be empty.
+
+    With a ScoreState the move also updates the individual's cached score.
+    """
+    if not can_assign(problem, individual, class_idx, day, slot):
+        return False
+    if state is not None:
+        problem.scorer.apply_move(state, day, slot, class_idx)
+    else:
+        individual[day - 1, slot - 1] = class_idx
+    return True
+
+@profiled('generate')
+def generate_individual(problem, rng=random):
+    encoding = problem.encoding
+    individual = encoding.empty()
+    course_slots_remaining = encoding.required - encoding.locked_course_counts
+    assigned_courses_on_day = encoding.locked_day_counts.copy()
+    available_slots = encoding.free_cells()
+
+    while available_slots and (course_slots_remaining > 0).any():
+        rng.shuffle(available_slots)
+        assigned_in_iteration = False
+        for day, slot in available_slots[:]:
+            available_courses = np.flatnonzero(course_slots_remaining > 0)
+            if not len(available_courses):
+                break
+            available_courses = [c for c in available_courses if not encoding.main_course_mask[c] or assigned_courses_on_day[day - 1, c] < 2]
+            if not available_courses:
+                available_slots.remove((day, slot))
                 continue
-            temp_timetable[(day, slot)].append(all_classes[main_id])
-            assert isinstance(all_classes[main_id], Class), f"temp_timetable contains non-Class object for main_id {main_id}"
-
-        while available_slots and any(count > 0 for count in course_slots_remaining.values()):
-            random.shuffle(available_slots)
-            assigned_in_iteration = False
-            for day, slot in available_slots[:]:
-                available_courses = [c for c, count in course_slots_remaining.items() if count > 0]
-                if not available_courses:
+            course = rng.choice(available_courses)
+            valid_classes = list(encoding.course_classes[course])
+            rng.shuffle(valid_classes)
+            for class_idx in valid_classes:
+                if try_assign(problem, individual, class_idx, day, slot):
+                    course_slots_remaining[course] -= 1
+                    assigned_courses_on_day[day - 1, course] += 1
+                    assigned_in_iteration = True
                     break
-                assigned_courses_on_day = defaultdict(int)
-                for d, _, _, c in individual:
-                    if d == day:
-                        assigned_courses_on_day[c] += 1
-                available_courses = [c for c in available_courses if c not in main_courses or assigned_courses_on_day[c] < 2]
-                if not available_courses:
-                    available_slots.remove((day, slot))
-                    continue
-                course_name = random.choice(available_courses)
-                valid_classes = [main_id for main_id in course_class_map[course_name] if main_id in all_classes]
-                if valid_classes:
-                    random.shuffle(valid_classes)
-                    assigned = False
-                    for main_id in valid_classes:
-                        try:
-                            validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
-                            cls = all_classes[main_id]
-                            if course_name in main_courses:
-                                # Rebuild temp_timetable for check
-                                temp_timetable_check = defaultdict(list)
-                                for d, s, mid, _ in individual:
-                                    if mid not in all_classes:
-                                        continue
-                                    temp_timetable_check[(d, s)].append(all_classes[mid])
-                                prev_slot = temp_timetable_check.get((day, slot - 1), [])
-                                next_slot = temp_timetable_check.get((day, slot + 1), [])
-                                for c in prev_slot + next_slot:
-                                    if not isinstance(c, Class):
-                                        print(f"Non-Class object in temp_timetable_check: {c}, main_id={main_id}, day={day}, slot={slot}")
-                                        continue
-                                    if c.course.name == course_name:
-                                        raise ValidationError(f"Cannot assign {course_name} consecutively in slot {slot} on day {day}")
-                            individual.append((day, slot, main_id, course_name))
-                            temp_timetable[(day, slot)].append(cls)
-                            assert isinstance(cls, Class), f"temp_timetable appended non-Class object for main_id {main_id}"
-                            course_slots_remaining[course_name] -= 1
-                            assigned = True
-                            assigned_in_iteration = True
-                            available_slots.remove((day, slot))
-                            #print(f"Assigned {course_name} to day {day}, slot {slot}, main_id {main_id}")
-                            break
-                        except ValidationError as e:
-                            print(f"Validation failed for {course_name} on day {day}, slot {slot}: {e}")
-                            continue
-                    if not assigned:
-                        available_slots.remove((day, slot))
-                else:
-                    available_slots.remove((day, slot))
-            if not assigned_in_iteration:
-                break
-        population.append(individual)
+            available_slots.remove((day, slot))
+        if not assigned_in_iteration:
+            break
+    return individual
+
+def generate_population(problem, size=20, rng=random):
+    print("entered population")
+    population = [generate_individual(problem, rng) for _ in range(size)]
     print("exiting population")
     return population
 
-def crossover(parent1, parent2, current_year, current_semester, section, dept, timetable_cache=None):
+@profiled('crossover')
+def crossover(problem, parent1, parent2):
     logger.debug("entered crossover")
-    locked_set = set(locked_assignments.keys())
-    child = []
-    main_courses = {cls.course.name for cls in all_classes.values() if cls.course.course_type == 'none'}
-    parent1_dict = {(day, slot): (main_id, course_name) for day, slot, main_id, course_name in parent1}
-    parent2_dict = {(day, slot): (main_id, course_name) for day, slot, main_id, course_name in parent2}
-    temp_timetable = defaultdict(list)
-
-    for day in DAYS:
-        for slot in TIME_SLOTS:
-            key = (day, slot)
-            if key in locked_set:
-                for main_id, course_name in locked_assignments[key]:
-                    if main_id not in all_classes:
-                        logger.error(f"Invalid main_id {main_id} in locked assignments")
-                        continue
-                    child.append((day, slot, main_id, course_name))
-                    temp_timetable[key].append(all_classes[main_id])
-                    assert isinstance(all_classes[main_id], Class), f"temp_timetable contains non-Class object for main_id {main_id}"
-            else:
-                if key in parent2_dict:
-                    main_id, course_name = parent2_dict[key]
-                elif key in parent1_dict:
-                    main_id, course_name = parent1_dict[key]
-                else:
-                    continue
-                if main_id not in all_classes:
-                    logger.error(f"Invalid main_id {main_id} in parent")
-                    continue
-                try:
-                    validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
-                    if course_name in main_courses:
-                        prev_slot = temp_timetable.get((day, slot - 1), [])
-                        next_slot = temp_timetable.get((day, slot + 1), [])
-                        for c in prev_slot + next_slot:
-                            if not isinstance(c, Class):
-                                logger.error(f"Non-Class object in temp_timetable: {c}, main_id={main_id}, day={day}, slot={slot}")
-                                continue
-                            if c.course.name == course_name:
-                                raise ValidationError(f"Cannot assign {course_name} consecutively in slot {slot} on day {day}")
-                    child.append((day, slot, main_id, course_name))
-                    temp_timetable[key].append(all_classes[main_id])
-                    assert isinstance(all_classes[main_id], Class), f"temp_timetable contains non-Class object for main_id {main_id}"
-                    logger.debug(f"Crossover: Assigned {course_name} to day {day}, slot {slot}, main_id {main_id}")
-                except ValidationError as e:
-                    logger.debug(f"Crossover validation failed for {course_name} on day {day}, slot {slot}: {e}")
-                    if key in parent1_dict:
-                        main_id, course_name = parent1_dict[key]
-                        if main_id not in all_classes:
-                            logger.error(f"Invalid main_id {main_id} in parent1 fallback")
-                            continue
-                        try:
-                            validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
-                            if course_name in main_courses:
-                                prev_slot = temp_timetable.get((day, slot - 1), [])
-                                next_slot = temp_timetable.get((day, slot + 1), [])
-                                for c in prev_slot + next_slot:
-                                    if not isinstance(c, Class):
-                                        logger.error(f"Non-Class object in temp_timetable: {c}, main_id={main_id}, day={day}, slot={slot}")
-                                        continue
-                                    if c.course.name == course_name:
-                                        raise ValidationError(f"Cannot assign {course_name} consecutively in slot {slot} on day {day}")
-                            child.append((day, slot, main_id, course_name))
-                            temp_timetable[key].append(all_classes[main_id])
-                            assert isinstance(all_classes[main_id], Class), f"temp_timetable contains non-Class object for main_id {main_id}"
-                            logger.debug(f"Crossover: Fallback assigned {course_name} to day {day}, slot {slot}, main_id {main_id}")
-                        except ValidationError as e:
-                            logger.debug(f"Crossover fallback failed for {course_name} on day {day}, slot {slot}: {e}")
-                            continue
+    child = problem.encoding.empty()
+    for day, slot in problem.encoding.free_cells():
+        # Prefer parent2's gene, fall back to parent1's
+        for class_idx in (parent2[day - 1, slot - 1], parent1[day - 1, slot - 1]):
+            if class_idx and try_assign(problem, child, class_idx, day, slot):
+                break
     logger.debug("exiting crossover")
     return child
 
-def mutate(individual, generation, max_generations, current_year, current_semester, section, dept, timetable_cache=None):
+@profiled('mutate')
+def mutate(problem, individual, generation, max_generations, state=None, rng=random):
     logger.debug("entered mutate")
-    if not individual:
+    encoding = problem.encoding
+    if not individual.any() and not encoding.locked_genes:
         return individual
 
     mutation_rate = max(0.5 - (0.4 * generation / max_generations), 0.1)
-    course_slots = {course: sum(1 for _, _, _, c in individual if c == course) for course in COURSE_SLOT_REQUIREMENTS}
-    main_courses = {cls.course.name for cls in all_classes.values() if cls.course.course_type == 'none'}
-    temp_timetable = defaultdict(list)
-    for day, slot, main_id, _ in individual:
-        if main_id not in all_classes:
-            logger.error(f"Invalid main_id {main_id} in individual")
-            continue
-        temp_timetable[(day, slot)].append(all_classes[main_id])
-        assert isinstance(all_classes[main_id], Class), f"temp_timetable contains non-Class object for main_id {main_id}"
+    course_slots = encoding.course_counts(individual)
 
-    available_slots = [(day, slot) for day in DAYS for slot in TIME_SLOTS if (day, slot) not in [(d, s) for d, s, _, _ in individual]]
-    random.shuffle(available_slots)
+    available_slots = encoding.free_cells(individual)
+    rng.shuffle(available_slots)
 
     for day, slot in available_slots:
-        under_assigned_courses = [c for c, count in course_slots.items() if count < COURSE_SLOT_REQUIREMENTS[c]]
-        if not under_assigned_courses:
+        under_assigned_courses = np.flatnonzero(course_slots < encoding.required)
+        if not len(under_assigned_courses):
             break
-        course_name = random.choice(under_assigned_courses)
-        valid_classes = [main_id for main_id in course_class_map[course_name] if main_id in all_classes]
-        if valid_classes:
-            main_id = random.choice(valid_classes)
-            try:
-                validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
-                if course_name in main_courses:
-                    prev_slot = temp_timetable.get((day, slot - 1), [])
-                    next_slot = temp_timetable.get((day, slot + 1), [])
-                    for c in prev_slot + next_slot:
-                        if not isinstance(c, Class):
-                            logger.error(f"Non-Class object in temp_timetable: {c}, main_id={main_id}, day={day}, slot={slot}")
-                            continue
-                        if c.course.name == course_name:
-                            raise ValidationError(f"Cannot assign {course_name} consecutively in slot {slot} on day {day}")
-                individual.append((day, slot, main_id, course_name))
-                temp_timetable[(day, slot)].append(all_classes[main_id])
-                assert isinstance(all_classes[main_id], Class), f"temp_timetable appended non-Class object for main_id {main_id}"
-                course_slots[course_name] += 1
-                logger.debug(f"Mutated: Added {course_name} to day {day}, slot {slot}")
-            except ValidationError as e:
-                logger.debug(f"Mutation failed for {course_name} on day {day}, slot {slot}: {e}")
-
-    for i in range(len(individual)):
-        day, slot, main_id, old_course = individual[i]
-        if (day, slot) in locked_slots:
-            continue
-        if main_id not in all_classes:
-            logger.error(f"Invalid main_id {main_id} in individual for mutation")
-            continue
-        if random.random() < mutation_rate:
-            available_courses = [c for c, count in course_slots.items()
-                                if count < COURSE_SLOT_REQUIREMENTS[c] and c != old_course]
+        course = rng.choice(under_assigned_courses)
+        class_idx = rng.choice(encoding.course_classes[course])
+        if try_assign(problem, individual, class_idx, day, slot, state):
+            course_slots[course] += 1
+            logger.debug(f"Mutated: Added {encoding.course_names[course]} to day {day}, slot {slot}")
+
+    for day, slot in encoding.assigned_cells(individual):
+        if rng.random() < mutation_rate:
+            old_idx = individual[day - 1, slot - 1]
+            old_course = encoding.class_course[old_idx]
+            available_courses = [c for c in np.flatnonzero(course_slots < encoding.required) if c != old_course]
             if available_courses:
-                new_course = random.choice(available_courses)
-                valid_classes = [main_id for main_id in course_class_map[new_course] if main_id in all_classes]
-                if valid_classes:
-                    main_id = random.choice(valid_classes)
-                    try:
-                        validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
-                        if new_course in main_courses:
-                            prev_slot = temp_timetable.get((day, slot - 1), [])
-                            next_slot = temp_timetable.get((day, slot + 1), [])
-                            for c in prev_slot + next_slot:
-                                if not isinstance(c, Class):
-                                    logger.error(f"Non-Class object in temp_timetable: {c}, main_id={main_id}, day={day}, slot={slot}")
-                                    continue
-                                if c.course.name == new_course:
-                                    raise ValidationError(f"Cannot assign {new_course} consecutively in slot {slot} on day {day}")
-                        temp_timetable[(day, slot)] = [all_classes[main_id]]
-                        assert isinstance(all_classes[main_id], Class), f"temp_timetable updated with non-Class object for main_id {main_id}"
-                        individual[i] = (day, slot, main_id, new_course)
-                        course_slots[old_course] -= 1
-                        course_slots[new_course] += 1
-                        logger.debug(f"Mutated: Changed {old_course} to {new_course} on day {day}, slot {slot}")
-                    except ValidationError as e:
-                        logger.debug(f"Mutation failed for {new_course} on day {day}, slot {slot}: {e}")
+                new_course = rng.choice(available_courses)
+                class_idx = rng.choice(encoding.course_classes[new_course])
+                # Validate the replacement against the cell without its old occupant
+                individual[day - 1, slot - 1] = EMPTY
+                if try_assign(problem, individual, class_idx, day, slot, state):
+                    course_slots[old_course] -= 1
+                    course_slots[new_course] += 1
+                    logger.debug(f"Mutated: Changed {encoding.course_names[old_course]} to {encoding.course_names[new_course]} on day {day}, slot {slot}")
+                else:
+                    individual[day - 1, slot - 1] = old_idx
     logger.debug("exiting mutate")
     return individual
 
-def evaluate_population(population, current_year, current_semester, section, dept, timetable_cache=None):
-    return [fitness(ind, current_year, current_semester, section, dept, timetable_cache) for ind in population]
-
-def load_locked_slots(current_year, current_semester, section, dept, all_classes):
-    print("entered lock")
-    global locked_slots, locked_assignments
-    locked_slots.clear()
-    locked_assignments.clear()
-
-    qs = Timetable.objects.select_related('main_id__course').filter(
-        Q(main_id__academic_year=current_year,
-          main_id__semester=current_semester,
-          main_id__section_id=section,
-          main_id__dept=dept) |
-        Q(main_id__academic_year=current_year,
-          main_id__semester=current_semester,
-          main_id__section_id__isnull=True,
-          main_id__dept__isnull=True,
-          main_id__course__offered_to='all')
-    ).values_list('day', 'slot', 'main_id__main_id', 'main_id__course__name')
-
-    for day, slot, main_id, course_name in qs:
-        if main_id not in all_classes:
-            logger.warning(f"Skipping locked assignment for invalid main_id {main_id}")
+def _best_placement(problem, state, classes, cells, rng):
+    """(score, day, slot, class_idx) of the best placement of one of ``classes`` into an empty cell, or None.
+
+    Every candidate is one copy of the grid, and all of them are scored in one batch.
+    """
+    moves = [(day, slot, int(class_idx)) for day, slot in cells if not state.grid[day - 1, slot - 1] for class_idx in classes]
+    if not moves:
+        return None
+    grids = np.repeat(state.grid[None], len(moves), axis=0)
+    for i, (day, slot, class_idx) in enumerate(moves):
+        grids[i, day - 1, slot - 1] = class_idx
+    scores = problem.scorer.score(grids)
+    # Ties are broken at random so repeated repairs do not pile into the first cells
+    best = rng.choice(np.flatnonzero(scores == scores.max()).tolist())
+    return (int(scores[best]),) + moves[best]
+
+@profiled('repair')
+def repair(problem, state, rng=random, max_moves=50):
+    """Min-conflicts repair of a ScoreState, in place; returns the number of moves made.
+
+    Each move is the first of these that raises the score:
+
+    - a gene that breaks a rule (faculty or venue clash, consecutive or
+      more than two main courses a day, ...) is taken out and put back in
+      the empty cell, with any class of its course, that leaves the fewest
+      conflicts, or left out if that scores best;
+    - a course short of its required hours gets a class in the best empty cell;
+    - a course over its hours loses the gene whose removal scores best.
+
+    Locked cells are never touched. Stops when nothing improves, the state
+    is feasible, or after ``max_moves`` moves.
+    """
+    encoding, scorer = problem.encoding, problem.scorer
+    cells = encoding.free_cells()
+    unlocked = np.zeros(len(state.classes[0]), dtype=bool)
+    for day, slot in cells:
+        unlocked[(day - 1) * SLOT_COUNT + slot - 1] = True
+
+    def relocations():
+        bad = [int(cell) for cell in np.flatnonzero((state.classes[0] > 0) & ~state.passed & unlocked)]
+        rng.shuffle(bad)
+        for cell in bad:
+            day, slot = cell // SLOT_COUNT + 1, cell % SLOT_COUNT + 1
+            yield day, slot, encoding.course_classes[encoding.class_course[state.grid[day - 1, slot - 1]]]
+        short = [int(c) for c in np.flatnonzero((state.distribution < scorer.required) & scorer.required_mask)]
+        rng.shuffle(short)
+        for course in short:
+            yield None, None, encoding.course_classes[course]
+        for course in np.flatnonzero((state.distribution > scorer.required) & scorer.required_mask):
+            for day, slot in encoding.assigned_cells(state.grid):
+                if encoding.class_course[state.grid[day - 1, slot - 1]] == course:
+                    yield day, slot, []
+
+    moves = 0
+    while moves < max_moves and not is_feasible(state):
+        before = state.score
+        for day, slot, classes in relocations():
+            old_idx = state.grid[day - 1, slot - 1] if day else EMPTY
+            if day:
+                scorer.apply_move(state, day, slot, EMPTY)
+            best = _best_placement(problem, state, classes, cells, rng)
+            if best is not None and best[0] > state.score:
+                scorer.apply_move(state, *best[1:])
+            if state.score > before:
+                moves += 1
+                break
+            if day:
+                scorer.apply_move(state, day, slot, old_idx)
+        else:
+            break
+    return moves
+
+@profiled('local_search')
+def tabu_search(problem, state, rng=random, iterations=20, tenure=5, sample=30):
+    """Polish a ScoreState in place with a short tabu search; returns its final score.
+
+    Neighbours move a gene to an empty cell or swap two genes; locked cells
+    are never in the grid, so they are never touched. Each iteration scores
+    ``sample`` random neighbours in one batch and takes the best whose cells
+    are not tabu, or any that beats the best score so far. Cells changed
+    stay tabu for ``tenure`` iterations. The state ends at the best grid seen.
+    """
+    encoding, scorer = problem.encoding, problem.scorer
+    best_score, best_grid = state.score, state.grid.copy()
+    tabu = {}  # (day, slot): last iteration it is tabu
+    for iteration in range(iterations):
+        if is_feasible(state):
+            break
+        grid = state.grid
+        genes, empty = encoding.assigned_cells(grid), encoding.free_cells(grid)
+        moves = []
+        for _ in range(sample):
+            if empty and genes and (len(genes) < 2 or rng.random() < 0.5):
+                moves.append((rng.choice(genes), rng.choice(empty)))
+            elif len(genes) >= 2:
+                moves.append(tuple(rng.sample(genes, 2)))
+        moves = [(a, b) for a, b in moves if grid[a[0] - 1, a[1] - 1] != grid[b[0] - 1, b[1] - 1]]
+        if not moves:
+            break
+        grids = np.repeat(grid[None], len(moves), axis=0)
+        for i, ((d1, s1), (d2, s2)) in enumerate(moves):
+            grids[i, d1 - 1, s1 - 1], grids[i, d2 - 1, s2 - 1] = grid[d2 - 1, s2 - 1], grid[d1 - 1, s1 - 1]
+        scores = scorer.score(grids)
+        for i in np.argsort(-scores, kind='stable'):
+            a, b = moves[i]
+            if scores[i] > best_score or (tabu.get(a, -1) < iteration and tabu.get(b, -1) < iteration):
+                break
+        else:
             continue
-        key = (day, slot)
-        locked_slots.add(key)
-        locked_assignments[key].append((main_id, course_name))
-        logger.debug(f"Locked: day={day}, slot={slot}, main_id={main_id}, course={course_name}")
-    print("exiting lock")
+        old_a, old_b = grid[a[0] - 1, a[1] - 1], grid[b[0] - 1, b[1] - 1]
+        scorer.apply_move(state, *a, old_b)
+        scorer.apply_move(state, *b, old_a)
+        tabu[a] = tabu[b] = iteration + tenure
+        if state.score > best_score:
+            best_score, best_grid = state.score, state.grid.copy()
+    if state.score < best_score:
+        for d, s in zip(*np.nonzero(state.grid != best_grid)):
+            scorer.apply_move(state, int(d) + 1, int(s) + 1, best_grid[d, s])
+    return state.score
+
+@profiled('fitness')
+def evaluate_population(problem, population):
+    # ScoreStates carry an up-to-date score; bare grids are scored together in one batch
+    grids = [ind for ind in population if not isinstance(ind, ScoreState)]
+    batch = iter(problem.scorer.score(grids).tolist() if grids else [])
+    return [ind.score if isinstance(ind, ScoreState) else next(batch) for ind in population]
+
+def seeded_individual(problem, seed):
+    """Random individual of ``problem``, built from its own seed."""
+    return problem.scorer.state(generate_individual(problem, random.Random(seed)))
+
+def breed(problem, parent1, parent2, generation, max_generations, seed):
+    """crossover + mutate + repair + score one child of ``problem``, built from its own seed."""
+    rng = random.Random(seed)
+    child = crossover(problem, parent1, parent2)
+    state = problem.scorer.state(child)
+    mutate(problem, child, generation, max_generations, state, rng)
+    repair(problem, state, rng)
+    return state
+
+def build_problem(snapshot, current_year, current_semester, section, dept, all_classes):
+    """GAProblem of one section against ``snapshot``.
+
+    ``all_classes`` are the section's Class instances (with course) by
+    main_id; whatever the snapshot already places for them is locked.
+    """
+    requirements = {}
+    for cls in all_classes.values():
+        if cls.course.course_type == 'none':
+            requirements[cls.course.name] = cls.course.hours_per_week
+
+    # Pre-assigned (locked) cells, format: (day, slot): [(main_id, course_name), ...]
+    locked_assignments = defaultdict(list)
+    for (day, slot), main_ids in sorted(snapshot.cells.items()):
+        for main_id in sorted(main_ids):
+            if main_id in all_classes:
+                locked_assignments[(day, slot)].append((main_id, all_classes[main_id].course.name))
+                logger.debug(f"Locked: day={day}, slot={slot}, main_id={main_id}, course={all_classes[main_id].course.name}")
+
+    encoding = TimetableEncoding(
+        [(cls.main_id, cls.course.name, cls.course.course_type) for cls in all_classes.values()],
+        requirements,
+        locked_assignments,
+    )
+    scorer = PopulationScorer(snapshot, encoding, section, dept, requirements)
+    return GAProblem(current_year, current_semester, section, dept, snapshot, encoding, scorer, requirements)
+
+@profiled('load')
+def load_problem(current_year, current_semester, section, dept):
+    """Load classes, requirements and locked slots for one solve.
+
+    Returns the GAProblem and the section's Class instances by main_id.
+    """
+    # One snapshot of the academic year, taken from its occupancy index; every validation below runs in memory against it
+    timetable_cache = occupancy_index(current_year).snapshot(current_semester)
 
-def run_ga_logic(current_year, current_semester, section, dept, count=0):
-    print("Running Optimized Genetic Algorithm...")
-        
-    global all_classes, course_class_map
-    all_classes = {}
-    course_class_map = defaultdict(list)
-    
-    if count == 0:
-        COURSE_SLOT_REQUIREMENTS.clear()
-        all_classes.clear()
-        course_class_map.clear()
-    
-    timetable_cache = {
-        (day, slot): list(Timetable.objects.select_related('main_id__course').prefetch_related('main_id__faculty').filter(
-            Q(day=day, slot=slot,
-              main_id__academic_year=current_year,
-              main_id__semester=current_semester,
-              main_id__section_id=section,
-              main_id__dept=dept) |
-            Q(day=day, slot=slot,
-              main_id__academic_year=current_year,
-              main_id__semester=current_semester,
-              main_id__section_id__isnull=True,
-              main_id__dept__isnull=True,
-              main_id__course__offered_to='all')
-        )) for day in DAYS for slot in TIME_SLOTS
-    }
-    
     # Fetch all Class instances and store in a dictionary
-    # Validate all_classes
-    all_classes = { 
+    all_classes = {
         cls.main_id: cls
         for cls in Class.objects.select_related('course').prefetch_related('faculty').filter(
             Q(academic_year=current_year,
@@ -355,98 +363,309 @@ def run_ga_logic(current_year, current_semester, section, dept, count=0):
             dept=dept) |
             Q(academic_year=current_year,
             semester=current_semester,
-            section_id__isnull=True, 
+            section_id__isnull=True,
             dept__isnull=True,
             course__offered_to='all')
         )
         if isinstance(cls, Class)
     }
-    #print(f"all_classes keys: {list(all_classes.keys())}")
-
-    # Validate course_class_map
-    for cls in all_classes.values():
-        if cls.course and cls.course.name:
-            course_class_map[cls.course.name].append(cls.main_id)
-    for course_name, main_ids in course_class_map.items():
-        invalid_ids = [mid for mid in main_ids if mid not in all_classes]
-        if invalid_ids:
-            print(f"Invalid main_ids in course_class_map for {course_name}: {invalid_ids}")
-            course_class_map[course_name] = [mid for mid in main_ids if mid in all_classes]
-
-    # Validate locked_assignments
-    invalid_locked = []
-    for (day, slot), assignments in locked_assignments.items():
-        valid_assignments = [(mid, cname) for mid, cname in assignments if mid in all_classes]
-        if len(valid_assignments) != len(assignments):
-            invalid_locked.append((day, slot, [mid for mid, _ in assignments if mid not in all_classes]))
-        locked_assignments[(day, slot)] = valid_assignments
-    if invalid_locked:
-        print(f"Invalid main_ids in locked_assignments: {invalid_locked}")
-
-    classes = Class.objects.filter(
-        Q(academic_year=current_year,
-          semester=current_semester,
-          section_id=section,
-          dept=dept) |
-        Q(academic_year=current_year,
-          semester=current_semester,
-          section_id__isnull=True, 
-          dept__isnull=True,
-          course__offered_to='all')
-    )
-
-    relevant_courses = set(cls.course for cls in classes)    
-    for course in relevant_courses:
-        if course.course_type == 'none':
-            COURSE_SLOT_REQUIREMENTS[course.name] = course.hours_per_week
-
-    load_locked_slots(current_year, current_semester, section, dept, all_classes)
-
-    population = generate_population(current_year, current_semester, section, dept, size=20, timetable_cache=timetable_cache)
-
-    generations = 20
-    best_fitness = -float('inf')
-    stagnation_count = 0
-    best_solution = None
-
-    for gen in range(generations):
-        fitness_scores = evaluate_population(population, current_year, current_semester, section, dept, timetable_cache)
-        sorted_pop = [(score, individual) for score, individual in zip(fitness_scores, population)]
-        sorted_pop.sort(reverse=True)
+    return build_problem(timetable_cache, current_year, current_semester, section, dept, all_classes), all_classes
+
+class Island:
+    """One evolving population: the whole run, or one island of an island-model run."""
+
+    def __init__(self, population, rng, local_search=0):
+        self.population = population
+        self.rng = rng
+        self.local_search = local_search  # elites polished by tabu_search every generation
+        self.best_fitness = -float('inf')
+        self.best_solution = None
+        self.stagnation_count = 0
+        self.stopped = False
+
+    def best(self):
+        if self.best_solution is None:
+            state = max(self.population, key=lambda state: state.score)
+            return state.score, state
+        return self.best_fitness, self.best_solution
+
+def evolve(problem, island, start, stop, generations, breed_children, progress=None):
+    """Run generations [start, stop) on ``island``; breed_children turns breed() tasks into ScoreStates."""
+    for gen in range(start, stop):
+        if island.stopped:
+            break
+        fitness_scores = evaluate_population(problem, island.population)
+        sorted_pop = [(score, individual) for score, individual in zip(fitness_scores, island.population)]
+        sorted_pop.sort(key=lambda item: item[0], reverse=True)
 
         current_best_fitness = sorted_pop[0][0]
-        if current_best_fitness > best_fitness:
-            best_fitness = current_best_fitness
-            best_solution = sorted_pop[0][1]
-            stagnation_count = 0
-            print(f"Generation {gen}: New best fitness: {best_fitness}")
+        if current_best_fitness > island.best_fitness:
+            island.best_fitness = current_best_fitness
+            island.best_solution = sorted_pop[0][1]
+            island.stagnation_count = 0
+            print(f"Generation {gen}: New best fitness: {island.best_fitness}")
         else:
-            stagnation_count += 1
+            island.stagnation_count += 1
+        if progress:
+            progress(generation=gen + 1, generations=generations, best_fitness=island.best_fitness, feasible=is_feasible(island.best_solution))
 
-        if stagnation_count >= 20:
-            print(f"Early stopping at generation {gen} - No improvement for {stagnation_count} generations")
+        if island.stagnation_count >= 20:
+            print(f"Early stopping at generation {gen} - No improvement for {island.stagnation_count} generations")
+            island.stopped = True
             break
 
-        population_size = max(10, len(population)//2) if stagnation_count > 5 else 20
+        population_size = max(10, len(island.population)//2) if island.stagnation_count > 5 else 20
 
         population = [individual for _, individual in sorted_pop]
         elite_count = max(3, population_size // 10)
         parents = population[:population_size // 2]
         next_generation = population[:elite_count]
+        # Memetic step: the elites are polished in place before they breed
+        for state in next_generation[:island.local_search]:
+            tabu_search(problem, state, island.rng)
 
+        tasks = []
         for _ in range(population_size - elite_count):
-            parent1, parent2 = random.sample(parents, 2)
-            child = crossover(parent1, parent2, current_year, current_semester, section, dept, timetable_cache)
-            child = mutate(child, gen, generations, current_year, current_semester, section, dept, timetable_cache)
-            next_generation.append(child)
-
-        population = next_generation
-
-    if best_solution is None:
-        best_solution = max(population, key=lambda ind: fitness(ind, current_year, current_semester, section, dept, timetable_cache))
+            parent1, parent2 = island.rng.sample(parents, 2)
+            tasks.append((parent1.grid, parent2.grid, gen, generations, island.rng.getrandbits(32)))
+        next_generation += breed_children(tasks)
+
+        # Duplicate children are re-mutated to keep the population diverse
+        seen = set()
+        for state in next_generation:
+            if state.grid.tobytes() in seen:
+                mutate(problem, state.grid, gen, generations, state, island.rng)
+            seen.add(state.grid.tobytes())
+
+        island.population = next_generation
+    return island
+
+def evolve_island(problem, island, start, stop, generations):
+    """evolve() inside a worker process, breeding children in that process."""
+    return evolve(problem, island, start, stop, generations, lambda tasks: [breed(problem, *task) for task in tasks])
+
+def migrate(islands, migrants):
+    """Ring migration: each island's best individuals replace the worst of the next island."""
+    elites = [sorted(island.population, key=lambda state: state.score, reverse=True)[:migrants] for island in islands]
+    for i, island in enumerate(islands):
+        incoming = elites[i - 1]
+        island.population.sort(key=lambda state: state.score, reverse=True)
+        island.population[len(island.population) - len(incoming):] = incoming
+
+def run_islands(problem, rng, island_count, generations, migration_interval, migrants, progress=None, warm=(), local_search=0):
+    """Evolve island_count populations, one process each, migrating elites every migration_interval generations."""
+    with breeding_pool(problem, island_count) as pool:
+        seeds = [rng.getrandbits(32) for _ in range(20 * island_count)]
+        individuals = pool.generate(seeds)
+        # Warm-start individuals are dealt round-robin so every island gets some
+        for i, state in enumerate(list(warm)[:20 * island_count]):
+            individuals[(i % island_count) * 20 + i // island_count] = state
+        islands = [Island(individuals[i * 20:(i + 1) * 20], random.Random(rng.getrandbits(32)), local_search) for i in range(island_count)]
+        for start in range(0, generations, migration_interval):
+            islands = pool.evolve(islands, start, min(start + migration_interval, generations), generations)
+            if progress:
+                progress(
+                    generation=min(start + migration_interval, generations), generations=generations,
+                    best_fitness=max(island.best()[0] for island in islands),
+                    feasible=any(is_feasible(island.best()[1]) for island in islands),
+                )
+            if all(island.stopped for island in islands):
+                break
+            migrate(islands, migrants)
+    for i, island in enumerate(islands):
+        print(f"Island {i}: best fitness {island.best()[0]}")
+    return islands
+
+def section_cache_key(current_year, current_semester, section, dept):
+    return f"ga_best:{current_year}:{current_semester}:{dept}:{section}"
+
+def best_cache_key(problem):
+    return section_cache_key(problem.current_year, problem.current_semester, problem.section, problem.dept)
+
+def previous_academic_year(current_year):
+    """'2025_even' -> '2024_even'; None if the year is not in that form."""
+    year, sep, parity = str(current_year).partition('_')
+    if not year.isdigit():
+        return None
+    return f"{int(year) - 1}{sep}{parity}"
+
+def previous_year_genes(problem, all_classes):
+    """The section's timetable of the previous academic year, mapped onto this year's classes by course name."""
+    year = previous_academic_year(problem.current_year)
+    if year is None:
+        return []
+    class_by_course = {}
+    for cls in sorted(all_classes.values(), key=lambda cls: (cls.section_id is None, cls.main_id)):
+        class_by_course.setdefault(cls.course.name, cls.main_id)
+    rows = Timetable.objects.filter(
+        main_id__academic_year=year, main_id__semester=problem.current_semester,
+        main_id__section_id=problem.section, main_id__dept=problem.dept,
+    ).values_list('day', 'slot', 'main_id__course__name')
+    return [(day, slot, class_by_course[name], name) for day, slot, name in rows if name in class_by_course]
+
+@profiled('warm_start')
+def warm_start(problem, all_classes, rng, size=10):
+    """Up to ``size`` ScoreStates built from earlier timetables of the section.
+
+    Sources are the best grid of the section's last run (cached by
+    run_ga_logic) and the previous academic year's timetable. Each source is
+    first rebuilt gene by gene so only placements valid this year survive,
+    then copies of it are lightly mutated. The section's own saved rows need
+    no seeding: they are locked cells of every individual already.
+    """
+    encoding = problem.encoding
+    sources = []
+    cached = cache.get(best_cache_key(problem))
+    if cached:
+        sources.append(encoding.encode(cached))
+    genes = previous_year_genes(problem, all_classes)
+    if genes:
+        sources.append(encoding.encode(genes))
+    if not sources:
+        return []
+
+    states = []
+    for i, source in enumerate(sources):
+        repaired = crossover(problem, source, source)
+        states.append(problem.scorer.state(repaired))
+        for _ in range(size // len(sources) - 1 + (i < size % len(sources))):
+            child = repaired.copy()
+            state = problem.scorer.state(child)
+            # Late-generation mutation rate: small changes around the source
+            mutate(problem, child, 1, 1, state, rng)
+            states.append(state)
+    print(f"Warm start: {len(states)} individuals from {len(sources)} earlier timetable(s)")
+    return states[:size]
+
+def solver_options(workers=None, islands=None, migration_interval=None):
+    """Fill unset run options from the GA_* settings."""
+    if workers is None:
+        workers = getattr(settings, 'GA_WORKERS', 1)
+    if islands is None:
+        islands = getattr(settings, 'GA_ISLANDS', 1)
+    if migration_interval is None:
+        migration_interval = getattr(settings, 'GA_MIGRATION_INTERVAL', 5)
+    return workers, islands, migration_interval
+
+def search(problem, rng, workers=1, islands=1, migration_interval=5, progress=None, warm=(), local_search=0):
+    """One GA run on ``problem``; returns (best_fitness, best ScoreState, final population).
+
+    ``warm`` ScoreStates take the place of random individuals in the initial
+    population; ``local_search`` elites are polished by tabu_search each generation.
+    """
+    generations = 20
+    # Phases run in these processes are missing from the profile
+    note(worker_processes=islands if islands > 1 else (workers if workers and workers > 1 else 0))
+    if islands > 1:
+        island_list = run_islands(problem, rng, islands, generations, migration_interval, getattr(settings, 'GA_MIGRANTS', 2), progress, warm, local_search)
+    else:
+        with breeding_pool(problem, workers) as pool:
+            # Each individual carries its ScoreState so elites are never rescored and mutations are scored by delta
+            warm = list(warm)[:20]
+            island = Island(warm + pool.generate([rng.getrandbits(32) for _ in range(20 - len(warm))]), rng, local_search)
+            evolve(problem, island, 0, generations, generations, pool.breed, progress)
+        island_list = [island]
+    best_fitness, best = max((island.best() for island in island_list), key=lambda best: best[0])
+    cache_stats = problem.scorer.cache
+    logger.info(f"Fitness cache: {cache_stats.hits} hits, {cache_stats.misses} misses")
+    note(fitness_cache_hits=cache_stats.hits, fitness_cache_misses=cache_stats.misses)
+    # The final best may use a move per free cell, more than each child gets
+    if repair(problem, best, rng, max_moves=len(problem.encoding.free_cells())):
+        print(f"Repaired best solution: fitness {best_fitness} -> {best.score}")
+        best_fitness = best.score
+    return best_fitness, best, [state for island in island_list for state in island.population] + [best]
+
+def update_archive(archive, states, size=ELITE_ARCHIVE_SIZE):
+    """The ``size`` best distinct individuals of ``archive`` and ``states``."""
+    distinct = {}
+    for state in sorted(list(archive) + list(states), key=lambda state: state.score, reverse=True):
+        distinct.setdefault(state.grid.tobytes(), state)
+    return list(distinct.values())[:size]
+
+@profiled('save')
+def save_solution(problem, all_classes, best_solution, temp_timetable):
+    """Make the section's rows match ``best_solution``; returns the number of rows created.
+
+    Only the difference is written: rows that are already right stay
+    untouched, the rest go in one filtered delete and one bulk_create,
+    inside a single transaction, so readers never see a half-saved
+    timetable. Only rows of GA-scheduled classes that the solve did not lock
+    are ever removed; cells written by anyone else since the solve loaded
+    are read under the row lock and left alone.
+    """
+    current_year, current_semester, section, dept = problem.current_year, problem.current_semester, problem.section, problem.dept
+    locked_slots = set(problem.encoding.locked_main_ids)
+    locked_rows = {(main_id, day, slot) for day, slot, main_id, _ in problem.encoding.locked_genes}
+
+    # Revalidate before saving (in memory, against the snapshot)
+    wanted = set()
+    for day, slot, main_id, course_name in best_solution:
+        if (day, slot) in locked_slots:
+            continue
+        if main_id not in all_classes:
+            logger.error(f"Skipping save for invalid main_id {main_id}")
+            continue
+        try:
+            validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, problem.timetable_cache, temp_timetable)
+            wanted.add((main_id, day, slot))
+        except ValidationError as e:
+            logger.error(f"Failed to create timetable entry for main_id {main_id}, day {day}, slot {slot}: {e}")
 
-    print(f"Best fitness achieved: {best_fitness}")
-    logger.debug(f"best_solution: {[(day, slot, main_id, course_name) for day, slot, main_id, course_name in best_solution]}")
+    with transaction.atomic():
+        current = {
+            (main_id, day, slot): row_id
+            for row_id, main_id, day, slot in Timetable.objects.filter(
+                Q(main_id__academic_year=current_year, main_id__semester=current_semester, main_id__section_id=section, main_id__dept=dept) |
+                Q(main_id__academic_year=current_year, main_id__semester=current_semester, main_id__section_id__isnull=True, main_id__dept__isnull=True, main_id__course__offered_to='all')
+            ).select_for_update().values_list('id', 'main_id', 'day', 'slot')
+        }
+        # Manual rows (TT and department courses) and rows the solve locked stay,
+        # whether or not the solve saw them; only GA rows are the solve's to replace
+        kept = {
+            key for key in current
+            if key in locked_rows or key[0] not in all_classes or all_classes[key[0]].course.course_type != 'none'
+        }
+        kept_cells = {(day, slot) for _, day, slot in kept}
+        clashes = {key for key in wanted - kept if key[1:] in kept_cells}
+        if clashes:
+            logger.warning(f"Not saving {len(clashes)} entries of {dept}-{section} into cells assigned since the solve loaded: {sorted(clashes)}")
+            wanted -= clashes
+        removed = [row_id for key, row_id in current.items() if key not in kept and key not in wanted]
+        inserted = [
+            Timetable(main_id=all_classes[main_id], day=day, slot=slot)
+            for main_id, day, slot in sorted(wanted - current.keys())
+        ]
+        if removed:
+            Timetable.objects.filter(id__in=removed).delete()
+        Timetable.objects.bulk_create(inserted)
+        if inserted:
+            # bulk_create sends no signals
+            record_rows(current_year, [(row.main_id_id, row.day, row.slot) for row in inserted])
+            projections.changed(classes={row.main_id_id for row in inserted})
+    logger.info(f"Saved {dept}-{section}: {len(inserted)} inserted, {len(removed)} removed, {len(wanted) - len(inserted)} unchanged")
+    return len(inserted)
+
+@profiled('backtracking')
+def exact_search(problem):
+    """ScoreState of the backtracking engine's solution, or None once its node budget runs out."""
+    try:
+        grid = solve_exact(problem, getattr(settings, 'GA_BACKTRACK_NODE_LIMIT', 5000))
+    except NodeLimitReached as e:
+        print(f"{e}, falling back to the Genetic Algorithm")
+        return None
+    if grid is None:
+        raise ValidationError(f"No feasible timetable exists for {problem.dept}-{problem.section} with the current locked slots and course hours.")
+    return problem.scorer.state(grid)
+
+@profiled('validation')
+def check_solution(problem, all_classes, best_solution):
+    """Re-validate a solution against the snapshot.
+
+    Returns (valid_solution, constraint_violations, requirements_met, temp_timetable).
+    """
+    current_year, current_semester, section, dept = problem.current_year, problem.current_semester, problem.section, problem.dept
+    timetable_cache = problem.timetable_cache
+    locked_slots = set(problem.encoding.locked_main_ids)
 
     valid_solution = True
     constraint_violations = 0
@@ -488,7 +707,7 @@ def run_ga_logic(current_year, current_semester, section, dept, count=0):
             valid_solution = False
             logger.error(f"Invalid assignment in best solution: main_id={main_id}, day={day}, slot={slot}: {e}")
 
-    # Check COURSE_SLOT_REQUIREMENTS
+    # Check the course slot requirements
     scheduled_slots = defaultdict(int)
     for day, slot, main_id, course_name in best_solution:
         if (day, slot) in locked_slots:
@@ -513,60 +732,95 @@ def run_ga_logic(current_year, current_semester, section, dept, count=0):
         except ValidationError as e:
             logger.error(f"Skipping slot count for main_id={main_id}, day={day}, slot={slot}: {e}")
 
-    print(COURSE_SLOT_REQUIREMENTS)
+    print(problem.requirements)
     print(scheduled_slots)
 
     requirements_met = True
-    for course, required in COURSE_SLOT_REQUIREMENTS.items():
+    for course, required in problem.requirements.items():
         if course not in scheduled_slots or scheduled_slots[course] != required:
             requirements_met = False
             print(f"Requirement not met for {course}: scheduled {scheduled_slots.get(course, 0)} vs required {required}")
 
-    # Retry if solution is invalid or requirements not met
-    if (not valid_solution or not requirements_met) and count < 5:
-        print(f"Retry {count + 1}: {constraint_violations} constraint violations, Requirements Met={requirements_met}")
-        return run_ga_logic(current_year, current_semester, section, dept, count + 1)
-
-    # Build a Q object to match all locked (day, slot) pairs
-    locked_conditions = Q()
-    for day, slot in locked_slots:
-        locked_conditions |= Q(day=day, slot=slot)
-
-    # Delete only entries that are NOT in locked slots
-    if locked_conditions:
-        Timetable.objects.filter(
-            Q(main_id__academic_year=current_year, main_id__semester=current_semester, main_id__section_id=section, main_id__dept=dept) | 
-            Q(main_id__academic_year=current_year, main_id__semester=current_semester, main_id__section_id__isnull=True, main_id__dept__isnull=True, main_id__course__offered_to='all')
-        ).exclude(locked_conditions).delete()
-    else:
-        Timetable.objects.filter(
-            Q(main_id__academic_year=current_year, main_id__semester=current_semester, main_id__section_id=section, main_id__dept=dept) |
-            Q(main_id__academic_year=current_year, main_id__semester=current_semester, main_id__section_id__isnull=True, main_id__dept__isnull=True, main_id__course__offered_to='all')
-        ).delete()
+    return valid_solution, constraint_violations, requirements_met, temp_timetable
+
+def run_ga_logic(current_year, current_semester, section, dept, seed=None, workers=None, islands=None, migration_interval=None, progress=None, engine=None, max_restarts=None, local_search=None, profile=None):
+    """Solve one section and save it; returns a SolveResult.
+
+    If the best solution breaks a rule or misses a course's hours, the
+    search restarts in process, up to ``max_restarts`` times (default
+    GA_MAX_RESTARTS). Restarts reuse the loaded problem and are seeded with
+    an archive of the best individuals found so far. ``progress``, if
+    given, is called with attempt, generation, generations, best_fitness
+    and feasible keywords as the run advances. ``engine`` is 'ga' or
+    'backtracking' (default GA_ENGINE); backtracking falls back to the GA
+    when it hits its node budget. ``local_search`` is the number of elites
+    polished by tabu search each generation (default GA_LOCAL_SEARCH).
+    With ``profile`` (default GA_PROFILE) wall time, calls and DB queries
+    are recorded per phase and per validator rule (see SolveProfile for what
+    is left out); the report is logged and returned as SolveResult.profile.
+    """
+    if profile is None:
+        profile = getattr(settings, 'GA_PROFILE', False)
+    with profiling(profile) as solve_profile:
+        result = solve_section(current_year, current_semester, section, dept, seed, workers, islands, migration_interval, progress, engine, max_restarts, local_search)
+    if solve_profile is None:
+        return result
+    report = solve_profile.report()
+    logger.info(f"Solve profile for {current_year} sem {current_semester} {dept}-{section}: {json.dumps(report)}")
+    return result._replace(profile=report)
+
+def solve_section(current_year, current_semester, section, dept, seed=None, workers=None, islands=None, migration_interval=None, progress=None, engine=None, max_restarts=None, local_search=None):
+    """run_ga_logic without the profiling."""
+    print("Running Optimized Genetic Algorithm...")
+    problem, all_classes = load_problem(current_year, current_semester, section, dept)
+    encoding = problem.encoding
+    # Parent selection and per-child seeds come from this RNG only, so a seed reproduces the run for any worker count
+    rng = random.Random(seed)
+    workers, islands, migration_interval = solver_options(workers, islands, migration_interval)
+    if engine is None:
+        engine = getattr(settings, 'GA_ENGINE', 'ga')
+    if max_restarts is None:
+        max_restarts = getattr(settings, 'GA_MAX_RESTARTS', 5)
+    if local_search is None:
+        local_search = getattr(settings, 'GA_LOCAL_SEARCH', 0)
+
+    archive = []
+    restart_seconds = []
+    for attempt in range(max_restarts + 1):
+        started = time.perf_counter()
+        report = (lambda attempt=attempt, **kwargs: progress(attempt=attempt, **kwargs)) if progress else None
+        # The backtracking engine is deterministic, so restarts use the GA
+        best = exact_search(problem) if engine == 'backtracking' and attempt == 0 else None
+        if best is not None:
+            archive = update_archive(archive, [best])
+        else:
+            if attempt:
+                warm = archive
+            else:
+                warm = warm_start(problem, all_classes, rng) if getattr(settings, 'GA_WARM_START', True) else []
+            _, best, population = search(problem, rng, workers, islands, migration_interval, report, warm, local_search)
+            archive = update_archive(archive, population)
+        best_solution = encoding.genes(best.grid)
+        print(f"Best fitness achieved: {best.score}")
+        logger.debug(f"best_solution: {best_solution}")
+
+        valid_solution, constraint_violations, requirements_met, temp_timetable = check_solution(problem, all_classes, best_solution)
+        restart_seconds.append(time.perf_counter() - started)
+        if valid_solution and requirements_met:
+            break
+        if attempt < max_restarts:
+            print(f"Retry {attempt + 1}: {constraint_violations} constraint violations, Requirements Met={requirements_met}")
 
-    # Save timetable entries
-    successful_assignments = 0
-    for day, slot, main_id, course_name in best_solution:
-        if (day, slot) in locked_slots:
-            continue
-        if main_id not in all_classes:
-            logger.error(f"Skipping save for invalid main_id {main_id}")
-            continue
-        try:
-            # Revalidate before saving
-            validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache, temp_timetable)
-            Timetable.objects.create(
-                main_id=all_classes[main_id],
-                day=day,
-                slot=slot
-            )
-            successful_assignments += 1
-            logger.info(f"Created timetable entry for main_id {main_id}, day {day}, slot {slot}")
-        except ValidationError as e:
-            logger.error(f"Failed to create timetable entry for main_id {main_id}, day {day}, slot {slot}: {e}")
-        except Exception as e:
-            logger.error(f"Error creating timetable entry: {e}")
+    if not (valid_solution and requirements_met) and archive[0] is not best:
+        # Keep the best individual of all attempts, not just the last one's
+        best = archive[0]
+        best_solution = encoding.genes(best.grid)
+        valid_solution, constraint_violations, requirements_met, temp_timetable = check_solution(problem, all_classes, best_solution)
+
+    # Seeds the next run of this section
+    cache.set(best_cache_key(problem), best_solution, None)
 
+    successful_assignments = save_solution(problem, all_classes, best_solution, temp_timetable)
     print(f"Created {successful_assignments} timetable entries")
 
     timetable_status, _ = TimetableStatus.objects.get_or_create(
@@ -580,4 +834,147 @@ def run_ga_logic(current_year, current_semester, section, dept, count=0):
         timetable_status.save()
         print("Optimized Genetic Algorithm completed successfully.")
     else:
-        print("Optimized Genetic Algorithm completed with partial solution.")
\ No newline at end of file
+        print("Optimized Genetic Algorithm completed with partial solution.")
+    return SolveResult(best.score, requirements_met, len(restart_seconds) - 1, restart_seconds, successful_assignments)
+
+
+def is_feasible(state):
+    # Every gene passes every rule and no required course is over or under its hours
+    return state.score == 5 * int(state.passed.sum())
+
+def run_joint_ga_logic(current_year, current_semester, seed=None, workers=None, islands=None, migration_interval=None):
+    """Solve every section of (year, semester) that waits for the GA in one run and save them together.
+
+    Only sections whose TimetableStatus is ``ga_running`` are solved; the
+    stored rows of all others are locked context, like any manual row.
+    All solved sections share one in-memory snapshot of the year as their
+    faculty and venue occupancy: the most constrained sections are solved
+    first, and each solution is placed into the snapshot before the next
+    section is built, so later sections see it without reloading the
+    database. ``offered_to='all'`` classes placed by one section are locked
+    for the rest.
+
+    Sections are then coupled by one repair pass: each section left
+    infeasible is solved again with the genes of the other sections that
+    share a faculty member or venue with it taken out of the snapshot, and
+    those sections are solved again around its new placement. The repair is
+    kept only if it leaves more of these sections feasible. A section that
+    placed shared classes is never re-solved, as every other section is
+    built around them. Returns {(section, dept): requirements_met}.
+    """
+    print("Running joint Genetic Algorithm...")
+    timetable_cache = occupancy_index(current_year).snapshot(current_semester)
+    rng = random.Random(seed)
+    workers, islands, migration_interval = solver_options(workers, islands, migration_interval)
+    statuses = {
+        (status.section, status.dept): status
+        for status in TimetableStatus.objects.filter(academic_year=current_year, semester=current_semester, status='ga_running')
+    }
+
+    shared_classes = {}
+    section_classes = defaultdict(dict)
+    for cls in Class.objects.select_related('course').filter(academic_year=current_year, semester=current_semester):
+        if cls.section_id is None and cls.dept is None:
+            if cls.course.offered_to == 'all':
+                shared_classes[cls.main_id] = cls
+        elif (cls.section_id, cls.dept) in statuses:
+            section_classes[(cls.section_id, cls.dept)][cls.main_id] = cls
+
+    def required_hours(key):
+        return sum(cls.course.hours_per_week for cls in section_classes[key].values() if cls.course.course_type == 'none')
+
+    def solve(key):
+        section, dept = key
+        all_classes = {**section_classes[key], **shared_classes}
+        problem = build_problem(timetable_cache, current_year, current_semester, section, dept, all_classes)
+        archive = []
+        for attempt in range(getattr(settings, 'GA_MAX_RESTARTS', 5) + 1):
+            _, _, population = search(problem, rng, workers, islands, migration_interval, warm=archive, local_search=getattr(settings, 'GA_LOCAL_SEARCH', 0))
+            archive = update_archive(archive, population)
+            best = archive[0]
+            if is_feasible(best):
+                break
+            print(f"Retry {attempt + 1} for {dept}-{section}: best fitness {best.score}")
+        print(f"{dept}-{section}: best fitness {best.score}, feasible={is_feasible(best)}")
+        best_solution = problem.encoding.genes(best.grid)
+        place(placed_genes(problem, best_solution))
+        return problem, all_classes, best_solution, is_feasible(best)
+
+    def placed_genes(problem, best_solution):
+        # What the solve itself placed, as opposed to what it found locked
+        locked = set(problem.encoding.locked_genes)
+        return [gene for gene in best_solution if gene not in locked]
+
+    def place(genes):
+        for day, slot, main_id, _ in genes:
+            timetable_cache.cells[(day, slot)].add(main_id)
+
+    def take(genes):
+        for day, slot, main_id, _ in genes:
+            timetable_cache.cells[(day, slot)].discard(main_id)
+
+    def resources(main_ids):
+        venues = {timetable_cache.classes[main_id].venue for main_id in main_ids} - set(EXEMPT_VENUES)
+        return set().union(*(timetable_cache.faculty_ids[main_id] for main_id in main_ids)), venues
+
+    solved = {}
+    for key in sorted(section_classes, key=lambda key: (-required_hours(key), key)):
+        solved[key] = solve(key)
+
+    # Repair pass: the sequential solve never lets an earlier section give way to a later one
+    fixed = {
+        key for key, (problem, _, best_solution, _) in solved.items()
+        if any(main_id in shared_classes for _, _, main_id, _ in placed_genes(problem, best_solution))
+    }
+    for key in list(solved):
+        if solved[key][3] or key in fixed:
+            continue
+        faculty, venues = resources(section_classes[key])
+        blockers = []
+        for other in solved:
+            if other == key or other in fixed:
+                continue
+            other_faculty, other_venues = resources(section_classes[other])
+            if faculty & other_faculty or venues & other_venues:
+                blockers.append(other)
+        if not blockers:
+            continue
+        before = {other: solved[other] for other in [key, *blockers]}
+        for entry in before.values():
+            take(placed_genes(entry[0], entry[2]))
+        print(f"Repairing {key[1]}-{key[0]} against {', '.join(f'{dept}-{section}' for section, dept in blockers)}")
+        after = {other: solve(other) for other in [key, *blockers]}
+        if sum(entry[3] for entry in after.values()) > sum(entry[3] for entry in before.values()):
+            solved.update(after)
+        else:
+            for entry in after.values():
+                take(placed_genes(entry[0], entry[2]))
+            for entry in before.values():
+                place(placed_genes(entry[0], entry[2]))
+
+    results = {}
+    with transaction.atomic():
+        # A section taken back for editing while the run went on keeps its rows
+        still_running = {
+            (status.section, status.dept): status
+            for status in TimetableStatus.objects.select_for_update().filter(
+                pk__in=[status.pk for status in statuses.values()], status='ga_running',
+            )
+        }
+        for problem, all_classes, best_solution, feasible in solved.values():
+            timetable_status = still_running.get((problem.section, problem.dept))
+            if timetable_status is None:
+                print(f"{problem.dept}-{problem.section} is no longer waiting for the GA; not saved")
+                continue
+            temp_timetable = defaultdict(list)
+            for day, slot, main_id, _ in best_solution:
+                temp_timetable[(day, slot)].append(all_classes[main_id])
+            created = save_solution(problem, all_classes, best_solution, temp_timetable)
+            print(f"Created {created} timetable entries for {problem.dept}-{problem.section}")
+            if feasible:
+                # save() rather than update(): the status signals rebuild the section's projections
+                timetable_status.status = 'completed'
+                timetable_status.save()
+            results[(problem.section, problem.dept)] = feasible
+    print("Joint Genetic Algorithm completed.")
+    return results
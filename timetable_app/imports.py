@@ -0,0 +1,262 @@
+import itertools
+import logging
+import time
+from collections import Counter
+
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .board import master_data_changed
+from . import projections
+from .models import Registration, Student, Class, Course, Faculty
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+# Individual field changes listed in an upsert's diff; all of them are counted
+CHANGES_KEPT = 100
+
+# insert: add rows, reject a known primary key with other values; upsert: update such rows in place
+MODES = ['insert', 'upsert']
+
+# Columns of uploaded files that name another table's primary key
+FOREIGN_KEYS = {
+    Registration: {'stud_id': Student, 'main_id': Class},
+}
+
+
+class ImportReport:
+    """Outcome of one file import: row counts, field changes, rejected rows and throughput."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0  # already stored with the same values, or by another writer meanwhile
+        self.duplicates = 0  # repeated within the file
+        self.rejected = []  # (line in the file, reason)
+        self.changed_fields = Counter()  # field: rows updated with a new value for it
+        self.changes = []  # (line, primary key, field, old value, new value), the first CHANGES_KEPT
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def reject(self, lines, reason):
+        self.rejected.extend((int(line), reason) for line in lines)
+
+    def summary(self):
+        fields = ', '.join(f"{field}: {count}" for field, count in self.changed_fields.most_common())
+        return (
+            f"{self.rows} rows: {self.created} created, {self.updated} updated{f' ({fields})' if fields else ''}, "
+            f"{self.unchanged} unchanged, {self.duplicates} duplicates, {len(self.rejected)} rejected"
+        )
+
+
+def _cell_text(value):
+    # Excel hands back numbers; ids like 101 must not become '101.0'
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def read_chunks(file, chunk_size=CHUNK_SIZE):
+    """DataFrames of at most ``chunk_size`` rows, every cell as text; the index is the line in the file."""
+    if file.name.endswith('.csv'):
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            chunk.index += 2  # line 1 is the header
+            yield chunk
+        return
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell_text(cell) for cell in next(rows, ())]
+        line = 2
+        while True:
+            block = list(itertools.islice(rows, chunk_size))
+            if not block:
+                break
+            yield pd.DataFrame(
+                [[_cell_text(cell) for cell in row] for row in block],
+                columns=header, index=range(line, line + len(block)),
+            )
+            line += len(block)
+    finally:
+        workbook.close()
+
+
+def _typed(model, df, column, report):
+    """``df`` with ``column`` converted to the model field's Python type; rows that do not convert are rejected."""
+    field = model._meta.get_field(column)
+    target = FOREIGN_KEYS.get(model, {}).get(column)
+    converter = target._meta.pk if target else field
+    values = {}
+    for raw in df[column].unique():
+        try:
+            # An empty cell is NULL where the column allows it and has no empty value of its own
+            values[raw] = None if raw == '' and field.null and not field.empty_strings_allowed else converter.to_python(raw)
+        except ValidationError:
+            pass
+    ok = df[column].isin(list(values))
+    report.reject(df.index[~ok], f"invalid {column}")
+    df = df[ok].copy()
+    df[column] = df[column].map(values)
+
+    if target is not None:
+        # One query per referenced table for the whole chunk
+        found = target.objects.in_bulk({value for value in values.values() if value is not None})
+        ok = df[column].isin(list(found))
+        for line, value in df.loc[~ok, column].items():
+            report.reject([line], f"{target.__name__} with ID {value} does not exist")
+        df = df[ok]
+    return df
+
+
+def _sharing_keys(model, df, required_columns):
+    """Queryset of the model's rows that share a key with the chunk."""
+    pk = model._meta.pk.name
+    lookup = [pk] if pk in required_columns else list(FOREIGN_KEYS.get(model, ())) or required_columns[:1]
+    return model.objects.filter(**{f"{column}__in": set(df[column]) for column in lookup})
+
+
+def _existing(model, df, required_columns):
+    """The model's rows that share a key with the chunk, as text, from one query."""
+    rows = _sharing_keys(model, df, required_columns).values_list(*required_columns)
+    return pd.DataFrame(list(rows), columns=required_columns).fillna('').astype(str).drop_duplicates()
+
+
+def _diff(unique, existing, pk, required_columns, report):
+    """Count the fields an upsert changes, and keep the first few changes for the diff."""
+    new = unique.fillna('').astype(str)
+    old = new[[pk]].merge(existing.drop_duplicates(subset=[pk]), how='left', on=pk)
+    for column in required_columns:
+        if column == pk:
+            continue
+        changed = new[column].to_numpy() != old[column].to_numpy()
+        report.changed_fields[column] += int(changed.sum())
+        room = CHANGES_KEPT - len(report.changes)
+        if room > 0:
+            for line, key, before, after in itertools.islice(
+                zip(unique.index[changed], new[pk][changed], old[column][changed], new[column][changed]), room
+            ):
+                report.changes.append((int(line), key, column, before, after))
+
+
+def import_chunk(model, df, required_columns, report, batch_size=BATCH_SIZE, mode='insert'):
+    """Validate, dedupe and write one chunk.
+
+    Rows are classified as insert, update or unchanged in one pass: a merge of
+    the chunk against the stored rows that share its keys.
+    """
+    report.rows += len(df)
+    df = df[required_columns]
+    for column in required_columns:
+        df = _typed(model, df, column, report)
+
+    unique = df.drop_duplicates(subset=required_columns)
+    report.duplicates += len(df) - len(unique)
+
+    # Vectorized dedupe against the database: merge on every column, as text
+    existing = _existing(model, unique, required_columns)
+    text = unique.fillna('').astype(str)
+    merged = text.merge(existing, how='left', on=required_columns, indicator=True)
+    new = (merged['_merge'] == 'left_only').to_numpy()
+    report.unchanged += int((~new).sum())
+    unique = unique[new]
+
+    updates = unique.iloc[:0]
+    pk = model._meta.pk.name
+    if pk in required_columns:
+        repeated = unique[pk].duplicated()
+        report.reject(unique.index[repeated], f"{pk} appears more than once with different values")
+        unique = unique[~repeated]
+        known = unique[pk].astype(str).isin(set(existing[pk])).to_numpy()
+        if mode == 'upsert':
+            updates = unique[known]
+            _diff(updates, existing, pk, required_columns, report)
+        else:
+            report.reject(unique.index[known], f"{pk} already exists with different values")
+        unique = unique[~known]
+
+    attnames = [model._meta.get_field(column).attname for column in required_columns]
+    records = [model(**dict(zip(attnames, values))) for values in unique.itertuples(index=False, name=None)]
+    changed = [model(**dict(zip(attnames, values))) for values in updates.itertuples(index=False, name=None)]
+    inserted = 0
+    with transaction.atomic():
+        if records:
+            # ignore_conflicts silently drops rows another writer stored since the dedupe,
+            # so count what actually landed
+            stored = _sharing_keys(model, unique, required_columns)
+            before = stored.count()
+            model.objects.bulk_create(records, batch_size=batch_size, ignore_conflicts=True)
+            inserted = stored.count() - before
+        if changed:
+            fields = [column for column in required_columns if column != pk]
+            model.objects.bulk_update(changed, fields, batch_size=batch_size)
+        # bulk_create and bulk_update send no post_save; rebuild the affected projections once committed
+        if model is Registration and records:
+            projections.changed(owners=[('student', stud_id) for stud_id in set(unique['stud_id'])])
+        elif model is Course and changed:
+            # Projected entries carry course names and codes
+            projections.changed(classes=Class.objects.filter(course__in=[course.pk for course in changed]).values_list('main_id', flat=True))
+    if inserted < len(records):
+        logger.warning(f"{len(records) - inserted} {model.__name__} rows were stored by another writer during the import")
+    report.created += inserted
+    report.unchanged += len(records) - inserted
+    report.updated += len(changed)
+
+
+def count_rows(path):
+    """Data rows in a spooled file, read cheaply up front for progress and ETA; None if unknown."""
+    if str(path).endswith('.csv'):
+        lines = 0
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                lines += block.count(b'\n')
+            if f.tell() and not block.endswith(b'\n'):
+                lines += 1  # no newline after the last row
+        return max(lines - 1, 0)
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.max_row
+    finally:
+        workbook.close()
+    return rows - 1 if rows else None
+
+
+def import_file(model, file, required_columns, chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE, progress=None, mode='insert'):
+    """Stream an uploaded CSV or Excel file into ``model`` chunk by chunk; returns an ImportReport.
+
+    In ``upsert`` mode rows whose primary key is already stored update that
+    row, and only rows that differ are written. Every chunk is committed on
+    its own, and ``progress(report)`` is called after each one. Raises
+    ValidationError if the file lacks one of ``required_columns``.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    for df in read_chunks(file, chunk_size):
+        missing = [column for column in required_columns if column not in df.columns]
+        if missing:
+            raise ValidationError(f"Invalid file format! Required columns: {', '.join(required_columns)}.")
+        import_chunk(model, df, required_columns, report, batch_size, mode)
+        if progress is not None:
+            report.seconds = time.perf_counter() - started
+            progress(report)
+    report.seconds = time.perf_counter() - started
+    report.rejected.sort()
+    if model in (Course, Faculty) and (report.created or report.updated):
+        # bulk_create and bulk_update send no signals; cached boards show names and hours
+        master_data_changed()
+    logger.info(f"Imported {model.__name__} ({mode}): {report.summary()}, {report.rows_per_second:.0f} rows/s")
+    return report
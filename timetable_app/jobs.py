@@ -0,0 +1,241 @@
+import heapq
+import logging
+import os
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SolverJob, TimetableStatus, ImportJob
+
+logger = logging.getLogger(__name__)
+
+STALE_ERROR = "The worker stopped updating this job; it was probably killed."
+# Rejected rows listed on an import job; all of them are counted
+IMPORT_REJECTS_KEPT = 100
+
+
+def _heartbeat_cutoff():
+    """Running jobs last updated before this have lost their worker."""
+    return timezone.now() - timedelta(seconds=getattr(settings, 'JOB_HEARTBEAT_TIMEOUT', 15 * 60))
+
+
+def _live(jobs):
+    """``jobs`` that are queued, or running with a recent heartbeat."""
+    return jobs.filter(Q(status='queued') | Q(status='running', updated_at__gte=_heartbeat_cutoff()))
+
+
+def _fail_stale(model):
+    """Mark running jobs without a recent heartbeat failed, and return them."""
+    with transaction.atomic():
+        stale = list(model.objects.select_for_update(skip_locked=True).filter(status='running', updated_at__lt=_heartbeat_cutoff()))
+        if stale:
+            now = timezone.now()
+            model.objects.filter(pk__in=[job.pk for job in stale]).update(status='failed', error=STALE_ERROR, finished_at=now, updated_at=now)
+    for job in stale:
+        logger.warning(f"{model.__name__} {job.pk} failed: no heartbeat since {job.updated_at}")
+    return stale
+
+
+def enqueue_solve(timetable_status, engine='ga'):
+    """Queue a solve for the section, or return the one already queued or still running."""
+    with transaction.atomic():
+        TimetableStatus.objects.select_for_update().filter(pk=timetable_status.pk).first()
+        job = _live(timetable_status.solver_jobs.all()).first()
+        if job is None:
+            job = SolverJob.objects.create(timetable_status=timetable_status, engine=engine)
+    return job
+
+
+def _claim_next(model):
+    with transaction.atomic():
+        job = (model.objects.select_for_update(skip_locked=True)
+               .filter(status='queued').order_by('created_at', 'id').first())
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest queued solve as running and return it; None if the queue is empty.
+
+    Solves whose worker died are failed first.
+    """
+    _fail_stale(SolverJob)
+    return _claim_next(SolverJob)
+
+
+def claim_next_import():
+    """Mark the oldest queued import as running and return it; None if the queue is empty.
+
+    Imports whose worker died are failed first, and their spooled files removed.
+    """
+    for job in _fail_stale(ImportJob):
+        _remove_spooled(job.path)
+    return _claim_next(ImportJob)
+
+
+def claim_next():
+    """Claim the oldest queued job of either kind, so imports never wait behind a long run of solves."""
+    heads = []
+    for model, claim in ((SolverJob, claim_next_job), (ImportJob, claim_next_import)):
+        created = model.objects.filter(status='queued').order_by('created_at', 'id').values_list('created_at', flat=True).first()
+        if created is not None:
+            heads.append((created, claim))
+    for _, claim in sorted(heads, key=lambda head: head[0]):
+        job = claim()
+        if job is not None:
+            return job
+    return None
+
+
+class JobAbandoned(Exception):
+    """Raised by job_progress to stop a run whose job row is no longer running."""
+
+
+def job_progress(job_id):
+    """Progress callback for run_ga_logic that records the run's position on the job row.
+
+    Raises JobAbandoned once the row has left 'running', e.g. when another
+    worker failed it as stale, so the run stops before it saves anything.
+    """
+    def report(attempt, generation, generations, best_fitness, feasible=False):
+        best = None if best_fitness == -float('inf') else best_fitness
+        if not SolverJob.objects.filter(pk=job_id, status='running').update(
+            attempt=attempt, generation=generation, generations=generations,
+            best_fitness=best, feasible=feasible, updated_at=timezone.now(),
+        ):
+            raise JobAbandoned(f"Solver job {job_id} is no longer running")
+    return report
+
+
+def run_job(job):
+    from .ga import run_ga_logic
+
+    status = job.timetable_status
+    logger.info(f"Solver job {job.pk} started for {status.academic_year} sem {status.semester} {status.dept}-{status.section}")
+    try:
+        result = run_ga_logic(status.academic_year, status.semester, status.section, status.dept, progress=job_progress(job.pk), engine=job.engine)
+    except JobAbandoned as e:
+        logger.warning(f"{e}; stopped")
+        return False
+    except Exception as e:
+        logger.exception(f"Solver job {job.pk} failed")
+        SolverJob.objects.filter(pk=job.pk, status='running').update(status='failed', error=str(e), finished_at=timezone.now(), updated_at=timezone.now())
+        return False
+    # A job failed as stale while its run went on stays failed; it may already have been replaced
+    if not SolverJob.objects.filter(pk=job.pk, status='running').update(
+        status='completed', feasible=result.requirements_met, finished_at=timezone.now(), updated_at=timezone.now(),
+    ):
+        logger.warning(f"Solver job {job.pk} finished after it stopped running; left as it is")
+        return False
+    logger.info(f"Solver job {job.pk} completed")
+    return True
+
+
+def enqueue_import(model, required_columns, upload, mode='insert'):
+    """Spool an uploaded file to IMPORT_SPOOL_DIR and queue its import into ``model``."""
+    spool = Path(settings.IMPORT_SPOOL_DIR)
+    spool.mkdir(parents=True, exist_ok=True)
+    # The original name is kept as a suffix: the reader picks CSV or Excel by extension
+    path = spool / f"{uuid.uuid4().hex}-{Path(upload.name).name}"
+    with open(path, 'wb') as out:
+        for chunk in upload.chunks():
+            out.write(chunk)
+    return ImportJob.objects.create(
+        model=model.__name__, columns=','.join(required_columns), mode=mode,
+        file_name=upload.name, path=str(path), size=upload.size,
+    )
+
+
+def import_progress(job_id):
+    """Progress callback for import_file that records the counts so far on the job row."""
+    def report(import_report):
+        rejected = import_report.rejected
+        ImportJob.objects.filter(pk=job_id).update(
+            rows=import_report.rows, created=import_report.created, updated=import_report.updated,
+            unchanged=import_report.unchanged, duplicates=import_report.duplicates,
+            rejected=len(rejected),
+            rejected_rows='\n'.join(f"{line}: {reason}" for line, reason in heapq.nsmallest(IMPORT_REJECTS_KEPT, rejected)),
+            changes='\n'.join(f"{line}: {key} {field} {old!r} -> {new!r}" for line, key, field, old, new in import_report.changes),
+            updated_at=timezone.now(),
+        )
+    return report
+
+
+def _remove_spooled(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def run_import_job(job):
+    from .imports import count_rows, import_file
+
+    logger.info(f"Import job {job.pk} started: {job.model} from {job.file_name}")
+    error = None
+    try:
+        ImportJob.objects.filter(pk=job.pk).update(rows_total=count_rows(job.path), updated_at=timezone.now())
+        model = apps.get_model('timetable_app', job.model)
+        with open(job.path, 'rb') as file:
+            # Each chunk commits on its own; rows already in are skipped if the file is imported again
+            import_file(model, file, job.columns.split(','), progress=import_progress(job.pk), mode=job.mode)
+    except ValidationError as e:
+        error = e.messages[0]
+    except Exception as e:
+        logger.exception(f"Import job {job.pk} failed")
+        error = str(e)
+    finally:
+        _remove_spooled(job.path)
+    if error is not None:
+        ImportJob.objects.filter(pk=job.pk).update(status='failed', error=error, finished_at=timezone.now(), updated_at=timezone.now())
+        return False
+    ImportJob.objects.filter(pk=job.pk).update(status='completed', finished_at=timezone.now(), updated_at=timezone.now())
+    logger.info(f"Import job {job.pk} completed")
+    return True
+
+
+def run_worker(poll_interval=2.0, once=False):
+    """Run queued solves and imports one after another, oldest first; with ``once`` stop when both queues are empty."""
+    processed = 0
+    while True:
+        job = claim_next()
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        if isinstance(job, SolverJob):
+            run_job(job)
+        else:
+            run_import_job(job)
+        processed += 1
+
+
+def eta_seconds(job):
+    """Seconds left in the current attempt, from the average time per generation so far."""
+    if job.status != 'running' or not job.started_at or not job.generation or not job.generations:
+        return None
+    elapsed = (job.updated_at - job.started_at).total_seconds()
+    done = job.attempt * job.generations + job.generation
+    remaining = max(job.generations - job.generation, 0)
+    return round(elapsed / done * remaining, 1)
+
+
+def import_eta_seconds(job):
+    """Seconds left in an import, from its rows per second so far."""
+    if job.status != 'running' or not job.started_at or not job.rows or job.rows_total is None:
+        return None
+    elapsed = (job.updated_at - job.started_at).total_seconds()
+    return round(elapsed / job.rows * max(job.rows_total - job.rows, 0), 1)
@@ -0,0 +1,141 @@
+import contextlib
+import csv
+import io
+import json
+import statistics
+import sys
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from timetable_app import ga
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIELDS = ['instance', 'run', 'seed', 'wall_seconds', 'queries', 'generations_to_feasible', 'retries', 'best_fitness', 'requirements_met', 'peak_rss_kb']
+
+
+def peak_rss_kb():
+    # Peak of the whole process so far (ru_maxrss is in KB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+
+def bench_run(year, semester, section, dept, seed, **options):
+    """Solve one section once and roll everything back; returns the run's measurements."""
+    counter = {'done': 0, 'attempt': 0, 'last': 0, 'feasible': None}
+
+    def progress(attempt, generation, generations, best_fitness, feasible=False):
+        # Generations are counted across restarts
+        if attempt != counter['attempt']:
+            counter['done'] += counter['last']
+            counter['attempt'] = attempt
+        counter['last'] = generation
+        if feasible and counter['feasible'] is None:
+            counter['feasible'] = counter['done'] + generation
+
+    # Every run starts cold: no warm start from the previous run's best
+    cache.delete(ga.section_cache_key(year, semester, section, dept))
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries, transaction.atomic():
+        result = ga.run_ga_logic(
+            year, semester, section, dept, seed=seed,
+            progress=progress,
+            **options,
+        )
+        # Leave the database as it was, so every run solves the same instance
+        transaction.set_rollback(True)
+    wall = time.perf_counter() - started
+    cache.delete(ga.section_cache_key(year, semester, section, dept))
+    if counter['feasible'] is None and result.requirements_met:
+        counter['feasible'] = counter['done'] + counter['last']  # solved by backtracking or the final repair
+    return {
+        'seed': seed,
+        'wall_seconds': round(wall, 3),
+        'queries': len(queries.captured_queries),
+        'generations_to_feasible': counter['feasible'],
+        'retries': result.restarts,
+        'best_fitness': result.best_fitness,
+        'requirements_met': result.requirements_met,
+        'peak_rss_kb': peak_rss_kb(),
+        'profile': result.profile,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the solver: run it N times per section and report time, queries, generations, retries, fitness and memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('instances', nargs='+', metavar='YEAR:SEMESTER:DEPT:SECTION', help="Sections to solve, e.g. 2025_even:4:CSE:1.")
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the first run; run i uses seed + i.")
+        parser.add_argument('--format', choices=['json', 'csv'], default='json')
+        parser.add_argument('--output', help="File to write the report to (default: stdout).")
+        parser.add_argument('--engine', choices=['ga', 'backtracking'], default=None)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--islands', type=int, default=None)
+        parser.add_argument('--max-restarts', type=int, default=None)
+        parser.add_argument('--local-search', type=int, default=None)
+        parser.add_argument('--profile', action='store_true', help="Add the per-phase and per-rule profile of each run (JSON only).")
+
+    def handle(self, *args, **options):
+        instances = []
+        for spec in options['instances']:
+            parts = spec.split(':')
+            if len(parts) != 4:
+                raise CommandError(f"Expected YEAR:SEMESTER:DEPT:SECTION, got {spec!r}")
+            instances.append(parts)
+        solver_options = {
+            'engine': options['engine'],
+            'workers': options['workers'],
+            'islands': options['islands'],
+            'max_restarts': options['max_restarts'],
+            'local_search': options['local_search'],
+            'profile': options['profile'],
+        }
+
+        rows = []
+        for year, semester, dept, section in instances:
+            name = f"{year}:{semester}:{dept}:{section}"
+            for run in range(options['runs']):
+                # The solver prints its progress; keep stdout for the report
+                with contextlib.redirect_stdout(sys.stderr):
+                    measured = bench_run(year, semester, section, dept, options['seed'] + run, **solver_options)
+                rows.append({'instance': name, 'run': run, **measured})
+                self.stderr.write(f"{name} run {run}: {measured['wall_seconds']}s, {measured['queries']} queries, fitness {measured['best_fitness']}")
+
+        report = io.StringIO()
+        if options['format'] == 'csv':
+            writer = csv.DictWriter(report, fieldnames=FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            summary = {}
+            for name in dict.fromkeys(row['instance'] for row in rows):
+                runs = [row for row in rows if row['instance'] == name]
+                wall = [row['wall_seconds'] for row in runs]
+                summary[name] = {
+                    'runs': len(runs),
+                    'wall_seconds_median': statistics.median(wall),
+                    'wall_seconds_max': max(wall),
+                    'queries_median': statistics.median(row['queries'] for row in runs),
+                    'feasible_runs': sum(row['requirements_met'] for row in runs),
+                    'retries_total': sum(row['retries'] for row in runs),
+                    'best_fitness_median': statistics.median(row['best_fitness'] for row in runs),
+                }
+            if not options['profile']:
+                for row in rows:
+                    del row['profile']
+            json.dump({'runs': rows, 'summary': summary}, report, indent=2)
+            report.write('\n')
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as out:
+                out.write(report.getvalue())
+        else:
+            self.stdout.write(report.getvalue(), ending='')
@@ -0,0 +1,136 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from timetable_app.models import Faculty, Course, Class, Student, Registration
+from timetable_app.occupancy import invalidate
+from timetable_app.board import master_data_changed
+
+DEPT_CODES = ['CSE', 'ECE', 'EEE', 'MECH', 'CIVIL', 'IT', 'AIDS', 'CHEM', 'BIO', 'AERO']
+# (course_type, label, courses per department, hours_per_week choices, faculty per class)
+COURSE_MIX = [
+    ('none', 'Core', 5, (3, 4), 1),  # main courses: never adjacent, at most two a day
+    ('dept', 'Lab', 3, (2, 3), 2),  # labs and department electives, taught in pairs
+]
+# Shared across departments (offered_to='all', no section)
+TT_COURSES = [('OE', 4), ('CLUB', 1)]
+
+
+class Command(BaseCommand):
+    help = "Fill faculty, courses, classes, students and registrations with a reproducible synthetic institution."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', default='2030_even', help="Academic year of the generated classes.")
+        parser.add_argument('--semester', default='4')
+        parser.add_argument('--depts', type=int, default=4)
+        parser.add_argument('--sections', type=int, default=3, help="Sections per department.")
+        parser.add_argument('--faculty', type=int, default=20, help="Faculty per department.")
+        parser.add_argument('--students', type=int, default=60, help="Students per section.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='SYN', help="Prefix of every generated id, so the data can be told apart and cleared.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help="Delete previously generated data with this prefix first.")
+
+    def handle(self, *args, **options):
+        prefix, year, semester = options['prefix'], options['year'], options['semester']
+        batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        if options['faculty'] < 2:
+            raise CommandError("Every department needs at least 2 faculty.")
+
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = Class.objects.filter(course__course_id__startswith=prefix).delete()
+                Course.objects.filter(course_id__startswith=prefix).delete()
+                Faculty.objects.filter(faculty_id__startswith=prefix).delete()
+                Student.objects.filter(stud_id__startswith=prefix).delete()
+                self.stdout.write(f"Cleared earlier {prefix} data ({deleted} rows with classes).")
+            elif Faculty.objects.filter(faculty_id__startswith=prefix).exists():
+                raise CommandError(f"Data with prefix {prefix} already exists; pass --clear to replace it.")
+
+            depts = [DEPT_CODES[d] if d < len(DEPT_CODES) else f"D{d + 1}" for d in range(options['depts'])]
+            sections = [str(i) for i in range(1, options['sections'] + 1)]
+
+            faculty = {
+                dept: [Faculty(faculty_id=f"{prefix}F{d}-{i}", faculty_name=f"{dept} Faculty {i}", department=dept) for i in range(1, options['faculty'] + 1)]
+                for d, dept in enumerate(depts)
+            }
+            Faculty.objects.bulk_create([f for members in faculty.values() for f in members], batch_size=batch_size)
+
+            courses = {dept: [] for dept in depts}
+            for d, dept in enumerate(depts):
+                for course_type, label, count, hours, teachers in COURSE_MIX:
+                    for i in range(1, count + 1):
+                        courses[dept].append((Course(
+                            course_id=f"{prefix}C{d}{label[0]}{i}",
+                            name=f"{dept} {label} {i}",
+                            code=f"{dept[:4]}{label[0]}{i}",
+                            course_type=course_type,
+                            hours_per_week=rng.choice(hours),
+                            offered_to=dept,
+                        ), teachers))
+            tt_courses = [
+                Course(course_id=f"{prefix}T{i}", name=name, code=name, course_type='tt', hours_per_week=hours, offered_to='all')
+                for i, (name, hours) in enumerate(TT_COURSES, start=1)
+            ]
+            Course.objects.bulk_create([course for members in courses.values() for course, _ in members] + tt_courses, batch_size=batch_size)
+
+            # Classes: one per course and section, plus one shared class per tt course
+            classes, teachers_of = [], {}
+            for dept in depts:
+                pool = faculty[dept][:]
+                rng.shuffle(pool)
+                turn = 0
+                for section in sections:
+                    for index, (course, teachers) in enumerate(courses[dept]):
+                        venue = f"{dept}-{section}" if course.course_type == 'none' else f"{dept}-LAB{index % 3 + 1}"
+                        classes.append(Class(course=course, section_id=section, dept=dept, venue=venue, academic_year=year, semester=semester))
+                        # Round-robin keeps teaching loads even
+                        teachers_of[(course.course_id, section, dept)] = [pool[(turn + k) % len(pool)].faculty_id for k in range(teachers)]
+                        turn += teachers
+            all_faculty = [f for members in faculty.values() for f in members]
+            for course in tt_courses:
+                classes.append(Class(course=course, section_id=None, dept=None, venue='Hall', academic_year=year, semester=semester))
+                teachers_of[(course.course_id, None, None)] = [rng.choice(all_faculty).faculty_id]
+            Class.objects.bulk_create(classes, batch_size=batch_size)
+
+            # bulk_create does not return ids on every backend, so read them back in one query
+            main_ids = {
+                (course_id, section, dept): main_id
+                for main_id, course_id, section, dept in Class.objects.filter(
+                    academic_year=year, semester=semester, course__course_id__startswith=prefix,
+                ).values_list('main_id', 'course_id', 'section_id', 'dept')
+            }
+            Through = Class.faculty.through
+            Through.objects.bulk_create(
+                [Through(class_id=main_ids[key], faculty_id=fid) for key, fids in teachers_of.items() for fid in fids],
+                batch_size=batch_size,
+            )
+
+            students, registrations = [], []
+            number = 0
+            for dept in depts:
+                for section in sections:
+                    section_classes = [main_ids[(course.course_id, section, dept)] for course, _ in courses[dept]]
+                    for _ in range(options['students']):
+                        number += 1
+                        stud_id = f"{prefix}S{number:07d}"
+                        students.append(Student(stud_id=stud_id, name=f"Student {number}", department=dept))
+                        chosen = section_classes + [main_ids[(rng.choice(tt_courses).course_id, None, None)]]
+                        registrations.extend(Registration(stud_id_id=stud_id, main_id_id=main_id) for main_id in chosen)
+            Student.objects.bulk_create(students, batch_size=batch_size)
+            Registration.objects.bulk_create(registrations, batch_size=batch_size)
+
+            # bulk_create sends no signals; occupancy indexes and boards cached by any process must reload
+            invalidate(year)
+            master_data_changed()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(all_faculty)} faculty, {sum(map(len, courses.values())) + len(tt_courses)} courses, "
+            f"{len(classes)} classes, {len(students)} students and {len(registrations)} registrations "
+            f"for {year} semester {semester} in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from timetable_app.ga import run_joint_ga_logic
+
+
+class Command(BaseCommand):
+    help = "Solve every section of an academic year and semester together in one run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', help="Academic year, e.g. 2025_even.")
+        parser.add_argument('semester')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        results = run_joint_ga_logic(options['year'], options['semester'], seed=options['seed'], workers=options['workers'])
+        for (section, dept), feasible in results.items():
+            self.stdout.write(f"{dept}-{section}: {'completed' if feasible else 'partial'}")
+        self.stdout.write(self.style.SUCCESS(f"Solved {sum(results.values())} of {len(results)} section(s)."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from timetable_app.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued timetable solves (SolverJob rows) and data imports (ImportJob rows) outside the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds to wait between polls of an empty queue.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        processed = run_worker(poll_interval=options['poll'], once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolverJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempt', models.IntegerField(default=0)),
+                ('generation', models.IntegerField(default=0)),
+                ('generations', models.IntegerField(default=0)),
+                ('best_fitness', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('timetable_status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solver_jobs', to='timetable_app.timetablestatus')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='timetable_a_status_27bafd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable_app', '0002_solverjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solverjob',
+            name='engine',
+            field=models.CharField(choices=[('ga', 'Genetic Algorithm'), ('backtracking', 'Backtracking')], default='ga', max_length=20),
+        ),
+    ]
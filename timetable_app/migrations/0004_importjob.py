@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable_app', '0003_solverjob_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('columns', models.CharField(max_length=200)),
+                ('file_name', models.CharField(max_length=255)),
+                ('path', models.CharField(max_length=500)),
+                ('size', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('rows_total', models.IntegerField(blank=True, null=True)),
+                ('rows', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('duplicates', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('rejected_rows', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='timetable_a_status_65e628_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable_app', '0005_importjob_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimetableProjection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_type', models.CharField(choices=[('student', 'Student'), ('faculty', 'Faculty')], max_length=10)),
+                ('owner_id', models.CharField(max_length=20)),
+                ('academic_year', models.CharField(max_length=10)),
+                ('semester', models.CharField(max_length=10)),
+                ('entries', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('owner_id', 'academic_year', 'semester', 'owner_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable_app', '0007_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solverjob',
+            name='feasible',
+            field=models.BooleanField(default=False),
+        ),
+    ]
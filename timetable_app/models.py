@@ -90,4 +90,100 @@ class TimetableStatus(models.Model):
         unique_together = ('academic_year', 'semester', 'section', 'dept')
     
     def __str__(self):
-        return self.status
\ No newline at end of file
+        return self.status
+
+
+class SolverJob(models.Model):
+    """A queued GA solve for one section, run by the solver worker outside the request."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    ENGINE_CHOICES = [
+        ('ga', 'Genetic Algorithm'),
+        ('backtracking', 'Backtracking'),
+    ]
+    timetable_status = models.ForeignKey(TimetableStatus, on_delete=models.CASCADE, related_name='solver_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    engine = models.CharField(max_length=20, choices=ENGINE_CHOICES, default='ga')
+    attempt = models.IntegerField(default=0)
+    generation = models.IntegerField(default=0)
+    generations = models.IntegerField(default=0)
+    best_fitness = models.IntegerField(blank=True, null=True)
+    # Whether the best timetable so far breaks no rule; once completed, whether the saved one meets every requirement
+    feasible = models.BooleanField(default=False)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Solve {self.timetable_status.academic_year} sem {self.timetable_status.semester} {self.timetable_status.dept}-{self.timetable_status.section}: {self.status}"
+
+
+class ImportJob(models.Model):
+    """An uploaded data file spooled to disk and ingested by the worker outside the request."""
+    STATUS_CHOICES = SolverJob.STATUS_CHOICES
+    model = models.CharField(max_length=50)
+    columns = models.CharField(max_length=200)
+    mode = models.CharField(max_length=10, choices=[('insert', 'Insert new rows'), ('upsert', 'Insert or update by ID')], default='insert')
+    file_name = models.CharField(max_length=255)
+    path = models.CharField(max_length=500)
+    size = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    rows_total = models.IntegerField(blank=True, null=True)
+    rows = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    unchanged = models.IntegerField(default=0)
+    duplicates = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    rejected_rows = models.TextField(blank=True, default="")  # the first few, one "line: reason" per line
+    changes = models.TextField(blank=True, default="")  # the first few field changes of an upsert
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Import {self.model} from {self.file_name}: {self.status}"
+
+
+class TimetableProjection(models.Model):
+    """A student's or faculty member's finalized week in one semester, kept by projections.py."""
+    OWNER_CHOICES = [
+        ('student', 'Student'),
+        ('faculty', 'Faculty'),
+    ]
+    owner_type = models.CharField(max_length=10, choices=OWNER_CHOICES)
+    owner_id = models.CharField(max_length=20)
+    academic_year = models.CharField(max_length=10)
+    semester = models.CharField(max_length=10)
+    entries = models.JSONField(default=list)  # [day, slot, course name, course code, venue], by day and slot
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Leads with owner_id: view_timetable looks a typed-in ID up with one indexed read
+        unique_together = ('owner_id', 'academic_year', 'semester', 'owner_type')
+
+    def __str__(self):
+        return f"{self.owner_type} {self.owner_id} {self.academic_year} sem {self.semester}"
+
+
+class DataVersion(models.Model):
+    """A token replaced by every write to some data, e.g. one academic year's Timetable rows; see versions.py."""
+    name = models.CharField(max_length=100, primary_key=True)
+    token = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.name}: {self.token}"
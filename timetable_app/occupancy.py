@@ -0,0 +1,256 @@
+import logging
+import threading
+from collections import defaultdict
+
+import numpy as np
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Timetable, Class
+from .validators import ClassInfo, TimetableSnapshot, EXEMPT_VENUES
+from . import versions
+
+logger = logging.getLogger(__name__)
+
+DAY_COUNT, SLOT_COUNT = 6, 8
+
+
+class OccupancyIndex:
+    """Who is busy in every (day, slot) of one academic year, kept in memory.
+
+    Built from the year's classes and a single ``values_list`` scan of its
+    Timetable rows, then kept current by the model signals below, which
+    apply each created or deleted row to it; the manual assignment flow and
+    the GA read occupancy from it without querying:
+
+    - ``cells``: (day, slot) -> {main_id, ...}, shared with the ``view`` snapshots;
+    - ``faculty`` / ``venue``: id -> day x slot counts; ``faculty_busy`` and
+      ``venue_busy`` are O(1) lookups;
+    - ``sections``: (semester, section_id, dept) -> {(day, slot): {main_id, ...}}.
+
+    Counts rather than bits are stored so that deleting one of two clashing
+    rows leaves the cell busy.
+    """
+
+    def __init__(self, academic_year, classes, rows, version=''):
+        self.academic_year = academic_year
+        self.version = version
+        self.classes = {info.main_id: info for info in classes}
+        self.rows = defaultdict(int)  # (main_id, day, slot): number of rows
+        self.cells = defaultdict(set)
+        self.faculty = defaultdict(lambda: np.zeros((DAY_COUNT, SLOT_COUNT), dtype=np.int16))
+        self.venue = defaultdict(lambda: np.zeros((DAY_COUNT, SLOT_COUNT), dtype=np.int16))
+        self.sections = defaultdict(lambda: defaultdict(set))
+        self.views = {}
+        for main_id, day, slot in rows:
+            self.add(main_id, day, slot)
+
+    @classmethod
+    def load(cls, academic_year, version=''):
+        classes = [
+            ClassInfo(
+                main_id=c.main_id,
+                course_name=c.course.name,
+                course_type=c.course.course_type,
+                offered_to=c.course.offered_to,
+                section_id=c.section_id,
+                dept=c.dept,
+                semester=str(c.semester),
+                venue=c.venue,
+                faculty=tuple((f.faculty_id, f.faculty_name) for f in c.faculty.all()),
+            )
+            for c in Class.objects.filter(academic_year=academic_year).select_related('course').prefetch_related('faculty')
+        ]
+        rows = Timetable.objects.filter(main_id__academic_year=academic_year).values_list('main_id', 'day', 'slot')
+        return cls(academic_year, classes, rows, version)
+
+    def _grids(self, info):
+        grids = [self.faculty[fid] for fid, _ in info.faculty]
+        if info.venue not in EXEMPT_VENUES:
+            grids.append(self.venue[info.venue])
+        return grids
+
+    def add(self, main_id, day, slot):
+        info = self.classes.get(main_id)
+        if info is None:
+            return
+        self.rows[(main_id, day, slot)] += 1
+        for grid in self._grids(info):
+            grid[day - 1, slot - 1] += 1
+        self.cells[(day, slot)].add(main_id)
+        self.sections[(info.semester, info.section_id, info.dept)][(day, slot)].add(main_id)
+
+    def remove(self, main_id, day, slot):
+        info = self.classes.get(main_id)
+        if info is None or not self.rows.get((main_id, day, slot)):
+            return
+        self.rows[(main_id, day, slot)] -= 1
+        for grid in self._grids(info):
+            grid[day - 1, slot - 1] -= 1
+        if not self.rows[(main_id, day, slot)]:
+            del self.rows[(main_id, day, slot)]
+            self.cells[(day, slot)].discard(main_id)
+            self.sections[(info.semester, info.section_id, info.dept)][(day, slot)].discard(main_id)
+
+    def faculty_busy(self, faculty_id, day, slot):
+        grid = self.faculty.get(faculty_id)
+        return grid is not None and grid[day - 1, slot - 1] > 0
+
+    def venue_busy(self, venue, day, slot, excluding=None):
+        """Whether a class other than ``excluding`` holds ``venue`` at (day, slot)."""
+        grid = self.venue.get(venue)
+        if grid is None:
+            return False
+        own = self.rows.get((excluding, day, slot), 0) if excluding in self.classes and self.classes[excluding].venue == venue else 0
+        return grid[day - 1, slot - 1] > own
+
+    def section_cell(self, semester, section, dept, day, slot):
+        """main_ids a section has at (day, slot)."""
+        cells = self.sections.get((str(semester), section, dept))
+        return set(cells.get((day, slot), ())) if cells else set()
+
+    def snapshot(self, current_semester):
+        """A TimetableSnapshot of the year, built without touching the database.
+
+        The snapshot is a copy: callers may place candidates into it freely.
+        """
+        return TimetableSnapshot(self.academic_year, current_semester, self.classes.values(), list(self.rows))
+
+    def view(self, current_semester):
+        """A read-only IndexView of the semester, built once and current as rows are applied."""
+        key = str(current_semester)
+        if key not in self.views:
+            self.views[key] = IndexView(self, key)
+        return self.views[key]
+
+
+class IndexView(TimetableSnapshot):
+    """A TimetableSnapshot that shares an OccupancyIndex's cells instead of copying them.
+
+    Slot, venue and faculty lookups go to the index's section cells and count
+    grids; with a ``temp_timetable`` overlay they fall back to the snapshot's
+    own. Never place candidates into it: take ``snapshot`` for that.
+    """
+
+    def __init__(self, index, current_semester):
+        super().__init__(index.academic_year, current_semester, index.classes.values(), ())
+        self.index = index
+        self.cells = index.cells
+
+    def _section_occupants(self, class_info, day, slot, section, dept, temp_timetable):
+        if temp_timetable:
+            return super()._section_occupants(class_info, day, slot, section, dept, temp_timetable)
+        shared = self.index.section_cell(self.current_semester, None, None, day, slot)
+        here = self.index.section_cell(self.current_semester, section, dept, day, slot)
+        here.update(main_id for main_id in shared if self.classes[main_id].offered_to == 'all')
+        here.discard(class_info.main_id)
+        return [self.classes[main_id] for main_id in here]
+
+    def _venue_booked(self, class_info, day, slot, temp_timetable):
+        if temp_timetable:
+            return super()._venue_booked(class_info, day, slot, temp_timetable)
+        return self.index.venue_busy(class_info.venue, day, slot, excluding=class_info.main_id)
+
+    def _faculty_busy(self, class_info, faculty_id, day, slot, temp_timetable):
+        if temp_timetable:
+            return super()._faculty_busy(class_info, faculty_id, day, slot, temp_timetable)
+        return self.index.faculty_busy(faculty_id, day, slot)
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def version_name(academic_year):
+    return f"occupancy:{academic_year}"
+
+
+def version(academic_year):
+    """Token replaced by every write to the year's Timetable rows or classes, read from the database."""
+    return versions.token(version_name(academic_year))
+
+
+def occupancy_index(academic_year):
+    """This process's OccupancyIndex of ``academic_year``, reloaded when another process wrote to the year.
+
+    The check is one query for the year's version token. Writes in this
+    process are applied to the index as they happen and move it to their
+    new token; a write it did not apply leaves it behind, and it is reloaded.
+    """
+    current = version(academic_year)
+    with _lock:
+        index = _indexes.get(academic_year)
+        if index is None or index.version != current:
+            index = _indexes[academic_year] = OccupancyIndex.load(academic_year, current)
+            logger.info(f"Loaded occupancy index of {academic_year}: {len(index.rows)} cells")
+        return index
+
+
+def record_rows(academic_year, rows, added=True):
+    """Apply (main_id, day, slot) rows written in the current transaction to the year's index.
+
+    Signals cover ``create`` and ``delete``; bulk writers call this directly.
+    The version token moves on either way; the index follows it only if it
+    was current before, so a write it missed is never papered over. Should
+    the transaction roll back, the token does too and the index is reloaded.
+    """
+    previous, token = versions.advance(version_name(academic_year))
+    with _lock:
+        index = _indexes.get(academic_year)
+        if index is None:
+            return
+        if index.version != previous or any(main_id not in index.classes for main_id, _, _ in rows):
+            del _indexes[academic_year]
+            return
+        for main_id, day, slot in rows:
+            if added:
+                index.add(main_id, int(day), int(slot))
+            else:
+                index.remove(main_id, int(day), int(slot))
+        index.version = token
+
+
+def invalidate(academic_year):
+    """Mark the year's index stale everywhere; for class changes and bulk writes of unknown rows."""
+    versions.bump(version_name(academic_year))
+    with _lock:
+        _indexes.pop(academic_year, None)
+
+
+def _row_year(row):
+    """Academic year of a Timetable row, without a query when its class is indexed or cached."""
+    for year, index in list(_indexes.items()):
+        if row.main_id_id in index.classes:
+            return year
+    if Timetable.main_id.is_cached(row):
+        return row.main_id.academic_year
+    return Class.objects.filter(main_id=row.main_id_id).values_list('academic_year', flat=True).first()
+
+
+@receiver(post_save, sender=Timetable)
+def timetable_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record_rows(_row_year(instance), [(instance.main_id_id, instance.day, instance.slot)])
+    else:
+        # The old cell of an edited row is unknown here
+        invalidate(_row_year(instance))
+
+
+@receiver(post_delete, sender=Timetable)
+def timetable_deleted(sender, instance, **kwargs):
+    record_rows(_row_year(instance), [(instance.main_id_id, instance.day, instance.slot)], added=False)
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def class_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(instance.academic_year)
+
+
+@receiver(m2m_changed, sender=Class.faculty.through)
+def class_faculty_changed(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Class):
+        invalidate(instance.academic_year)
@@ -0,0 +1,98 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+
+# This module is what worker processes import first, so it must not import models at load time
+
+# The problem of the pool this worker process belongs to
+_problem = None
+
+
+def _init_worker(payload):
+    # Spawned workers start without Django; forked ones already have it.
+    # The problem arrives pickled because unpickling it imports the models.
+    global _problem
+    if not apps.ready:
+        django.setup()
+    _problem = pickle.loads(payload)
+
+
+def _generate(seed):
+    from . import ga
+    return ga.seeded_individual(_problem, seed)
+
+
+def _breed(task):
+    from . import ga
+    return ga.breed(_problem, *task)
+
+
+def _evolve(task):
+    from . import ga
+    return ga.evolve_island(_problem, *task)
+
+
+class InlinePool:
+    """Runs the same seeded tasks in the current process (workers=1)."""
+
+    def __init__(self, problem):
+        self.problem = problem
+
+    def generate(self, seeds):
+        from . import ga
+        return [ga.seeded_individual(self.problem, seed) for seed in seeds]
+
+    def breed(self, tasks):
+        from . import ga
+        return [ga.breed(self.problem, *task) for task in tasks]
+
+    def evolve(self, islands, start, stop, generations):
+        from . import ga
+        return [ga.evolve_island(self.problem, island, start, stop, generations) for island in islands]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BreedingPool(InlinePool):
+    """Fans a GA run's child creation and scoring out over worker processes.
+
+    Each worker receives the picklable GAProblem once, at start-up, and
+    never touches the ORM. Every child is built from its own seed, so the
+    result depends only on the run's seed, not on the number of workers or
+    on how tasks are scheduled.
+    """
+
+    def __init__(self, problem, workers):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pickle.dumps(problem),))
+
+    def _chunksize(self, count):
+        return max(1, count // (self.workers * 4))
+
+    def generate(self, seeds):
+        return list(self.executor.map(_generate, seeds, chunksize=self._chunksize(len(seeds))))
+
+    def breed(self, tasks):
+        return list(self.executor.map(_breed, tasks, chunksize=self._chunksize(len(tasks))))
+
+    def evolve(self, islands, start, stop, generations):
+        # One island per task, so with one worker per island each evolves in its own process
+        return list(self.executor.map(_evolve, [(island, start, stop, generations) for island in islands]))
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def breeding_pool(problem, workers=1):
+    if workers and workers > 1:
+        return BreedingPool(problem, workers)
+    return InlinePool(problem)
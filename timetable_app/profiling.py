@@ -0,0 +1,118 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+# The profile of the solve running in this thread, or None when profiling is off
+_current = ContextVar('solve_profile', default=None)
+
+
+class SolveProfile:
+    """Wall time, calls and DB queries per solver phase, and per validator rule.
+
+    Phases nest (crossover validates genes, for example), so phase times are
+    inclusive; each query is counted once, against the innermost phase.
+
+    Only this thread is profiled: phases run in worker processes (breeding
+    with GA_WORKERS > 1, islands with GA_ISLANDS > 1) are not recorded, and
+    the ``worker_processes`` counter says how many there were. ``rules``
+    covers the TimetableSnapshot validator only; the GA's batched scoring of
+    the same rules is the ``scoring`` phase, not broken down by rule.
+    """
+
+    def __init__(self):
+        self.phases = {}  # name: [seconds, calls, queries]
+        self.rules = {}  # name: [seconds, calls, failures]
+        self.queries = 0
+        self.counters = {}
+        self.started = time.perf_counter()
+        self._stack = []
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        if self._stack:
+            self.phases[self._stack[-1]][2] += 1
+        return execute(sql, params, many, context)
+
+    def report(self):
+        return {
+            'seconds': round(time.perf_counter() - self.started, 4),
+            'queries': self.queries,
+            'counters': dict(self.counters),
+            'phases': {
+                name: {'seconds': round(seconds, 4), 'calls': calls, 'queries': queries}
+                for name, (seconds, calls, queries) in sorted(self.phases.items(), key=lambda item: -item[1][0])
+            },
+            'rules': {
+                name: {'seconds': round(seconds, 4), 'calls': calls, 'failures': failures}
+                for name, (seconds, calls, failures) in sorted(self.rules.items(), key=lambda item: -item[1][0])
+            },
+        }
+
+
+@contextmanager
+def profiling(enabled=True):
+    """Profile everything run in this thread inside the block; yields the SolveProfile, or None if disabled."""
+    if not enabled:
+        yield None
+        return
+    profile = SolveProfile()
+    token = _current.set(profile)
+    try:
+        with connection.execute_wrapper(profile.count_query):
+            yield profile
+    finally:
+        _current.reset(token)
+
+
+def note(**counters):
+    """Record named counters (latest value wins) on the active profile, if any."""
+    profile = _current.get()
+    if profile is not None:
+        profile.counters.update(counters)
+
+
+def profiled(phase):
+    """Decorator recording the function's calls as ``phase``; a single lookup when profiling is off."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            stats = profile.phases.setdefault(phase, [0.0, 0, 0])
+            profile._stack.append(phase)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats[0] += time.perf_counter() - started
+                stats[1] += 1
+                profile._stack.pop()
+        return wrapper
+    return decorate
+
+
+def profiled_rule(rule):
+    """Decorator for a validator rule: time, calls and ValidationErrors raised."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            stats = profile.rules.setdefault(rule, [0.0, 0, 0])
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except ValidationError:
+                stats[2] += 1
+                raise
+            finally:
+                stats[0] += time.perf_counter() - started
+                stats[1] += 1
+        return wrapper
+    return decorate
@@ -0,0 +1,229 @@
+import itertools
+import logging
+import threading
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Timetable, TimetableStatus, Registration, Class, Course, TimetableProjection
+
+logger = logging.getLogger(__name__)
+
+# Owner ids per rebuild query, well inside every backend's parameter limit
+ID_BATCH = 500
+
+# How each kind of owner reaches a Timetable row
+OWNER_PATHS = {
+    'student': 'main_id__registration__stud_id',
+    'faculty': 'main_id__faculty__faculty_id',
+}
+
+# Columns of a projected entry, also read from live Timetable querysets
+ENTRY_FIELDS = ['day', 'slot', 'main_id__course__name', 'main_id__course__code', 'main_id__venue']
+
+
+class ProjectedEntry(namedtuple('ProjectedEntry', ['day', 'slot', 'course_name', 'course_code', 'venue'])):
+    __slots__ = ()
+
+    @property
+    def course(self):
+        # As Course.__str__ renders it
+        return f"{self.course_name} ({self.course_code})"
+
+
+# Owners and classes whose rows changed in this thread, rebuilt together on commit
+_pending = threading.local()
+
+
+def _completed(academic_year=None, semester=None):
+    """(year, semester, section, dept) of every completed section, and the (year, semester) pairs that have one."""
+    statuses = TimetableStatus.objects.filter(status='completed')
+    if academic_year is not None:
+        statuses = statuses.filter(academic_year=academic_year, semester=semester)
+    sections = set(statuses.values_list('academic_year', 'semester', 'section', 'dept'))
+    return sections, {key[:2] for key in sections}
+
+
+def _final(year, sem, section, dept, sections, semesters):
+    # Shared classes are placed by the TT coordinator before any section moves on
+    if not section:
+        return (year, sem) in semesters
+    return (year, sem, section, dept) in sections
+
+
+def rebuild(owner_type, owner_ids, academic_year=None, semester=None):
+    """Recompute the projections of ``owner_ids``, in every semester or only the given one.
+
+    A semester is projected only once every class the owner has in it is
+    final: in a completed section, or shared and any section of the semester
+    is completed. Until then, however many of their rows are final, the
+    owner has no projection and view_timetable reads their week live. Two
+    queries per ID_BATCH owners read their classes and rows; their old
+    projections are replaced in the same transaction.
+    """
+    path = OWNER_PATHS[owner_type]
+    class_path = path.removeprefix('main_id__')
+    owner_ids = sorted(set(owner_ids))
+    sections, semesters = _completed(academic_year, semester)
+    created = 0
+    for start in range(0, len(owner_ids), ID_BATCH):
+        batch = owner_ids[start:start + ID_BATCH]
+        rows = Timetable.objects.filter(**{f"{path}__in": batch})
+        classes = Class.objects.filter(**{f"{class_path}__in": batch})
+        stale = TimetableProjection.objects.filter(owner_type=owner_type, owner_id__in=batch)
+        if academic_year is not None:
+            rows = rows.filter(main_id__academic_year=academic_year, main_id__semester=semester)
+            classes = classes.filter(academic_year=academic_year, semester=semester)
+            stale = stale.filter(academic_year=academic_year, semester=semester)
+        if sections:
+            unfinished = {
+                (owner_id, year, sem)
+                for owner_id, year, sem, *key in classes.values_list(class_path, 'academic_year', 'semester', 'section_id', 'dept')
+                if not _final(year, sem, *key, sections, semesters)
+            }
+            rows = rows.values_list(
+                path, 'main_id__academic_year', 'main_id__semester', 'main_id__section_id', 'main_id__dept', *ENTRY_FIELDS,
+            ).order_by(path, 'main_id__academic_year', 'main_id__semester', 'day', 'slot', 'id')
+            rows = (row for row in rows if row[:3] not in unfinished)
+        else:
+            rows = []  # nothing is final yet; stale projections still go
+
+        projections = [
+            TimetableProjection(
+                owner_type=owner_type, owner_id=owner_id, academic_year=year, semester=sem,
+                entries=[list(row[5:]) for row in group],
+            )
+            for (owner_id, year, sem), group in itertools.groupby(rows, key=lambda row: row[:3])
+        ]
+        with transaction.atomic():
+            stale.delete()
+            TimetableProjection.objects.bulk_create(projections)
+        created += len(projections)
+    logger.info(f"Rebuilt {created} {owner_type} projections for {len(owner_ids)} owners")
+    return created
+
+
+def section_completed(academic_year, semester, section, dept):
+    """Rebuild the semester's projections of everyone who studies or teaches in the section or a shared class."""
+    classes = Class.objects.filter(academic_year=academic_year, semester=semester).filter(
+        Q(section_id=section, dept=dept) | Q(section_id__isnull=True) | Q(section_id=''),
+    )
+    students = Registration.objects.filter(main_id__in=classes).values_list('stud_id', flat=True).distinct()
+    faculty = Class.faculty.through.objects.filter(class_id__in=classes).values_list('faculty_id', flat=True).distinct()
+    rebuild('student', students, academic_year, semester)
+    rebuild('faculty', faculty, academic_year, semester)
+
+
+def lookup(owner_id, academic_year, semester):
+    """The projection of a typed-in ID, a student's before a faculty member's; None if there is none."""
+    found = {
+        p.owner_type: p
+        for p in TimetableProjection.objects.filter(owner_id=owner_id, academic_year=academic_year, semester=semester)
+    }
+    return found.get('student') or found.get('faculty')
+
+
+@receiver(post_save, sender=TimetableStatus)
+def status_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status == 'completed':
+        transaction.on_commit(lambda: section_completed(instance.academic_year, instance.semester, instance.section, instance.dept))
+
+
+def _owners(main_ids):
+    """(owner_type, owner_id) of everyone who studies or teaches in ``main_ids``."""
+    owners = {('student', s) for s in Registration.objects.filter(main_id__in=main_ids).values_list('stud_id', flat=True).distinct()}
+    owners.update(('faculty', f) for f in Class.faculty.through.objects.filter(class_id__in=main_ids).values_list('faculty_id', flat=True).distinct())
+    return owners
+
+
+def _flush():
+    owners, classes = getattr(_pending, 'owners', set()), sorted(getattr(_pending, 'classes', set()))
+    _pending.owners, _pending.classes, _pending.scheduled = set(), set(), None
+    if not owners and not classes:
+        return
+    sections, semesters = _completed()
+    for start in range(0, len(classes), ID_BATCH):
+        # Rows of sections still being edited are not projected, so their changes need no rebuild
+        batch = [
+            main_id
+            for main_id, *key in Class.objects.filter(main_id__in=classes[start:start + ID_BATCH]).values_list(
+                'main_id', 'academic_year', 'semester', 'section_id', 'dept',
+            )
+            if _final(*key, sections, semesters)
+        ]
+        if batch:
+            owners.update(_owners(batch))
+    for owner_type in OWNER_PATHS:
+        owner_ids = [owner_id for kind, owner_id in owners if kind == owner_type]
+        if owner_ids:
+            rebuild(owner_type, owner_ids)
+
+
+def changed(owners=(), classes=()):
+    """Rebuild the projections of ``owners`` ((owner_type, owner_id) pairs) and of everyone in ``classes``, once committed.
+
+    Calls within one transaction are coalesced into a single rebuild:
+    _flush is registered once per atomic block, which ``scheduled`` records
+    by its savepoint ids until _flush clears it. Ids from a rolled back
+    transaction ride along with the next one. Bulk writers, which send none
+    of the signals below, call it directly.
+    """
+    if not hasattr(_pending, 'owners'):
+        _pending.owners, _pending.classes, _pending.scheduled = set(), set(), None
+    _pending.owners.update(owners)
+    _pending.classes.update(classes)
+    block = set(connection.savepoint_ids)
+    # A rollback drops the registration without clearing the flag, hence the look at the connection's queue
+    if _pending.scheduled != block or not any(func is _flush and sids == block for sids, func, _ in connection.run_on_commit):
+        _pending.scheduled = block if connection.in_atomic_block else None
+        transaction.on_commit(_flush)
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def registration_changed(sender, instance, raw=False, **kwargs):
+    # Deleting a class cascades to all its registrations: every student touched is rebuilt in one go
+    if not raw:
+        changed(owners=[('student', instance.stud_id_id)])
+
+
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+def timetable_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changed(classes=[instance.main_id_id])
+
+
+@receiver(post_save, sender=Class)
+def class_saved(sender, instance, created, raw=False, **kwargs):
+    # An edited class may have moved section, finishing or unfinishing its owners' weeks
+    if not raw and not created:
+        changed(owners=_owners([instance.main_id]))
+
+
+@receiver(pre_delete, sender=Class)
+def class_deleted(sender, instance, **kwargs):
+    # Its teachers are unknown once the cascade has removed the class
+    changed(owners=[('faculty', faculty_id) for faculty_id in instance.faculty.values_list('faculty_id', flat=True)])
+
+
+@receiver(m2m_changed, sender=Class.faculty.through)
+def class_faculty_changed(sender, instance, action, pk_set=None, **kwargs):
+    # Only the teachers' weeks change; the classes' students see the same rows
+    if isinstance(instance, Class):
+        if action in ('post_add', 'post_remove'):
+            changed(owners=[('faculty', faculty_id) for faculty_id in pk_set])
+        elif action == 'pre_clear':
+            changed(owners=[('faculty', faculty_id) for faculty_id in instance.faculty.values_list('faculty_id', flat=True)])
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        changed(owners=[('faculty', instance.pk)])
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, raw=False, **kwargs):
+    # Projected entries carry the course's name and code
+    if not raw:
+        changed(classes=Class.objects.filter(course=instance).values_list('main_id', flat=True))
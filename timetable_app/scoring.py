@@ -0,0 +1,327 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .encoding import DAY_COUNT, SLOT_COUNT
+from .profiling import profiled
+from .validators import EXEMPT_COURSE_NAMES, EXEMPT_FACULTY_NAMES, EXEMPT_VENUES
+
+# Slots are padded by two on each side so slot - 2 .. slot + 2 never leave the array
+PAD = 2
+# Per-gene rule families, in the order the validator checks them
+RULES = ('slot', 'venue', 'faculty', 'consecutive', 'continuity', 'daily_limit')
+
+
+class ScoreState:
+    """Cached score of one grid with its occupancy counts and per-rule violations.
+
+    Built by ``PopulationScorer.states`` and kept current by
+    ``PopulationScorer.apply_move``; ``grid`` is the individual itself.
+    """
+    __slots__ = ('grid', 'classes', 'counts', 'failures', 'passed', 'distribution', 'violations', 'score')
+
+    def __init__(self, grid, classes, counts, failures):
+        self.grid = grid
+        self.classes = classes  # (1, genes) class index per gene, mirrors the grid
+        self.counts = counts
+        self.failures = failures  # rule: (genes,) bool
+        self.violations = {rule: int(flags.sum()) for rule, flags in failures.items()}
+
+    def copy(self, grid=None):
+        """Independent copy; ``grid``, equal to this state's grid, becomes the copy's individual."""
+        state = ScoreState.__new__(ScoreState)
+        state.grid = self.grid.copy() if grid is None else grid
+        state.classes = self.classes.copy()
+        state.counts = {key: value.copy() for key, value in self.counts.items()}
+        state.failures = {rule: flags.copy() for rule, flags in self.failures.items()}
+        state.passed = self.passed.copy()
+        state.distribution = self.distribution.copy()
+        state.violations = dict(self.violations)
+        state.score = self.score
+        return state
+
+
+class StateCache:
+    """Bounded LRU of ScoreStates keyed by the grid's bytes.
+
+    A grid holds one class per cell, so its bytes are a canonical form of the
+    individual's gene set whatever order the genes were placed in. Entries
+    are private copies and every hit returns a fresh copy, so ``apply_move``
+    on a state never changes the cache. Entries are dropped when the cache
+    is pickled for a worker process.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {**self.__dict__, 'entries': OrderedDict()}
+
+    def get(self, grid):
+        key = grid.tobytes()
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry.copy(grid)
+
+    def put(self, state):
+        if not self.size:
+            return
+        key = state.grid.tobytes()
+        self.entries[key] = state.copy()
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class PopulationScorer:
+    """Scores a whole population of grids with array operations.
+
+    Gives the same score as ``ga.fitness`` with a ``TimetableSnapshot``:
+    +5 for every gene that passes all rules, -50 for every gene that does
+    not, and -50 per slot a required course is over or under its hours.
+    Rows outside the population (other sections, locked cells) are counted
+    once into static per-(day, slot) tensors; each call only adds the
+    population's own genes on top and checks every gene of every
+    individual at once over a (population x day x slot) tensor.
+    """
+
+    def __init__(self, snapshot, encoding, section, dept, requirements, cache_size=256):
+        self.encoding = encoding
+        # Full scores of individuals seen before, so a repeated grid is copied instead of rescored
+        self.cache = StateCache(cache_size)
+        n = len(encoding.main_ids)
+        names = encoding.course_names
+        infos = [None] + [snapshot.classes[main_id] for main_id in encoding.main_ids[1:]]
+
+        # Faculty and venues that matter are the ones of the solvable classes; one spare column keeps the axes non-empty
+        faculty_ids = sorted({fid for info in infos[1:] for fid, _ in info.faculty})
+        faculty_index = {fid: i for i, fid in enumerate(faculty_ids)}
+        venues = sorted({info.venue for info in infos[1:] if info.venue not in EXEMPT_VENUES})
+        venue_index = {venue: i for i, venue in enumerate(venues)}
+        F, V, N = len(faculty_ids) + 1, len(venues) + 1, len(names)
+
+        # Per-class attributes, row 0 is the empty cell
+        self.type_none = np.zeros(n, dtype=bool)
+        self.section_or_all = np.zeros(n, dtype=bool)
+        self.in_section = np.zeros(n, dtype=bool)
+        self.main = np.zeros(n, dtype=bool)
+        self.name = np.zeros(n, dtype=np.intp)
+        self.name_onehot = np.zeros((n, N), dtype=np.int32)
+        self.venue = np.full(n, -1, dtype=np.intp)
+        self.venue_onehot = np.zeros((n, V), dtype=np.int32)
+        self.faculty = np.zeros((n, F), dtype=np.int32)
+        self.checked_faculty = np.zeros((n, F), dtype=bool)
+        for idx, info in enumerate(infos[1:], start=1):
+            self.type_none[idx] = info.course_type == 'none'
+            self.section_or_all[idx] = snapshot.in_section_or_all(info, section, dept)
+            self.in_section[idx] = snapshot.in_section(info, section, dept)
+            self.main[idx] = info.course_name in snapshot.main_courses
+            self.name[idx] = encoding.class_course[idx]
+            self.name_onehot[idx, self.name[idx]] = 1
+            if info.venue in venue_index:
+                self.venue[idx] = venue_index[info.venue]
+                self.venue_onehot[idx, self.venue[idx]] = 1
+            for fid, fname in info.faculty:
+                self.faculty[idx, faculty_index[fid]] = 1
+                if fname not in EXEMPT_FACULTY_NAMES and info.course_name not in EXEMPT_COURSE_NAMES:
+                    self.checked_faculty[idx, faculty_index[fid]] = True
+        self.section_none = self.section_or_all & self.type_none
+        self.section_name = self.name_onehot * self.in_section[:, None]
+        self.faculty_main = self.faculty * self.main[:, None]
+        self.class_onehot = np.eye(n, dtype=np.int32)
+
+        # Static rows: the whole academic year plus the locked cells, deduplicated
+        rows = {(main_id, day, slot) for (day, slot), main_ids in snapshot.cells.items() for main_id in main_ids}
+        rows.update((main_id, day, slot) for day, slot, main_id, _ in encoding.locked_genes)
+        shape = (DAY_COUNT, SLOT_COUNT)
+        self.static_section = np.zeros(shape, dtype=np.int32)
+        self.static_section_none = np.zeros(shape, dtype=np.int32)
+        self.static_section_name = np.zeros(shape + (N,), dtype=np.int32)
+        self.static_faculty = np.zeros(shape + (F,), dtype=np.int32)
+        self.static_faculty_main = np.zeros(shape + (F,), dtype=np.int32)
+        self.static_venue = np.zeros(shape + (V,), dtype=np.int32)
+        self.static_day_class = np.zeros((DAY_COUNT, n), dtype=np.int32)
+        for main_id, day, slot in rows:
+            info = snapshot.classes.get(main_id)
+            if info is None:
+                continue
+            cell = (day - 1, slot - 1)
+            section_or_all = snapshot.in_section_or_all(info, section, dept)
+            self.static_section[cell] += section_or_all
+            self.static_section_none[cell] += section_or_all and info.course_type == 'none'
+            if snapshot.in_section(info, section, dept) and info.course_name in encoding.course_index:
+                self.static_section_name[cell + (encoding.course_index[info.course_name],)] += 1
+            for fid, _ in info.faculty:
+                if fid in faculty_index:
+                    self.static_faculty[cell + (faculty_index[fid],)] += 1
+                    self.static_faculty_main[cell + (faculty_index[fid],)] += info.course_name in snapshot.main_courses
+            if info.venue in venue_index:
+                self.static_venue[cell + (venue_index[info.venue],)] += 1
+            if main_id in encoding.class_index:
+                self.static_day_class[day - 1, encoding.class_index[main_id]] += 1
+
+        # Gene positions: the 48 grid cells, then the locked genes shared by every individual
+        locked = encoding.locked_genes
+        self.locked_classes = np.array([encoding.class_index[main_id] for _, _, main_id, _ in locked], dtype=np.intp)
+        self.gene_day = np.concatenate([np.repeat(np.arange(DAY_COUNT), SLOT_COUNT), [day - 1 for day, _, _, _ in locked]]).astype(np.intp)
+        self.gene_slot = np.concatenate([np.tile(np.arange(SLOT_COUNT), DAY_COUNT), [slot - 1 for _, slot, _, _ in locked]]).astype(np.intp)
+        # A move only changes counts in its own cell, and every rule looks at most at the rest of that day
+        self.day_genes = [np.flatnonzero(self.gene_day == day) for day in range(DAY_COUNT)]
+
+        self.required = np.zeros(N, dtype=np.int32)
+        self.required_mask = np.zeros(N, dtype=bool)
+        for course, hours in requirements.items():
+            self.required[encoding.course_index[course]] = hours
+            self.required_mask[encoding.course_index[course]] = True
+
+    def counts(self, grids):
+        """Per-(day, slot) occupancy tensors for every individual."""
+        pad = [(0, 0), (0, 0), (PAD, PAD), (0, 0)]
+        section_name = self.static_section_name + self.section_name[grids]
+        return {
+            'section': self.static_section + self.section_or_all[grids],
+            'section_none': self.static_section_none + self.section_none[grids],
+            'section_name': np.pad(section_name, pad),
+            'day_section_name': section_name.sum(axis=2),
+            'day_class': self.static_day_class + self.class_onehot[grids].sum(axis=2),
+            'faculty': self.static_faculty + self.faculty[grids],
+            'faculty_main': np.pad(self.static_faculty_main + self.faculty_main[grids], pad),
+            'venue': self.static_venue + self.venue_onehot[grids],
+        }
+
+    def gene_classes(self, grids):
+        """Class index per gene, shape (population, genes); 0 marks no gene."""
+        size = len(grids)
+        return np.concatenate([grids.reshape(size, -1).astype(np.intp), np.tile(self.locked_classes, (size, 1))], axis=1)
+
+    @profiled('scoring')
+    def failures(self, t, classes, d, s):
+        """Rule name -> (population, genes) bool of genes that break it."""
+        name = self.name[classes][..., None]
+
+        others = t['section'][:, d, s] - self.section_or_all[classes]
+        others_none = t['section_none'][:, d, s] - self.section_none[classes]
+        slot_clash = (others > 0) & (self.type_none[classes] | (others_none > 0))
+
+        venue = self.venue[classes]
+        venue_count = np.take_along_axis(t['venue'][:, d, s], np.maximum(venue, 0)[..., None], axis=-1)[..., 0]
+        venue_clash = (venue >= 0) & (venue_count >= 2)
+
+        checked = self.checked_faculty[classes]
+        faculty_clash = (checked & (t['faculty'][:, d, s] >= 2)).any(axis=-1)
+
+        def section_name_at(offset):
+            return np.take_along_axis(t['section_name'][:, d, s + PAD + offset], name, axis=-1)[..., 0] > 0
+        consecutive = section_name_at(-1) | section_name_at(1)
+
+        def teaches_main(offset):
+            return t['faculty_main'][:, d, s + PAD + offset] > 0
+        continuity = (checked & ((teaches_main(-1) & teaches_main(-2)) | (teaches_main(1) & teaches_main(2)))).any(axis=-1)
+
+        same_name = np.take_along_axis(t['day_section_name'][:, d], name, axis=-1)[..., 0]
+        own = np.take_along_axis(t['day_class'][:, d], classes[..., None], axis=-1)[..., 0] * self.in_section[classes]
+        daily_limit = (same_name - own) >= 2
+
+        present = classes > 0
+        main = self.main[classes] & present
+        return {
+            'slot': slot_clash & present,
+            'venue': venue_clash & present,
+            'faculty': faculty_clash & present,
+            'consecutive': consecutive & main,
+            'continuity': continuity & main,
+            'daily_limit': daily_limit & main,
+        }
+
+    def gene_status(self, grids):
+        """(classes, passed) arrays of shape (population, genes); class 0 marks no gene."""
+        grids = np.asarray(grids)
+        classes = self.gene_classes(grids)
+        failures = self.failures(self.counts(grids), classes, self.gene_day, self.gene_slot)
+        passed = (classes > 0) & ~np.any([failures[rule] for rule in RULES], axis=0)
+        return classes, passed
+
+    def score(self, grids):
+        classes, passed = self.gene_status(grids)
+        failed = (classes > 0) & ~passed
+        distribution = (self.name_onehot[classes] * passed[..., None]).sum(axis=1)
+        deviation = np.abs(distribution - self.required) * self.required_mask
+        return 5 * passed.sum(axis=1) - 50 * failed.sum(axis=1) - 50 * deviation.sum(axis=1)
+
+    def states(self, grids):
+        """ScoreState per grid; grids not in the cache are computed in one batch."""
+        grids = list(grids)
+        states = [self.cache.get(grid) for grid in grids]
+        missing = [i for i, state in enumerate(states) if state is None]
+        if not missing:
+            return states
+        batch = np.asarray([grids[i] for i in missing])
+        classes = self.gene_classes(batch)
+        counts = self.counts(batch)
+        failures = self.failures(counts, classes, self.gene_day, self.gene_slot)
+        for p, i in enumerate(missing):
+            state = ScoreState(
+                grids[i],
+                classes[p:p + 1].copy(),
+                {key: value[p:p + 1].copy() for key, value in counts.items()},
+                {rule: flags[p].copy() for rule, flags in failures.items()},
+            )
+            self._refresh(state)
+            self.cache.put(state)
+            states[i] = state
+        return states
+
+    def state(self, grid):
+        return self.states([grid])[0]
+
+    def apply_move(self, state, day, slot, class_idx):
+        """Put class_idx (0 to clear) at (day, slot) and update the cached score.
+
+        Only the counts of that cell change, so only the genes of that day
+        are rechecked. Returns the new score.
+        """
+        d, s = day - 1, slot - 1
+        cell = d * SLOT_COUNT + s
+        old_idx = state.classes[0, cell]
+        if old_idx == class_idx:
+            return state.score
+        self._shift(state.counts, d, s, old_idx, -1)
+        self._shift(state.counts, d, s, class_idx, 1)
+        state.classes[0, cell] = class_idx
+        state.grid[d, s] = class_idx
+
+        genes = self.day_genes[d]
+        failures = self.failures(state.counts, state.classes[:, genes], self.gene_day[genes], self.gene_slot[genes])
+        for rule in RULES:
+            flags = failures[rule][0]
+            state.violations[rule] += int(flags.sum()) - int(state.failures[rule][genes].sum())
+            state.failures[rule][genes] = flags
+        self._refresh(state)
+        return state.score
+
+    def _shift(self, t, d, s, class_idx, sign):
+        if not class_idx:
+            return
+        t['section'][0, d, s] += sign * self.section_or_all[class_idx]
+        t['section_none'][0, d, s] += sign * self.section_none[class_idx]
+        t['section_name'][0, d, s + PAD] += sign * self.section_name[class_idx]
+        t['day_section_name'][0, d] += sign * self.section_name[class_idx]
+        t['day_class'][0, d, class_idx] += sign
+        t['faculty'][0, d, s] += sign * self.faculty[class_idx]
+        t['faculty_main'][0, d, s + PAD] += sign * self.faculty_main[class_idx]
+        t['venue'][0, d, s] += sign * self.venue_onehot[class_idx]
+
+    def _refresh(self, state):
+        classes = state.classes[0]
+        present = classes > 0
+        state.passed = present & ~np.any([state.failures[rule] for rule in RULES], axis=0)
+        state.distribution = self.name_onehot[classes[state.passed]].sum(axis=0)
+        deviation = np.abs(state.distribution - self.required) * self.required_mask
+        state.score = int(5 * state.passed.sum() - 50 * (present & ~state.passed).sum() - 50 * deviation.sum())
@@ -1,6 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+import random
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 import sys
 from collections import Counter, defaultdict
+from django.db import transaction
 from django.db.models import Q
 from django.core.exceptions import ValidationError
 import django
@@ -11,8 +15,18 @@ sys.path.append("D:/Documents/sem6-docs/SEP/proj4/timetable_project")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "timetable_project.settings")
 django.setup()
 
-from timetable_app.models import Timetable, Class, Faculty, TimetableStatus, Course
-from timetable_app.validators import validate_timetable_constraints
+from timetable_app.models import Timetable, Class, Faculty, TimetableStatus, Course, Registration
+from timetable_app.validators import validate_timetable_constraints, TimetableSnapshot
+from timetable_app import ga, occupancy, versions
+from timetable_app.ga import run_ga_logic
+from timetable_app.encoding import TimetableEncoding
+from timetable_app.jobs import enqueue_solve, run_worker, claim_next_job, run_job, job_progress, JobAbandoned, STALE_ERROR
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+import json
 
 from django.test import TestCase
 from django.core.exceptions import ValidationError
@@ -194,4 +208,853 @@ class TimetableConstraintsTests(TestCase):
         current_year = "2025_even"
         timetables = Timetable.objects.filter(main_id__academic_year=current_year)
         self.assertFalse(timetables.exists(), "No timetable entries should exist for this test to pass as empty.")
-        
\ No newline at end of file
+
+
+class SectionFixture:
+    year = "2025_even"
+    semester = "4"
+
+    @classmethod
+    def setUpTestData(cls):
+        f1 = Faculty.objects.create(faculty_id='F1', faculty_name='Anand', department='CSE')
+        f2 = Faculty.objects.create(faculty_id='F2', faculty_name='Bala', department='CSE')
+        f3 = Faculty.objects.create(faculty_id='F3', faculty_name='Chitra', department='CSE')
+        some = Faculty.objects.create(faculty_id='F0', faculty_name='Some faculty', department='CSE')
+        dl = Course.objects.create(course_id='C1', name='DL', course_type='none', hours_per_week=4)
+        fs = Course.objects.create(course_id='C2', name='FS', course_type='none', hours_per_week=4)
+        se = Course.objects.create(course_id='C3', name='SE', course_type='none', hours_per_week=3)
+        itt = Course.objects.create(course_id='C4', name='ITT', course_type='dept', hours_per_week=3)
+        oe = Course.objects.create(course_id='C5', name='OE', course_type='tt', hours_per_week=4, offered_to='all')
+        pet = Course.objects.create(course_id='C6', name='PET', course_type='dept', hours_per_week=1)
+        dl_lab = Course.objects.create(course_id='C7', name='DL', course_type='none', hours_per_week=2)
+
+        def make(course, section, dept, venue, *faculty):
+            obj = Class.objects.create(course=course, section_id=section, dept=dept, venue=venue, academic_year=cls.year, semester=cls.semester)
+            obj.faculty.set(faculty)
+            return obj
+
+        cls.dl1 = make(dl, '1', 'CSE', 'R1', f1)
+        cls.fs1 = make(fs, '1', 'CSE', 'R1', f2)
+        cls.se1 = make(se, '1', 'CSE', 'R3', f1)
+        cls.itt1 = make(itt, '1', 'CSE', 'pg', f3)
+        cls.pet1 = make(pet, '1', 'CSE', '', f2, some)
+        cls.oe = make(oe, None, None, 'Hall', f3)
+        cls.dl2 = make(dl, '2', 'CSE', 'R2', f1)
+        cls.fs2 = make(fs, '2', 'CSE', 'R2', f2)
+        cls.se2 = make(se, '2', 'CSE', 'R3', f3)
+        cls.dl_lab1 = make(dl_lab, '1', 'CSE', 'Lab', f2)
+
+        rows = [
+            (cls.oe, 1, 1), (cls.itt1, 1, 1),
+            (cls.dl1, 1, 2), (cls.fs1, 1, 3), (cls.se1, 1, 5),
+            (cls.dl2, 2, 1), (cls.dl2, 2, 2), (cls.fs2, 2, 4),
+            (cls.dl1, 3, 3), (cls.dl1, 3, 6), (cls.se1, 3, 4),
+            (cls.pet1, 4, 8), (cls.fs2, 5, 2),
+            (cls.se2, 2, 5), (cls.se2, 4, 3),
+            (cls.se1, 6, 2), (cls.pet1, 6, 2),
+            (cls.dl_lab1, 5, 1), (cls.dl_lab1, 5, 5),
+        ]
+        for obj, day, slot in rows:
+            Timetable.objects.create(main_id=obj, day=day, slot=slot)
+
+
+class InMemoryValidationTests(SectionFixture, TestCase):
+    def verdict(self, main_id, day, slot, cache=None, temp_timetable=None):
+        try:
+            validate_timetable_constraints(main_id, day, slot, self.year, self.semester, '1', 'CSE', cache, temp_timetable)
+        except ValidationError as e:
+            return e.messages
+        return None
+
+    def candidates(self, skip=()):
+        # Cells a class already holds included: the database rejects most of them
+        section_classes = [self.dl1, self.fs1, self.se1, self.itt1, self.pet1, self.oe, self.dl_lab1]
+        for obj in section_classes:
+            for day in range(1, 7):
+                for slot in range(1, 9):
+                    if (obj.main_id, day, slot) not in skip:
+                        yield obj.main_id, day, slot
+
+    def test_snapshot_matches_database(self):
+        snapshot = TimetableSnapshot.load(self.year, self.semester)
+        rejected = 0
+        for main_id, day, slot in self.candidates():
+            expected = self.verdict(main_id, day, slot)
+            rejected += expected is not None
+            self.assertEqual(self.verdict(main_id, day, slot, snapshot), expected, (main_id, day, slot))
+        self.assertGreater(rejected, 0)
+
+    def test_index_view_matches_database(self):
+        Timetable.objects.create(main_id=self.se2, day=1, slot=2)  # applied to the index, not reloaded
+        view = occupancy.occupancy_index(self.year).view(self.semester)
+        for main_id, day, slot in self.candidates():
+            self.assertEqual(self.verdict(main_id, day, slot, view), self.verdict(main_id, day, slot), (main_id, day, slot))
+
+    def test_snapshot_overlay_matches_saved_rows(self):
+        snapshot = TimetableSnapshot.load(self.year, self.semester)
+        extra = [(self.fs1, 2, 6), (self.se1, 5, 3), (self.dl1, 6, 7)]
+        temp_timetable = defaultdict(list)
+        for obj, day, slot in extra:
+            temp_timetable[(day, slot)].append(obj)
+            Timetable.objects.create(main_id=obj, day=day, slot=slot)
+
+        # The overlay's own placements are re-checks, which never clash with themselves
+        for main_id, day, slot in self.candidates(skip={(obj.main_id, day, slot) for obj, day, slot in extra}):
+            self.assertEqual(
+                self.verdict(main_id, day, slot, snapshot, temp_timetable),
+                self.verdict(main_id, day, slot),
+                (main_id, day, slot),
+            )
+
+    def test_snapshot_issues_no_queries(self):
+        snapshot = TimetableSnapshot.load(self.year, self.semester)
+        candidates = list(self.candidates())
+        with self.assertNumQueries(0):
+            for main_id, day, slot in candidates:
+                self.verdict(main_id, day, slot, snapshot)
+
+
+class VectorizedFitnessTests(SectionFixture, TestCase):
+    def random_grids(self, encoding, count):
+        rng = random.Random(3)
+        free = encoding.free_cells()
+        grids = []
+        for _ in range(count):
+            grid = encoding.empty()
+            for day, slot in rng.sample(free, rng.randint(0, len(free))):
+                grid[day - 1, slot - 1] = rng.randrange(1, len(encoding.main_ids))
+            grids.append(grid)
+        return grids
+
+    def test_batch_scores_match_fitness(self):
+        rng = random.Random(11)
+        problem, _ = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        population = ga.generate_population(problem, size=10, rng=rng)
+        population += [ga.mutate(problem, grid.copy(), 0, 20, rng=rng) for grid in population]
+        population += self.random_grids(problem.encoding, 60)
+
+        expected = [ga.fitness(problem, grid) for grid in population]
+        self.assertEqual(problem.scorer.score(population).tolist(), expected)
+        self.assertGreater(len(set(expected)), 10)
+
+    def test_repeated_grids_come_from_the_cache(self):
+        problem, _ = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        scorer = problem.scorer
+        scorer.cache.size = 3
+        grids = self.random_grids(problem.encoding, 4)
+        first = scorer.state(grids[0])
+        hits = scorer.cache.hits
+        again = scorer.state(grids[0].copy())
+        self.assertEqual(scorer.cache.hits, hits + 1)
+        self.assertEqual(again.score, first.score)
+
+        # A cached state is a copy: moves on it leave the cache alone
+        day, slot = problem.encoding.free_cells()[0]
+        scorer.apply_move(again, day, slot, 1)
+        self.assertEqual(scorer.state(grids[0].copy()).score, first.score)
+
+        scorer.states(grids[1:])
+        self.assertEqual(len(scorer.cache.entries), 3)
+        misses = scorer.cache.misses
+        scorer.state(grids[0].copy())  # evicted as least recently used
+        self.assertEqual(scorer.cache.misses, misses + 1)
+
+    def test_apply_move_matches_full_score(self):
+        problem, _ = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        encoding, scorer = problem.encoding, problem.scorer
+        rng = random.Random(5)
+        free = encoding.free_cells()
+        for state in scorer.states(self.random_grids(encoding, 5)):
+            for _ in range(60):
+                day, slot = rng.choice(free)
+                class_idx = rng.randrange(0, len(encoding.main_ids))
+                score = scorer.apply_move(state, day, slot, class_idx)
+                fresh = scorer.state(state.grid.copy())
+                self.assertEqual(score, fresh.score)
+                self.assertEqual(state.violations, fresh.violations)
+            self.assertEqual(state.score, ga.fitness(problem, state.grid))
+
+
+class OccupancyIndexTests(SectionFixture, TestCase):
+    def test_index_loads_in_one_scan(self):
+        with self.assertNumQueries(4):  # version token, classes, their faculty, timetable rows
+            index = occupancy.occupancy_index(self.year)
+        with self.assertNumQueries(1):  # version token
+            self.assertIs(occupancy.occupancy_index(self.year), index)
+        with self.assertNumQueries(0):
+            self.assertTrue(index.faculty_busy('F1', 1, 2))
+            self.assertFalse(index.faculty_busy('F1', 1, 4))
+            self.assertTrue(index.venue_busy('R1', 1, 3))
+            self.assertFalse(index.venue_busy('pg', 1, 1))
+            self.assertEqual(int((index.faculty['F3'] > 0).sum()), 3)
+            self.assertEqual(index.faculty['F3'][0, 0], 2)  # OE and ITT clash at (1, 1)
+            self.assertEqual(index.section_cell(self.semester, '1', 'CSE', 1, 1), {self.itt1.main_id})
+            self.assertEqual(index.section_cell(self.semester, None, None, 1, 1), {self.oe.main_id})
+
+        snapshot = index.snapshot(self.semester)
+        loaded = TimetableSnapshot.load(self.year, self.semester)
+        self.assertEqual(snapshot.cells, loaded.cells)
+        self.assertEqual(snapshot.classes, loaded.classes)
+
+    def test_writes_update_index_in_place(self):
+        index = occupancy.occupancy_index(self.year)
+        with self.assertNumQueries(6):  # the insert, then the version token is locked and replaced
+            row = Timetable.objects.create(main_id=self.fs1, day=2, slot=6)
+            extra = Timetable.objects.create(main_id=self.dl2, day=1, slot=2)  # F1 now twice at (1, 2)
+        self.assertIs(occupancy.occupancy_index(self.year), index)
+        self.assertTrue(index.faculty_busy('F2', 2, 6))
+        self.assertTrue(index.venue_busy('R1', 2, 6))
+        self.assertFalse(index.venue_busy('R1', 2, 6, excluding=self.fs1.main_id))
+        self.assertIn(self.fs1.main_id, index.section_cell(self.semester, '1', 'CSE', 2, 6))
+
+        row.delete()
+        extra.delete()
+        self.assertIs(occupancy.occupancy_index(self.year), index)
+        self.assertFalse(index.faculty_busy('F2', 2, 6))
+        self.assertTrue(index.faculty_busy('F1', 1, 2))
+        self.assertEqual(index.section_cell(self.semester, '1', 'CSE', 2, 6), set())
+        self.assertEqual(index.snapshot(self.semester).cells, TimetableSnapshot.load(self.year, self.semester).cells)
+
+        self.fs1.faculty.set([Faculty.objects.get(faculty_id='F3')])
+        self.assertIsNot(occupancy.occupancy_index(self.year), index)
+
+    def test_only_exempt_venues_are_shared(self):
+        upper = Class.objects.create(course=self.itt1.course, section_id='2', dept='CSE', venue='PG', academic_year=self.year, semester=self.semester)
+        Timetable.objects.create(main_id=upper, day=6, slot=8)
+        index = occupancy.occupancy_index(self.year)
+        self.assertTrue(index.venue_busy('PG', 6, 8))
+        self.assertNotIn('pg', index.venue)
+        self.assertNotIn('', index.venue)
+
+    def test_rolled_back_write_reloads_index(self):
+        index = occupancy.occupancy_index(self.year)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Timetable.objects.create(main_id=self.fs1, day=2, slot=6)
+            raise RuntimeError
+        reloaded = occupancy.occupancy_index(self.year)
+        self.assertIsNot(reloaded, index)
+        self.assertFalse(reloaded.faculty_busy('F2', 2, 6))
+
+    def test_writes_of_other_processes_reload_index(self):
+        index = occupancy.occupancy_index(self.year)
+        # Another process's signals drop its own index, not this one; only the token tells
+        with mock.patch.dict(occupancy._indexes, clear=True):
+            Timetable.objects.create(main_id=self.fs1, day=2, slot=6)
+        self.assertIs(occupancy._indexes[self.year], index)
+        self.assertTrue(occupancy.occupancy_index(self.year).faculty_busy('F2', 2, 6))
+
+
+class BoardTests(SectionFixture, TestCase):
+    def test_board_is_built_in_three_queries(self):
+        from timetable_app.board import build_board
+
+        with self.assertNumQueries(3):
+            board = build_board(self.year, self.semester, '1', 'CSE')
+        self.assertEqual(board.tt_courses, {'OE': 4})
+        self.assertEqual(list(board.dept_courses), ['ITT', 'PET'])
+        self.assertEqual(board.assigned['DL'], 5)  # lecture and lab share the name
+        self.assertEqual(board.current_course, 'OE')
+        self.assertEqual([entry.course for entry in board.grid[1][1]], ['OE ()', 'ITT ()'])
+        self.assertEqual(board.days, [1, 3, 4, 5, 6])
+
+    def test_add_timetable_page_is_served_from_the_cache(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from timetable_app.board import section_board, MASTER_VERSION
+
+        get_user_model().objects.create_user('tt', password='pw', role='TT_Coordinator')
+        self.client.login(username='tt', password='pw')
+        session = self.client.session
+        session.update({'current_year': self.year, 'current_semester': self.semester, 'section': '1', 'dept': 'CSE'})
+        session.save()
+
+        self.client.get('/add_timetable/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/add_timetable/')
+        self.assertContains(response, 'Venue: Hall')
+        self.assertFalse([q for q in queries.captured_queries if 'timetable_app_timetable"' in q['sql'] or 'timetable_app_class' in q['sql']])
+
+        # Writes replace the database tokens in the board's key
+        Timetable.objects.create(main_id=self.oe, day=2, slot=3)
+        self.assertEqual(section_board(self.year, self.semester, '1', 'CSE').assigned['OE'], 2)
+        Course.objects.filter(course_id='C5').update(hours_per_week=2)
+        Course.objects.get(course_id='C5').save()
+        board = section_board(self.year, self.semester, '1', 'CSE')
+        self.assertEqual((board.tt_courses, board.current_course), ({'OE': 2}, 'ITT'))
+
+        # Another process's cache is not this one's: the token alone must tell
+        Course.objects.filter(course_id='C5').update(hours_per_week=3)
+        self.assertEqual(section_board(self.year, self.semester, '1', 'CSE').tt_courses, {'OE': 2})
+        versions.bump(MASTER_VERSION)
+        self.assertEqual(section_board(self.year, self.semester, '1', 'CSE').tt_courses, {'OE': 3})
+
+    def test_manual_assignment_raced_by_another_writer(self):
+        get_user_model().objects.create_user('tt', password='pw', role='TT_Coordinator')
+        self.client.login(username='tt', password='pw')
+        session = self.client.session
+        session.update({'current_year': self.year, 'current_semester': self.semester, 'section': '1', 'dept': 'CSE'})
+        session.save()
+
+        # The other request's row lands between validation and insert
+        def validate_then_race(main_id, day, slot, *args):
+            Timetable.objects.create(main_id_id=main_id, day=day, slot=slot)
+
+        with mock.patch('timetable_app.views.validate_timetable_constraints', side_effect=validate_then_race):
+            response = self.client.post('/add_timetable/', {'main_id': self.oe.main_id, 'days': ['2'], 'slots': ['3']})
+        self.assertContains(response, 'OE is already assigned to day 2, slot 3')
+        self.assertEqual(Timetable.objects.filter(main_id=self.oe, day=2, slot=3).count(), 1)
+
+
+class ProjectionTests(SectionFixture, TestCase):
+    def week(self, user_input, section='1'):
+        """Number of entries view_timetable shows ``user_input``, and whether it read Timetable rows for them."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/view-timetable/', {'user_input': user_input, 'academic_year': self.year, 'semester': self.semester, 'section': section, 'dept': 'CSE'})
+        shown = sum(len(entries) for slots in self.client.session['timetable_data']['filtered_timetable'].values() for entries in slots.values())
+        return shown, any('timetable_app_timetable"' in q['sql'] for q in queries.captured_queries)
+
+    def test_projections_follow_registrations_and_finalized_sections(self):
+        from timetable_app.models import Student, TimetableProjection
+        from timetable_app.projections import lookup
+
+        Student.objects.create(stud_id='S1', name='Asha', department='CSE')
+        with self.captureOnCommitCallbacks(execute=True):
+            for c in (self.dl1, self.oe):
+                Registration.objects.create(stud_id_id='S1', main_id=c)
+        # Section 1 is still being edited: nothing is projected yet
+        self.assertIsNone(lookup('S1', self.year, self.semester))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='1', dept='CSE', status='completed')
+        projection = lookup('S1', self.year, self.semester)
+        self.assertEqual(projection.owner_type, 'student')
+        self.assertEqual(
+            [tuple(entry[:3]) for entry in projection.entries],
+            [(1, 1, 'OE'), (1, 2, 'DL'), (3, 3, 'DL'), (3, 6, 'DL')],
+        )
+        self.assertEqual(self.week('S1'), (4, False))
+        # Only F0 teaches nothing but section 1; the others also teach in section 2, still being edited,
+        # and are read live, section 2 included
+        self.assertEqual(list(TimetableProjection.objects.filter(owner_type='faculty').values_list('owner_id', flat=True)), ['F0'])
+        self.assertIsNone(lookup('F1', self.year, self.semester))
+        self.assertEqual(self.week('F1'), (3 + 3 + 2, True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.se2.faculty.add(Faculty.objects.create(faculty_id='F4', faculty_name='Devi', department='CSE'))
+        self.assertIsNone(lookup('F4', self.year, self.semester))
+        self.assertEqual(self.week('F4', section='2'), (2, True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='2', dept='CSE', status='completed')
+        self.assertEqual(len(lookup('F1', self.year, self.semester).entries), 3 + 3 + 2)
+        self.assertEqual(len(lookup('F4', self.year, self.semester).entries), 2)
+        self.assertEqual(self.week('F1'), (3 + 3 + 2, False))
+
+        # Rows, courses and teachers of completed sections are kept current
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Timetable.objects.create(main_id=self.se1, day=4, slot=1)
+            Timetable.objects.create(main_id=self.dl2, day=4, slot=2)
+        self.assertEqual(len(callbacks), 1)  # one rebuild for the transaction
+        self.assertEqual(len(lookup('F1', self.year, self.semester).entries), 3 + 4 + 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.get(course_id='C3')
+            course.name = 'Software Engineering'
+            course.save()
+        self.assertEqual(Counter(entry[2] for entry in lookup('F1', self.year, self.semester).entries), Counter({'DL': 6, 'Software Engineering': 4}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.se1.faculty.set([Faculty.objects.get(faculty_id='F2')])
+        self.assertEqual(len(lookup('F1', self.year, self.semester).entries), 6)
+
+        # A class moved into a section still being edited takes its teachers back to the live path
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dl2.section_id = '3'
+            self.dl2.save()
+        self.assertIsNone(lookup('F1', self.year, self.semester))
+        self.assertEqual(self.week('F1'), (6, True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Registration.objects.filter(main_id=self.dl1).delete()
+        self.assertEqual(len(lookup('S1', self.year, self.semester).entries), 1)
+
+    def test_rolled_back_changes_are_rebuilt_with_the_next_transaction(self):
+        from timetable_app.models import Student
+        from timetable_app.projections import lookup
+
+        Student.objects.create(stud_id='S1', name='Asha', department='CSE')
+        with self.captureOnCommitCallbacks(execute=True):
+            TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='1', dept='CSE', status='completed')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Registration.objects.create(stud_id_id='S1', main_id=self.dl1)
+                raise RuntimeError
+            Registration.objects.create(stud_id_id='S1', main_id=self.oe)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([tuple(entry[:3]) for entry in lookup('S1', self.year, self.semester).entries], [(1, 1, 'OE')])
+
+
+class DatasetGeneratorTests(TestCase):
+    def test_generated_institution_is_solvable(self):
+        options = dict(year='2030_even', semester='4', depts=2, sections=2, faculty=6, students=5, seed=1, stdout=StringIO())
+        self.assertFalse(occupancy.occupancy_index('2030_even').classes)  # loaded before the year has data
+        call_command('generate_dataset', **options)
+        self.assertEqual(Faculty.objects.filter(faculty_id__startswith='SYN').count(), 12)
+        self.assertEqual(len(occupancy.occupancy_index('2030_even').classes), 2 * 2 * 8 + 2)
+        self.assertEqual(Registration.objects.count(), 2 * 2 * 5 * 9)
+        self.assertTrue(all(c.faculty.exists() for c in Class.objects.filter(academic_year='2030_even')))
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', **options)
+        call_command('generate_dataset', clear=True, **options)
+        self.assertEqual(Registration.objects.count(), 2 * 2 * 5 * 9)
+
+        result = run_ga_logic('2030_even', '4', '1', 'CSE', seed=1)
+        self.assertTrue(result.requirements_met)
+
+
+class ImportTests(SectionFixture, TestCase):
+    def test_registration_upload_is_chunked_and_reports_rejects(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from timetable_app.imports import import_file
+        from timetable_app.models import Student
+
+        Student.objects.create(stud_id='S1', name='Asha', department='CSE')
+        Student.objects.create(stud_id='S2', name='Bharath', department='CSE')
+        Registration.objects.create(stud_id_id='S1', main_id=self.dl1)
+        lines = ['stud_id,main_id', f'S1,{self.dl1.pk}', f'S1,{self.fs1.pk}', f'S1,{self.fs1.pk}', 'S9,1', 'S2,x']
+        lines += [f'S2,{c.pk}' for c in (self.dl1, self.fs1, self.se1, self.itt1, self.pet1, self.oe)]
+        upload = SimpleUploadedFile('registrations.csv', '\n'.join(lines).encode())
+
+        # Per chunk: one in_bulk per foreign key, one dedupe query, and the insert counted in its savepoint
+        with self.assertNumQueries(2 * 8):
+            report = import_file(Registration, upload, ['stud_id', 'main_id'], chunk_size=6)
+        self.assertEqual(report.rows, 11)
+        self.assertEqual(report.created, 7)
+        self.assertEqual((report.duplicates, report.unchanged), (1, 1))
+        self.assertEqual(report.rejected, [(5, 'Student with ID S9 does not exist'), (6, 'invalid main_id')])
+        self.assertEqual(Registration.objects.filter(stud_id='S2').count(), 6)
+
+        with self.assertRaises(ValidationError):
+            import_file(Registration, SimpleUploadedFile('bad.csv', b'student,class\nS1,1'), ['stud_id', 'main_id'])
+
+
+    def test_upsert_updates_only_changed_rows(self):
+        import pandas as pd
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from timetable_app.imports import import_file
+
+        columns = ['course_id', 'name', 'code', 'course_type', 'hours_per_week', 'offered_to']
+        csv = '\n'.join([
+            ','.join(columns),
+            'C1,DL,,none,5,',  # hours changed
+            'C2,Full Stack,,none,4,',  # renamed
+            'C3,SE,,none,3,',  # as stored
+            'C8,ML,ML1,none,3,',  # new
+        ]).encode()
+        report = import_file(Course, SimpleUploadedFile('courses.csv', csv), columns)
+        self.assertEqual((report.created, report.updated, report.unchanged), (1, 0, 1))
+        self.assertEqual([reason for _, reason in report.rejected], ['course_id already exists with different values'] * 2)
+
+        Course.objects.filter(course_id='C8').delete()
+        # Classification is one query on top of the counted insert and the update, plus the board
+        # token and the classes whose projections carry the changed courses
+        with self.assertNumQueries(9):
+            report = import_file(Course, SimpleUploadedFile('courses.csv', csv), columns, mode='upsert')
+        self.assertEqual((report.created, report.updated, report.unchanged, report.rejected), (1, 2, 1, []))
+        self.assertEqual(report.changed_fields, Counter({'hours_per_week': 1, 'name': 1}))
+        self.assertIn((3, 'C2', 'name', 'FS', 'Full Stack'), report.changes)
+        self.assertEqual(Course.objects.get(course_id='C1').hours_per_week, 5)
+        self.assertEqual(Course.objects.get(course_id='C2').name, 'Full Stack')
+
+        report = import_file(Course, SimpleUploadedFile('courses.csv', csv), columns, mode='upsert')
+        self.assertEqual((report.created, report.updated, report.unchanged), (0, 0, 4))
+
+        # Rows another writer stores after the dedupe are dropped by the insert, not counted as created
+        with mock.patch('timetable_app.imports._existing', return_value=pd.DataFrame(columns=columns)):
+            report = import_file(Course, SimpleUploadedFile('courses.csv', csv), columns)
+        self.assertEqual((report.created, report.unchanged), (0, 4))
+
+    def test_background_import_runs_in_worker(self):
+        import os
+        import tempfile
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+        from timetable_app.models import Student, ImportJob
+
+        Student.objects.create(stud_id='S1', name='Asha', department='CSE')
+        upload = SimpleUploadedFile('reg.csv', f'stud_id,main_id\nS1,{self.dl1.pk}\nS1,{self.fs1.pk}\nS9,{self.fs1.pk}\n'.encode())
+        with tempfile.TemporaryDirectory() as spool, override_settings(IMPORT_SPOOL_DIR=spool):
+            response = self.client.post('/upload-registration/', {'file': upload, 'background': 'on'})
+            self.assertContains(response, 'import queued')
+            job = ImportJob.objects.get()
+            self.assertEqual((job.status, job.model, job.columns), ('queued', 'Registration', 'stud_id,main_id'))
+            self.assertTrue(os.path.exists(job.path))
+            self.assertEqual(Registration.objects.count(), 0)
+
+            self.assertEqual(run_worker(once=True), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'completed')
+            self.assertFalse(os.path.exists(job.path))
+        self.assertEqual((job.rows_total, job.rows, job.created, job.rejected), (3, 3, 2, 1))
+        self.assertEqual(Registration.objects.count(), 2)
+
+        get_user_model().objects.create_user('admin', password='pw')
+        self.client.login(username='admin', password='pw')
+        data = self.client.get(f'/import-jobs/{job.pk}/').json()
+        self.assertEqual(data['rows'], 3)
+        self.assertEqual(data['rejected_rows'], ['4: Student with ID S9 does not exist'])
+        self.assertIsNone(data['eta_seconds'])
+
+    def test_worker_takes_oldest_job_of_either_queue(self):
+        import tempfile
+        from datetime import timedelta
+        from django.utils import timezone
+        from timetable_app.jobs import claim_next
+        from timetable_app.models import SolverJob, ImportJob
+
+        status = TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='1', dept='CSE')
+        now = timezone.now()
+        solves = [SolverJob.objects.create(timetable_status=status) for _ in range(2)]
+        with tempfile.NamedTemporaryFile(delete=False) as spooled:
+            crashed = ImportJob.objects.create(model='Student', columns='stud_id,name,department', file_name='a.csv', path=spooled.name, status='running')
+        queued = ImportJob.objects.create(model='Student', columns='stud_id,name,department', file_name='b.csv', path='b.csv')
+        for job, minutes in [(solves[0], 30), (queued, 20), (solves[1], 10), (crashed, 60)]:
+            type(job).objects.filter(pk=job.pk).update(created_at=now - timedelta(minutes=minutes), updated_at=now - timedelta(minutes=minutes))
+
+        self.assertEqual([claim_next() for _ in range(4)], [solves[0], queued, solves[1], None])
+        crashed.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.error), ('failed', STALE_ERROR))
+        self.assertFalse(os.path.exists(crashed.path))
+
+
+class GeneticAlgorithmTests(TestCase):
+    year = "2025_even"
+    semester = "4"
+
+    @classmethod
+    def setUpTestData(cls):
+        f1 = Faculty.objects.create(faculty_id='F1', faculty_name='Anand', department='CSE')
+        f2 = Faculty.objects.create(faculty_id='F2', faculty_name='Bala', department='CSE')
+        f3 = Faculty.objects.create(faculty_id='F3', faculty_name='Chitra', department='CSE')
+        courses = {
+            'DL': Course.objects.create(course_id='C1', name='DL', course_type='none', hours_per_week=4),
+            'FS': Course.objects.create(course_id='C2', name='FS', course_type='none', hours_per_week=4),
+            'SE': Course.objects.create(course_id='C3', name='SE', course_type='none', hours_per_week=3),
+            'ITT': Course.objects.create(course_id='C4', name='ITT', course_type='dept', hours_per_week=2),
+        }
+        cls.classes = {}
+        for name, section, faculty in [('DL', '1', f1), ('FS', '1', f2), ('SE', '1', f1), ('ITT', '1', f3), ('DL', '2', f1)]:
+            obj = Class.objects.create(course=courses[name], section_id=section, dept='CSE', venue=f'R{section}', academic_year=cls.year, semester=cls.semester)
+            obj.faculty.set([faculty])
+            cls.classes[(name, section)] = obj
+        for day, slot in [(1, 1), (3, 5)]:
+            Timetable.objects.create(main_id=cls.classes[('ITT', '1')], day=day, slot=slot)
+        for day, slot in [(1, 2), (2, 2), (4, 6)]:
+            Timetable.objects.create(main_id=cls.classes[('DL', '2')], day=day, slot=slot)
+        TimetableStatus.objects.create(academic_year=cls.year, semester=cls.semester, section='1', dept='CSE', status='ga_running')
+
+    def setUp(self):
+        # Runs cache their best grid to warm-start the next one
+        cache.clear()
+
+    def encoding(self):
+        classes = [(c.main_id, c.course.name, c.course.course_type) for (_, section), c in self.classes.items() if section == '1']
+        locked = defaultdict(list)
+        for day, slot in [(1, 1), (3, 5)]:
+            locked[(day, slot)].append((self.classes[('ITT', '1')].main_id, 'ITT'))
+        return TimetableEncoding(classes, {'DL': 4, 'FS': 4, 'SE': 3}, locked)
+
+    def test_encoding_round_trip(self):
+        encoding = self.encoding()
+        dl, fs = self.classes[('DL', '1')].main_id, self.classes[('FS', '1')].main_id
+        genes = [(2, 3, dl, 'DL'), (5, 8, fs, 'FS'), (1, 1, dl, 'DL')]  # (1, 1) is locked and dropped
+        grid = encoding.encode(genes)
+        self.assertEqual(grid.shape, (6, 8))
+        self.assertEqual(grid.nbytes, 48)
+        self.assertEqual(sorted(encoding.genes(grid)), sorted(genes[:2] + encoding.locked_genes))
+        self.assertEqual(encoding.overlay(grid).get((1, 1)), [self.classes[('ITT', '1')].main_id])
+        self.assertEqual(encoding.course_counts(grid)[encoding.course_index['DL']], 1)
+        self.assertNotIn((2, 3), encoding.free_cells(grid))
+        self.assertIn((2, 3), encoding.free_cells())
+
+    def section_rows(self):
+        return Timetable.objects.filter(main_id__section_id='1', main_id__dept='CSE')
+
+    def assertRowsValid(self, rows, section):
+        # Each saved row is re-checked as a placement, so it does not clash with itself
+        snapshot = TimetableSnapshot.load(self.year, self.semester)
+        for row in rows:
+            placement = {(row.day, row.slot): [row.main_id_id]}
+            validate_timetable_constraints(row.main_id_id, row.day, row.slot, self.year, self.semester, section or row.main_id.section_id, 'CSE', snapshot, placement)
+
+    def test_run_ga_logic_meets_requirements(self):
+        random.seed(7)
+        result = run_ga_logic(self.year, self.semester, '1', 'CSE')
+        self.assertTrue(result.requirements_met)
+        self.assertEqual(result.created, 11)
+        counts = Counter(self.section_rows().values_list('main_id__course__name', flat=True))
+        self.assertEqual(counts, Counter({'DL': 4, 'FS': 4, 'SE': 3, 'ITT': 2}))
+        status = TimetableStatus.objects.get(academic_year=self.year, semester=self.semester, section='1', dept='CSE')
+        self.assertEqual(status.status, 'completed')
+
+        self.assertRowsValid(self.section_rows(), '1')
+
+    def test_concurrent_sections_do_not_share_state(self):
+        problems = [ga.load_problem(self.year, self.semester, section, 'CSE')[0] for section in ('1', '2')]
+        self.assertNotEqual(problems[0].requirements.keys(), problems[1].requirements.keys())
+
+        def solve(problem):
+            states = [ga.seeded_individual(problem, seed) for seed in range(8)]
+            children = [ga.breed(problem, states[i].grid, states[i + 1].grid, 0, 20, i) for i in range(7)]
+            return [state.grid.tolist() for state in states + children]
+
+        expected = [solve(problem) for problem in problems]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(solve, problems * 4))
+        self.assertEqual(results, expected * 4)
+
+    def test_joint_solve_schedules_every_section(self):
+        TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='2', dept='CSE', status='ga_running')
+        with mock.patch('timetable_app.projections.section_completed') as section_completed, self.captureOnCommitCallbacks(execute=True):
+            results = ga.run_joint_ga_logic(self.year, self.semester, seed=3)
+        self.assertEqual(results, {('1', 'CSE'): True, ('2', 'CSE'): True})
+        counts = Counter(self.section_rows().values_list('main_id__course__name', flat=True))
+        self.assertEqual(counts, Counter({'DL': 4, 'FS': 4, 'SE': 3, 'ITT': 2}))
+        self.assertEqual(Timetable.objects.filter(main_id=self.classes[('DL', '2')]).count(), 4)
+        statuses = TimetableStatus.objects.filter(academic_year=self.year, semester=self.semester)
+        self.assertEqual(set(statuses.values_list('status', flat=True)), {'completed'})
+        self.assertEqual(section_completed.call_count, 2)
+
+        # Section 1 and 2 share faculty F1, so the check runs against the whole saved year
+        self.assertRowsValid(Timetable.objects.select_related('main_id'), None)
+
+    @override_settings(GA_MAX_RESTARTS=0)
+    def test_joint_solve_repairs_sections_left_infeasible(self):
+        TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='2', dept='CSE', status='ga_running')
+        built = []
+        build_problem, is_feasible = ga.build_problem, ga.is_feasible
+
+        def tracked(*args):
+            built.append(args[3])
+            return build_problem(*args)
+
+        # Section 1, the most constrained and solved first, is made to fail once
+        with mock.patch.object(ga, 'build_problem', tracked), \
+                mock.patch.object(ga, 'is_feasible', lambda state: len(built) > 1 and is_feasible(state)):
+            results = ga.run_joint_ga_logic(self.year, self.semester, seed=3)
+        # Both share F1: section 1 is solved again with section 2 taken out, then section 2 around it
+        self.assertEqual(built, ['1', '2', '1', '2'])
+        self.assertEqual(results, {('1', 'CSE'): True, ('2', 'CSE'): True})
+        self.assertRowsValid(Timetable.objects.select_related('main_id'), None)
+
+    def test_joint_solve_leaves_sections_not_waiting_for_the_ga(self):
+        TimetableStatus.objects.create(academic_year=self.year, semester=self.semester, section='2', dept='CSE', status='dept_coordinator')
+        section_2 = sorted(Timetable.objects.filter(main_id=self.classes[('DL', '2')]).values_list('id', 'day', 'slot'))
+        results = ga.run_joint_ga_logic(self.year, self.semester, seed=3)
+        self.assertEqual(results, {('1', 'CSE'): True})
+        self.assertEqual(sorted(Timetable.objects.filter(main_id=self.classes[('DL', '2')]).values_list('id', 'day', 'slot')), section_2)
+        status = TimetableStatus.objects.get(academic_year=self.year, semester=self.semester, section='2', dept='CSE')
+        self.assertEqual(status.status, 'dept_coordinator')
+        # Section 1 was solved around section 2's stored rows
+        self.assertRowsValid(Timetable.objects.select_related('main_id'), None)
+
+    def test_backtracking_engine(self):
+        run_ga_logic(self.year, self.semester, '1', 'CSE', engine='backtracking')
+        counts = Counter(self.section_rows().values_list('main_id__course__name', flat=True))
+        self.assertEqual(counts, Counter({'DL': 4, 'FS': 4, 'SE': 3, 'ITT': 2}))
+        self.assertRowsValid(self.section_rows(), '1')
+
+    def test_backtracking_proves_infeasibility(self):
+        # DL can never sit in adjacent slots, so 30 hours cannot fit in six days of eight slots
+        Course.objects.filter(name='DL').update(hours_per_week=30)
+        rows = set(Timetable.objects.values_list('id', flat=True))
+        with self.assertRaisesMessage(ValidationError, "No feasible timetable exists"):
+            run_ga_logic(self.year, self.semester, '1', 'CSE', engine='backtracking')
+        self.assertEqual(set(Timetable.objects.values_list('id', flat=True)), rows)
+
+    def test_warm_start_from_previous_year_and_last_run(self):
+        previous = {}
+        for name in ('DL', 'FS'):
+            course = self.classes[(name, '1')].course
+            previous[name] = Class.objects.create(course=course, section_id='1', dept='CSE', venue='R1', academic_year='2024_even', semester=self.semester)
+        last_year = [('DL', 2, 1), ('FS', 2, 3), ('DL', 2, 5), ('FS', 5, 4)]
+        for name, day, slot in last_year:
+            Timetable.objects.create(main_id=previous[name], day=day, slot=slot)
+
+        problem, all_classes = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        states = ga.warm_start(problem, all_classes, random.Random(1), size=6)
+        self.assertEqual(len(states), 6)
+        placed = set(problem.encoding.genes(states[0].grid))
+        for name, day, slot in last_year:
+            self.assertIn((day, slot, self.classes[(name, '1')].main_id, name), placed)
+
+        run_ga_logic(self.year, self.semester, '1', 'CSE', seed=4)
+        self.assertIsNotNone(cache.get(ga.best_cache_key(problem)))
+        self.assertEqual(len(ga.warm_start(problem, all_classes, random.Random(1), size=6)), 6)
+
+    def test_repair_fixes_violations_in_place(self):
+        problem, all_classes = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        dl, se = self.classes[('DL', '1')].main_id, self.classes[('SE', '1')].main_id
+        # SE clashes with section 2's DL (both F1) at (1, 2); DL sits in two adjacent slots
+        grid = problem.encoding.encode([(1, 2, se, 'SE'), (2, 3, dl, 'DL'), (2, 4, dl, 'DL')])
+        state = problem.scorer.state(grid)
+        self.assertGreater(sum(state.violations.values()), 0)
+
+        moves = ga.repair(problem, state, random.Random(0), max_moves=48)
+        self.assertGreater(moves, 0)
+        self.assertIs(state.grid, grid)
+        self.assertTrue(ga.is_feasible(state))
+        self.assertEqual(state.score, ga.fitness(problem, grid))
+        valid, violations, requirements_met, _ = ga.check_solution(problem, all_classes, problem.encoding.genes(grid))
+        self.assertTrue(valid and requirements_met, violations)
+
+    def test_tabu_search_polishes_elites(self):
+        problem, _ = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        rng = random.Random(8)
+        states = [problem.scorer.state(grid) for grid in ga.generate_population(problem, size=5, rng=rng)]
+        for state in states:
+            before = state.score
+            self.assertGreaterEqual(ga.tabu_search(problem, state, rng, iterations=30), before)
+            self.assertEqual(state.score, ga.fitness(problem, state.grid))
+            self.assertFalse(state.grid[problem.encoding.locked_mask].any())
+
+        result = run_ga_logic(self.year, self.semester, '1', 'CSE', seed=5, local_search=2)
+        self.assertTrue(result.requirements_met)
+
+    def test_bench_solver_reports_runs_and_rolls_back(self):
+        out = StringIO()
+        call_command('bench_solver', f'{self.year}:{self.semester}:CSE:1', runs=2, seed=3, stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual([run['seed'] for run in report['runs']], [3, 4])
+        for run in report['runs']:
+            self.assertTrue(run['requirements_met'])
+            self.assertGreater(run['queries'], 0)
+            self.assertIsNotNone(run['generations_to_feasible'])
+        self.assertEqual(report['summary'][f'{self.year}:{self.semester}:CSE:1']['feasible_runs'], 2)
+        # Only the locked ITT rows remain: every run was rolled back
+        self.assertEqual(self.section_rows().count(), 2)
+
+    def test_profiled_run_reports_phases_and_rules(self):
+        profile = run_ga_logic(self.year, self.semester, '1', 'CSE', seed=6, profile=True).profile
+        self.assertIsNone(run_ga_logic(self.year, self.semester, '1', 'CSE', seed=6, max_restarts=0).profile)
+        for phase in ('load', 'generate', 'crossover', 'mutate', 'repair', 'fitness', 'scoring', 'validation', 'save'):
+            self.assertGreater(profile['phases'][phase]['calls'], 0, phase)
+        self.assertEqual(profile['counters']['worker_processes'], 0)  # every phase ran in this process
+        self.assertEqual(
+            set(profile['rules']),
+            {'slot_uniqueness', 'venue', 'faculty', 'consecutive', 'multiple_days', 'faculty_continuity', 'daily_limit'},
+        )
+        self.assertGreater(profile['phases']['load']['queries'], 0)
+        self.assertGreater(profile['phases']['save']['queries'], 0)
+        self.assertEqual(profile['phases']['crossover']['queries'], 0)  # validation runs in memory
+        self.assertGreaterEqual(profile['queries'], sum(phase['queries'] for phase in profile['phases'].values()))
+
+    def test_restarts_reuse_the_loaded_problem(self):
+        # DL can never get 30 hours, so every attempt fails and the run restarts
+        Course.objects.filter(name='DL').update(hours_per_week=30)
+        with mock.patch('timetable_app.ga.load_problem', wraps=ga.load_problem) as load_problem:
+            result = run_ga_logic(self.year, self.semester, '1', 'CSE', seed=2, max_restarts=2)
+        self.assertEqual(load_problem.call_count, 1)
+        self.assertFalse(result.requirements_met)
+        self.assertEqual(result.restarts, 2)
+        self.assertEqual(len(result.restart_seconds), 3)
+
+    def test_save_applies_only_the_difference(self):
+        problem, all_classes = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        dl, fs = self.classes[('DL', '1')].main_id, self.classes[('FS', '1')].main_id
+        first = [(2, 1, dl, 'DL'), (2, 3, fs, 'FS'), (5, 4, fs, 'FS')]
+        self.assertEqual(ga.save_solution(problem, all_classes, first, {}), 3)
+        kept = Timetable.objects.get(main_id=dl, day=2, slot=1).id
+
+        second = [(2, 1, dl, 'DL'), (2, 3, fs, 'FS'), (6, 6, fs, 'FS')]
+        self.assertEqual(ga.save_solution(problem, all_classes, second, {}), 1)
+        self.assertEqual(Timetable.objects.get(main_id=dl, day=2, slot=1).id, kept)
+        self.assertFalse(Timetable.objects.filter(main_id=fs, day=5, slot=4).exists())
+        self.assertEqual(
+            sorted(self.section_rows().values_list('main_id', 'day', 'slot')),
+            sorted([(dl, 2, 1), (fs, 2, 3), (fs, 6, 6)] + [(self.classes[('ITT', '1')].main_id, 1, 1), (self.classes[('ITT', '1')].main_id, 3, 5)]),
+        )
+
+    def test_save_keeps_rows_written_after_load(self):
+        problem, all_classes = ga.load_problem(self.year, self.semester, '1', 'CSE')
+        dl, fs, itt = (self.classes[(name, '1')] for name in ('DL', 'FS', 'ITT'))
+        # Written by others while the solve ran: a manual assignment and a GA row of an earlier solve
+        manual = Timetable.objects.create(main_id=itt, day=2, slot=3)
+        replaced = Timetable.objects.create(main_id=fs, day=5, slot=5)
+        with self.assertLogs('timetable_app.ga', 'WARNING'):
+            created = ga.save_solution(problem, all_classes, [(2, 3, dl.main_id, 'DL'), (4, 4, dl.main_id, 'DL')], {})
+        self.assertEqual(created, 1)
+        self.assertTrue(Timetable.objects.filter(pk=manual.pk).exists())
+        self.assertFalse(Timetable.objects.filter(pk=replaced.pk).exists())
+        self.assertEqual(list(Timetable.objects.filter(main_id=dl).values_list('day', 'slot')), [(4, 4)])
+
+    def test_seeded_runs_are_reproducible_across_workers(self):
+        fixture_rows = set(Timetable.objects.values_list('id', flat=True))
+        results = []
+        for workers in (1, 2, 1):
+            run_ga_logic(self.year, self.semester, '1', 'CSE', seed=42, workers=workers)
+            results.append(sorted(self.section_rows().values_list('main_id', 'day', 'slot')))
+            Timetable.objects.exclude(id__in=fixture_rows).delete()
+            cache.clear()
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_island_model_run(self):
+        fixture_rows = set(Timetable.objects.values_list('id', flat=True))
+        results = []
+        for _ in range(2):
+            run_ga_logic(self.year, self.semester, '1', 'CSE', seed=9, islands=3, migration_interval=2)
+            counts = Counter(self.section_rows().values_list('main_id__course__name', flat=True))
+            self.assertEqual(counts, Counter({'DL': 4, 'FS': 4, 'SE': 3, 'ITT': 2}))
+            results.append(sorted(self.section_rows().values_list('main_id', 'day', 'slot')))
+            Timetable.objects.exclude(id__in=fixture_rows).delete()
+            cache.clear()
+        self.assertEqual(results[0], results[1])
+
+    def test_crashed_solver_job_is_failed_and_replaced(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from timetable_app.models import SolverJob
+
+        status = TimetableStatus.objects.get(academic_year=self.year, semester=self.semester, section='1', dept='CSE')
+        crashed = enqueue_solve(status)
+        self.assertEqual(claim_next_job(), crashed)
+        self.assertEqual(enqueue_solve(status), crashed)  # a running job is reused while it reports progress
+        SolverJob.objects.filter(pk=crashed.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        job = enqueue_solve(status)
+        self.assertNotEqual(job, crashed)
+        self.assertEqual(claim_next_job(), job)
+        crashed.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.error), ('failed', STALE_ERROR))
+        self.assertIsNotNone(crashed.finished_at)
+
+        # The crashed job's run, if it was only slow, stops at its next report and leaves the job failed
+        with self.assertRaises(JobAbandoned):
+            job_progress(crashed.pk)(attempt=0, generation=1, generations=10, best_fitness=3)
+        with mock.patch('timetable_app.ga.run_ga_logic') as run_ga_logic:
+            run_ga_logic.return_value.requirements_met = True
+            self.assertFalse(run_job(crashed))
+        crashed.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.error, crashed.generation), ('failed', STALE_ERROR, 0))
+
+    def test_solver_job_runs_in_worker(self):
+        status = TimetableStatus.objects.get(academic_year=self.year, semester=self.semester, section='1', dept='CSE')
+        job = enqueue_solve(status)
+        self.assertEqual(enqueue_solve(status), job)  # a queued job is reused
+        self.assertEqual(run_worker(once=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertGreater(job.generation, 0)
+        status.refresh_from_db()
+        self.assertEqual(status.status, 'completed')
+
+        get_user_model().objects.create_user('admin', password='pw')
+        self.client.login(username='admin', password='pw')
+        data = self.client.get(f'/solver-jobs/{job.pk}/').json()
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['timetable_status'], 'completed')
+        self.assertEqual(data['generation'], job.generation)
+        self.assertIs(data['feasible'], True)
@@ -1,8 +1,211 @@
+from collections import defaultdict, namedtuple
 from django.core.exceptions import ValidationError
 from .models import Timetable, Class
 from django.db.models import Q
+from .profiling import profiled_rule
 
 #MAIN_COURSES = ['DL', 'FS', 'SE', 'CE', 'ASSO']  
+
+# Faculty placeholders and courses that are never checked for faculty clashes
+EXEMPT_FACULTY_NAMES = ["Some faculty (-)", "Some faculty"]
+EXEMPT_COURSE_NAMES = ['PET', 'LIB', 'PROJ WORK']
+# Venues that are never checked for double booking
+EXEMPT_VENUES = ('pg', '', None)
+
+# Plain-data view of a Class row, so a snapshot never holds model instances
+ClassInfo = namedtuple('ClassInfo', [
+    'main_id', 'course_name', 'course_type', 'offered_to',
+    'section_id', 'dept', 'semester', 'venue', 'faculty',  # faculty: tuple of (faculty_id, faculty_name)
+])
+
+
+class TimetableSnapshot:
+    """Timetable rows and classes of one academic year, loaded once.
+
+    Passed as ``timetable_cache`` to ``validate_timetable_constraints`` it
+    answers every rule in memory, optionally overlaid with the candidate
+    ``temp_timetable``. The snapshot holds only plain data, so it can be
+    pickled and used without a database connection.
+    """
+
+    def __init__(self, current_year, current_semester, classes, rows):
+        self.current_year = current_year
+        self.current_semester = str(current_semester)
+        self.classes = {info.main_id: info for info in classes}
+        self.faculty_ids = {info.main_id: frozenset(fid for fid, _ in info.faculty) for info in self.classes.values()}
+        self.main_courses = frozenset(
+            info.course_name for info in self.classes.values()
+            if info.course_type == 'none' and info.semester == self.current_semester
+        )
+        self.cells = defaultdict(set)  # (day, slot): {main_id, ...}
+        for main_id, day, slot in rows:
+            self.cells[(day, slot)].add(main_id)
+
+    @classmethod
+    def load(cls, current_year, current_semester):
+        classes = [
+            ClassInfo(
+                main_id=c.main_id,
+                course_name=c.course.name,
+                course_type=c.course.course_type,
+                offered_to=c.course.offered_to,
+                section_id=c.section_id,
+                dept=c.dept,
+                semester=str(c.semester),
+                venue=c.venue,
+                faculty=tuple((f.faculty_id, f.faculty_name) for f in c.faculty.all()),
+            )
+            for c in Class.objects.filter(academic_year=current_year).select_related('course').prefetch_related('faculty')
+        ]
+        rows = Timetable.objects.filter(main_id__academic_year=current_year).values_list('main_id', 'day', 'slot')
+        return cls(current_year, current_semester, classes, rows)
+
+    def occupants(self, day, slot, temp_timetable=None):
+        """main_ids placed at (day, slot) in the snapshot or the overlay."""
+        occupied = set(self.cells.get((day, slot), ()))
+        if temp_timetable:
+            for entry in temp_timetable.get((day, slot), ()):
+                main_id = getattr(entry, 'main_id', entry)
+                if main_id in self.classes:
+                    occupied.add(main_id)
+        return occupied
+
+    def in_section(self, info, section, dept):
+        return info.semester == self.current_semester and info.section_id == section and info.dept == dept
+
+    def in_section_or_all(self, info, section, dept):
+        if info.semester != self.current_semester:
+            return False
+        if info.section_id == section and info.dept == dept:
+            return True
+        return info.section_id is None and info.dept is None and info.offered_to == 'all'
+
+    def validate(self, main_id, days, slot, section, dept, temp_timetable=None):
+        """In-memory counterpart of the database checks, rule for rule.
+
+        Stored rows of the candidate count exactly where the database checks
+        count them (a faculty member is busy in a cell their class already
+        holds). When ``temp_timetable`` itself places the candidate at
+        (day, slot), as the GA does when it re-checks a grid, that placement
+        is what is being validated and never clashes with itself.
+        """
+        try:
+            class_info = self.classes[main_id]
+        except KeyError:
+            raise Class.DoesNotExist(f"Class {main_id} is not part of {self.current_year}.")
+        self.check_slot_uniqueness(class_info, days, slot, section, dept, temp_timetable)
+        self.check_venue(class_info, days, slot, temp_timetable)
+        self.check_faculty(class_info, days, slot, temp_timetable)
+        self.check_consecutive(class_info, days, slot, section, dept, temp_timetable)
+        self.check_multiple_days(class_info, days, slot, section, dept, temp_timetable)
+        self.check_faculty_continuity(class_info, days, slot, temp_timetable)
+        self.check_daily_limit(class_info, days, section, dept, temp_timetable)
+
+    def _others(self, class_info, day, slot, temp_timetable):
+        # For the rules whose queries exclude the class itself
+        return [self.classes[mid] for mid in self.occupants(day, slot, temp_timetable) if mid != class_info.main_id]
+
+    def _sharing(self, class_info, day, slot, temp_timetable):
+        # For the rules whose queries do not: the class counts unless the overlay places it here
+        placed_here = temp_timetable and any(getattr(entry, 'main_id', entry) == class_info.main_id for entry in temp_timetable.get((day, slot), ()))
+        return [self.classes[mid] for mid in self.occupants(day, slot, temp_timetable) if not (placed_here and mid == class_info.main_id)]
+
+    def _section_occupants(self, class_info, day, slot, section, dept, temp_timetable):
+        """Other classes of the section, or shared with it, at (day, slot)."""
+        return [o for o in self._others(class_info, day, slot, temp_timetable) if self.in_section_or_all(o, section, dept)]
+
+    def _venue_booked(self, class_info, day, slot, temp_timetable):
+        return any(o.venue == class_info.venue for o in self._others(class_info, day, slot, temp_timetable))
+
+    def _faculty_busy(self, class_info, faculty_id, day, slot, temp_timetable):
+        return any(faculty_id in self.faculty_ids[o.main_id] for o in self._sharing(class_info, day, slot, temp_timetable))
+
+    def _checked_faculty(self, class_info):
+        if class_info.course_name in EXEMPT_COURSE_NAMES:
+            return []
+        return [(fid, name) for fid, name in class_info.faculty if name not in EXEMPT_FACULTY_NAMES]
+
+    # 1. Slot Uniqueness
+    @profiled_rule('slot_uniqueness')
+    def check_slot_uniqueness(self, class_info, days, slot, section, dept, temp_timetable=None):
+        for d in days:
+            existing = self._section_occupants(class_info, d, slot, section, dept, temp_timetable)
+            if existing:
+                if class_info.course_type == 'none':
+                    raise ValidationError(f"Slot on {d} is already assigned, and courses with type 'none' cannot share slots.")
+                if any(o.course_type == 'none' for o in existing):
+                    raise ValidationError(f"Slot on {d} contains a course with type 'none', so no additional courses can be assigned.")
+
+    # 7. Venue booking
+    @profiled_rule('venue')
+    def check_venue(self, class_info, days, slot, temp_timetable=None):
+        if class_info.venue in EXEMPT_VENUES:
+            return
+        for d in days:
+            if self._venue_booked(class_info, d, slot, temp_timetable):
+                raise ValidationError(f"The venue is already booked on {d} during this slot.")
+
+    # 2. Faculty Double Booking
+    @profiled_rule('faculty')
+    def check_faculty(self, class_info, days, slot, temp_timetable=None):
+        for faculty_id, faculty_name in self._checked_faculty(class_info):
+            for d in days:
+                if self._faculty_busy(class_info, faculty_id, d, slot, temp_timetable):
+                    raise ValidationError(f"Faculty {faculty_name} is already assigned another course on {d} during this slot.")
+
+    # 3. Continuous Assignment Prevention (Only for Main Courses)
+    @profiled_rule('consecutive')
+    def check_consecutive(self, class_info, days, slot, section, dept, temp_timetable=None):
+        if class_info.course_name not in self.main_courses:
+            return
+        for d in days:
+            for s in (slot - 1, slot + 1):
+                neighbours = [self.classes[mid] for mid in self.occupants(d, s, temp_timetable)]
+                if any(self.in_section(n, section, dept) and n.course_name == class_info.course_name for n in neighbours):
+                    raise ValidationError("Cannot assign the same main course consecutively.")
+
+    # 4. Assignment Across Multiple Days
+    @profiled_rule('multiple_days')
+    def check_multiple_days(self, class_info, days, slot, section, dept, temp_timetable=None):
+        if len(days) <= 1:
+            return
+        for d in days:
+            existing = [o for o in self._sharing(class_info, d, slot, temp_timetable) if self.in_section_or_all(o, section, dept)]
+            if existing:
+                raise ValidationError(f"Slot on {d} is already assigned. Please select another slot.")
+            raise ValidationError(f"The same course must be assigned to all selected days.")
+
+    # 5. Faculty Doesn't Handle More Than 2 Main Courses Continuously
+    @profiled_rule('faculty_continuity')
+    def check_faculty_continuity(self, class_info, days, slot, temp_timetable=None):
+        if class_info.course_name not in self.main_courses:
+            return
+        for faculty_id, faculty_name in self._checked_faculty(class_info):
+            for d in days:
+                def teaches_main(s):
+                    return any(
+                        faculty_id in self.faculty_ids[mid] and self.classes[mid].course_name in self.main_courses
+                        for mid in self.occupants(d, s, temp_timetable)
+                    )
+                if (teaches_main(slot - 1) and teaches_main(slot - 2)) or (teaches_main(slot + 1) and teaches_main(slot + 2)):
+                    raise ValidationError(f"Faculty {faculty_name} cannot handle more than 2 courses continuously.")
+
+    # 6. Not more than 2 slots for a main subject in a day
+    @profiled_rule('daily_limit')
+    def check_daily_limit(self, class_info, days, section, dept, temp_timetable=None):
+        if class_info.course_name not in self.main_courses:
+            return
+        for d in days:
+            existing_slots = sum(
+                1
+                for s in range(1, 9)
+                for mid in self.occupants(d, s, temp_timetable)
+                if mid != class_info.main_id
+                and self.in_section(self.classes[mid], section, dept)
+                and self.classes[mid].course_name == class_info.course_name
+            )
+            if existing_slots >= 2:
+                raise ValidationError(f"Cannot assign more than 2 slots for {class_info.course_name} on day {d}.")
         
 def validate_timetable_constraints(main_id, day, slot, current_year, current_semester, section, dept, timetable_cache=None, temp_timetable=None):
     # Standardize day as a list
@@ -14,6 +217,10 @@ def validate_timetable_constraints(main_id, day, slot, current_year, current_sem
     else:
         days = [day]  # Wrap single day in a list
 
+    # Pure in-memory path, used by the GA: no queries are issued
+    if isinstance(timetable_cache, TimetableSnapshot):
+        return timetable_cache.validate(main_id, days, slot, section, dept, temp_timetable)
+
     classes = Class.objects.filter(academic_year=current_year, semester=current_semester)
     relevant_courses = set(cls.course for cls in classes)    
     MAIN_COURSES = [course.name for course in relevant_courses if course.course_type == 'none']
@@ -63,7 +270,7 @@ def validate_timetable_constraints(main_id, day, slot, current_year, current_sem
 
     # 2. Faculty Double Booking Check
     for faculty in class_obj.faculty.all():  # Check all faculty
-        if faculty.faculty_name not in ["Some faculty (-)", "Some faculty"] and course_name not in ['PET','LIB'] and course_name not in ['PROJ WORK']:
+        if faculty.faculty_name not in EXEMPT_FACULTY_NAMES and course_name not in EXEMPT_COURSE_NAMES:
             for d in days:
                 if Timetable.objects.filter(
                     day=d,
@@ -101,7 +308,7 @@ def validate_timetable_constraints(main_id, day, slot, current_year, current_sem
     # 5. Ensure Faculty Doesn’t Handle More Than 2 Main Courses Continuously
     if course_name in MAIN_COURSES:
         for faculty in class_obj.faculty.all():  # Check all faculty
-            if faculty.faculty_name not in ["Some faculty (-)", "Some faculty"] and course_name not in ['PET','LIB'] and course_name not in ['PROJ WORK']:
+            if faculty.faculty_name not in EXEMPT_FACULTY_NAMES and course_name not in EXEMPT_COURSE_NAMES:
                 for d in days:
                     prev1 = Timetable.objects.filter(day=d, slot=slot - 1, main_id__faculty=faculty, main_id__academic_year=current_year).first()
                     prev2 = Timetable.objects.filter(day=d, slot=slot - 2, main_id__faculty=faculty, main_id__academic_year=current_year).first()
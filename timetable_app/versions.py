@@ -0,0 +1,40 @@
+import uuid
+
+from django.db import transaction
+
+from .models import DataVersion
+
+
+def bump(name):
+    """Give ``name`` a new token and return it.
+
+    Call it inside the writing transaction: the token then commits, or rolls
+    back, with the write, and every process sees it once the write is visible.
+    Tokens are random, so one from a rolled back transaction never comes back.
+    """
+    token = uuid.uuid4().hex
+    if not DataVersion.objects.filter(name=name).update(token=token):
+        DataVersion.objects.update_or_create(name=name, defaults={'token': token})
+    return token
+
+
+def advance(name):
+    """Like ``bump``, but return (previous token, new token).
+
+    The version row is locked until the caller's transaction ends, so no
+    other writer can slip in between: a cache at the previous token that
+    applies the write itself is then current at the new one.
+    """
+    with transaction.atomic(savepoint=False):
+        previous = DataVersion.objects.select_for_update().filter(name=name).values_list('token', flat=True).first()
+        return previous or '', bump(name)
+
+
+def tokens(*names):
+    """The current tokens of ``names`` in one query, '' for a name never bumped."""
+    found = dict(DataVersion.objects.filter(name__in=names).values_list('name', 'token'))
+    return [found.get(name, '') for name in names]
+
+
+def token(name):
+    return tokens(name)[0]
@@ -1,14 +1,14 @@
-from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
 
-from django.db import models
-import pandas as pd
+from django.db import models, transaction, IntegrityError
 from django.db.models import Q
+from django.core.exceptions import ValidationError
 
-from .models import Faculty, Course, Timetable, TimetableStatus, Student, Registration, Class
+from .models import Faculty, Course, Timetable, TimetableStatus, Student, Registration, Class, SolverJob, ImportJob
 from .forms import (
     ClassForm,
     TimetableForm,
@@ -19,8 +19,14 @@ from .forms import (
     YearSemesterForm
 )
 from .validators import validate_timetable_constraints
-from timetable_app.ga import run_ga_logic
+from .board import section_board
+from .occupancy import occupancy_index
+from . import projections
+from .projections import ProjectedEntry, ENTRY_FIELDS
+from .imports import import_file
+from .jobs import enqueue_solve, eta_seconds, enqueue_import, import_eta_seconds
 from django.urls import reverse
+from django.conf import settings
 # current_year="2025_even"
 # current_semester="4"
 
@@ -56,49 +62,36 @@ def upload_data(request, model, form_class, required_columns):
         form = form_class(request.POST, request.FILES)
         if form.is_valid():
             file = request.FILES['file']
-            df = pd.read_csv(file) if file.name.endswith('.csv') else pd.read_excel(file)
-
-            if not set(required_columns).issubset(df.columns):
+            # Registrations have no ID column to update by
+            mode = form.cleaned_data.get('mode') or 'insert'
+            if form.cleaned_data.get('background') or file.size >= settings.IMPORT_BACKGROUND_BYTES:
+                # Ingested by the worker (manage.py run_solver_worker); this request only spools the file
+                job = enqueue_import(model, required_columns, file, mode)
+                status_url = reverse('import_job_status', args=[job.pk])
                 html_content = f"""
-                <p>Invalid file format! Required columns: {', '.join(required_columns)}.</p>
+                <p>{model.__name__} import queued (job {job.pk}). Progress: <a href='{status_url}'>{status_url}</a></p>
                 <a href='javascript:history.back()'>Go back to previous page</a>
                 """
                 return HttpResponse(html_content)
 
-            existing_data = set(model.objects.values_list(*required_columns))
-
-            new_records = []
-            for _, row in df.iterrows():
-                if tuple(row[col] for col in required_columns) not in existing_data:
-                    record_data = {col: row[col] for col in required_columns}
-
-                    # Special handling for Registration model
-                    if model == Registration:
-                        try:
-                            record_data['stud_id'] = Student.objects.get(stud_id=row['stud_id'])
-                        except Student.DoesNotExist:
-                            html_content = f"""
-                            <p>Student with ID {row['stud_id']} does not exist.</p>
-                            <a href='javascript:history.back()'>Go back to previous page</a>
-                            """
-                            return HttpResponse(html_content)
-
-                        try:
-                            record_data['main_id'] = Class.objects.get(main_id=row['main_id'])
-                        except Class.DoesNotExist:
-                            html_content = f"""
-                            <p>Class with ID {row['main_id']} does not exist.</p>
-                            <a href='javascript:history.back()'>Go back to previous page</a>
-                            """
-                            return HttpResponse(html_content)
-                            
-
-                    new_records.append(model(**record_data))
-
-            model.objects.bulk_create(new_records)
+            # Streamed in chunks: foreign keys and duplicates are checked per chunk, not per row
+            try:
+                report = import_file(model, file, required_columns, mode=mode)
+            except ValidationError as e:
+                html_content = f"""
+                <p>{e.messages[0]}</p>
+                <a href='javascript:history.back()'>Go back to previous page</a>
+                """
+                return HttpResponse(html_content)
 
+            rejected = ''.join(f"<li>Line {line}: {reason}</li>" for line, reason in report.rejected[:50])
+            more = f"<p>... and {len(report.rejected) - 50} more.</p>" if len(report.rejected) > 50 else ''
+            changes = ''.join(f"<li>Line {line}: {key} {field} {old!r} &rarr; {new!r}</li>" for line, key, field, old, new in report.changes[:50])
             html_content = f"""
             <p>{model.__name__} uploaded successfully!</p>
+            <p>{report.summary()} in {report.seconds:.1f}s ({report.rows_per_second:.0f} rows/sec).</p>
+            <ul>{changes}</ul>
+            <ul>{rejected}</ul>{more}
             <a href='javascript:history.back()'>Go back to previous page</a>
             """
             return HttpResponse(html_content)
@@ -162,93 +155,21 @@ def add_timetable(request):
     if not current_year or not current_semester:
         return redirect('select_year_semester')
 
-    # Count Timetable entries for the given year and semester
-    timetable_count = Timetable.objects.filter(
-        main_id__academic_year=current_year,
-        main_id__semester=current_semester
-    ).filter(
-        Q(main_id__section_id=section) | Q(main_id__section_id__isnull=True) | Q(main_id__section_id=""),
-        Q(main_id__dept=dept) | Q(main_id__dept__isnull=True) | Q(main_id__dept="")
-    ).count()
-
-    # Get or create TimetableStatus based on count
-    if timetable_count > 1:
-        try:
-            timetable_status = TimetableStatus.objects.get(
-                academic_year=current_year,
-                semester=current_semester,
-                section=section,
-                dept=dept
-            )
-        except TimetableStatus.DoesNotExist:
-            # Fallback in case no status exists (edge case)
-            timetable_status = TimetableStatus.objects.create(
-                academic_year=current_year,
-                semester=current_semester,
-                section=section,
-                dept=dept,
-                status="tt_coordinator"
-            )
-    else:
-        timetable_status, created = TimetableStatus.objects.get_or_create(
-            academic_year=current_year,
-            semester=current_semester,
-            section=section,
-            dept=dept,
-            defaults={'status': 'tt_coordinator'}
-        )
-
-    print(request.user.role +','+timetable_status.status)
-    
-    # tt_courses = {'CLUB': 1, 'OE': 4, 'AE': 4}
-    # dept_courses = {'ITT': 3, 'IAS': 2, 'DL LAB': 3, 'FS LAB': 3, 'SE LAB': 2, 'RP': 4, 'SS': 2, 'ASSO':1}
-
-    tt_courses = {}
-    dept_courses = {}
-
-    #classes = Class.objects.filter(academic_year=current_year, semester=current_semester, section_id=section, dept=dept)
-    classes = Class.objects.filter(
+    timetable_status, created = TimetableStatus.objects.get_or_create(
         academic_year=current_year,
-        semester=current_semester
-    ).filter(
-        Q(section_id=section) | Q(section_id__isnull=True) | Q(section_id=""),
-        Q(dept=dept) | Q(dept__isnull=True) | Q(dept="")
-    )
-    relevant_courses = set(cls.course for cls in classes)
-
-    for course in relevant_courses:
-        if course.course_type == 'tt':
-            tt_courses[course.name] = course.hours_per_week
-        elif course.course_type == 'dept':
-            dept_courses[course.name] = course.hours_per_week
-    print(tt_courses)
-    
-    # Get the list of already assigned courses with counts
-    assigned_courses_count = dict(
-        Timetable.objects.filter(
-            main_id__academic_year=current_year,
-            main_id__semester=current_semester
-        ).filter(
-            Q(main_id__section_id=section) | Q(main_id__section_id__isnull=True) | Q(main_id__section_id=""),
-            Q(main_id__dept=dept) | Q(main_id__dept__isnull=True) | Q(main_id__dept="")
-        ).values_list('main_id__course__name').annotate(count=models.Count('id'))
+        semester=current_semester,
+        section=section,
+        dept=dept,
+        defaults={'status': 'tt_coordinator'}
     )
 
-    if 'ITT' in dept_courses:
-        itt_slots = dept_courses.pop('ITT')
-        dept_courses = {'ITT': itt_slots, **dept_courses}
-    
-    # Determine the current course to be assigned
-    all_courses = list(tt_courses.keys()) + list(dept_courses.keys())
-    
-    current_course = None
-    for course in all_courses:
-        required_slots = tt_courses.get(course, dept_courses.get(course, 0))  # Get required slots
-        assigned_slots = assigned_courses_count.get(course, 0)  # Get already assigned slots
+    print(request.user.role +','+timetable_status.status)
 
-        if assigned_slots < required_slots:
-            current_course = course
-            break  # Stop at the first unfulfilled course
+    # Classes, grid and per-course counts, cached until the year's timetable changes
+    board = section_board(current_year, current_semester, section, dept)
+    tt_courses = board.tt_courses
+    dept_courses = board.dept_courses
+    current_course = board.current_course
 
     print(f"Current course to be assigned: {current_course}")
 
@@ -281,10 +202,12 @@ def add_timetable(request):
                 """
                 return HttpResponse(html_content)
 
-            # Loop through selected days and slots
-            for day in selected_days:
-                for slot in selected_slots:
-                    validation_error = validate_timetable_constraints(main_id_obj.main_id, day, slot, current_year, current_semester, section, dept)
+            # Loop through selected days and slots, validating against the year's occupancy index;
+            # it is re-read per cell so that each assignment sees the ones before it
+            for day in map(int, selected_days):
+                for slot in map(int, selected_slots):
+                    occupancy = occupancy_index(current_year).view(current_semester)
+                    validation_error = validate_timetable_constraints(main_id_obj.main_id, day, slot, current_year, current_semester, section, dept, occupancy)
                     if validation_error:
                         html_content = f"""
                         <p>validation_error : {validation_error}</p>
@@ -292,19 +215,21 @@ def add_timetable(request):
                         """
                         return HttpResponse(html_content)
 
-                    Timetable.objects.create(main_id=main_id_obj, day=day, slot=slot)
-
-            # Recalculate assigned courses count after new entries
-            assigned_courses_count = dict(
-                Timetable.objects.filter(
-                    main_id__academic_year=current_year,
-                    main_id__semester=current_semester
-                ).filter(
-                    Q(main_id__section_id=section) | Q(main_id__section_id__isnull=True) | Q(main_id__section_id=""),
-                    Q(main_id__dept=dept) | Q(main_id__dept__isnull=True) | Q(main_id__dept="")
-                ).values_list('main_id__course__name').annotate(count=models.Count('id'))
-            )
-            
+                    try:
+                        with transaction.atomic():
+                            Timetable.objects.create(main_id=main_id_obj, day=day, slot=slot)
+                    except IntegrityError:
+                        # Someone else assigned the class here after it was validated
+                        html_content = f"""
+                        <p>validation_error : {selected_course} is already assigned to day {day}, slot {slot}.</p>
+                        <a href='javascript:history.back()'>Go back to previous page</a>
+                        """
+                        return HttpResponse(html_content)
+
+            # Count the new entries in without querying again
+            assigned_courses_count = dict(board.assigned)
+            assigned_courses_count[selected_course] = assigned_courses_count.get(selected_course, 0) + len(selected_days) * len(selected_slots)
+
             # Check if all TT courses are assigned
             if timetable_status.status == 'tt_coordinator' and all(assigned_courses_count.get(course, 0) >= tt_courses[course] for course in tt_courses):
                 timetable_status.status = 'dept_coordinator'
@@ -319,33 +244,18 @@ def add_timetable(request):
     else:
         form = TimetableForm()
 
-    structured_timetable = defaultdict(lambda: defaultdict(list))  # Use a list instead of a single object
-    days = set()
-    slots = set()
-    timetable = Timetable.objects.filter(
-        main_id__academic_year=current_year,
-        main_id__semester=current_semester
-    ).filter(
-        Q(main_id__section_id=section) | Q(main_id__section_id__isnull=True) | Q(main_id__section_id=""),
-        Q(main_id__dept=dept) | Q(main_id__dept__isnull=True) | Q(main_id__dept="")
-    )
-    for entry in timetable:
-        structured_timetable[entry.day][entry.slot].append(entry)  # Append to a list
-        days.add(entry.day)
-        slots.add(entry.slot)
-
     return render(request, 'add_timetable.html', {
         'form': form,
-        'classes': classes,
+        'classes': board.classes,
         'current_course': current_course,
         'timetable_status': timetable_status,
         'current_year' : current_year,
         'current_semester' : current_semester,
         'section' : section,
         'dept' : dept,
-        "timetable": structured_timetable,
-        'days': sorted(days),   
-        'slots': sorted(slots)
+        "timetable": board.grid,
+        'days': board.days,
+        'slots': board.slots
     })
 
 @login_required
@@ -378,28 +288,74 @@ def run_genetic_algorithm(request):
         """
         return HttpResponse(html_content)
 
-    try:
-        run_ga_logic(current_year, current_semester, section, dept)
-        # timetable_status.status = 'completed'
-        # timetable_status.save()
-        return redirect('view_timetable')
-    except Exception as e:
+    engine = request.POST.get('engine', 'ga')
+    if engine not in dict(SolverJob.ENGINE_CHOICES):
         html_content = f"""
-        <p>Error running GA: {e}</p>
+        <p>Unknown solver engine: {engine}</p>
         <a href='javascript:history.back()'>Go back to previous page</a>
         """
         return HttpResponse(html_content)
 
+    # The solve runs in the solver worker (manage.py run_solver_worker), not in this request
+    job = enqueue_solve(timetable_status, engine)
+    status_url = reverse('solver_job_status', args=[job.pk])
+    html_content = f"""
+    <p>Genetic Algorithm queued (job {job.pk}). Progress: <a href='{status_url}'>{status_url}</a></p>
+    <a href='{reverse('view_timetable')}'>View timetable</a>
+    """
+    return HttpResponse(html_content)
+
+@login_required
+def solver_job_status(request, job_id):
+    job = get_object_or_404(SolverJob.objects.select_related('timetable_status'), pk=job_id)
+    return JsonResponse({
+        'job': job.pk,
+        'status': job.status,
+        'engine': job.engine,
+        'timetable_status': job.timetable_status.status,
+        'attempt': job.attempt,
+        'generation': job.generation,
+        'generations': job.generations,
+        'best_fitness': job.best_fitness,
+        'feasible': job.feasible,
+        'eta_seconds': eta_seconds(job),
+        'error': job.error,
+    })
+
+@login_required
+def import_job_status(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+    elapsed = ((job.finished_at or job.updated_at) - job.started_at).total_seconds() if job.started_at else 0
+    return JsonResponse({
+        'job': job.pk,
+        'status': job.status,
+        'model': job.model,
+        'file_name': job.file_name,
+        'rows': job.rows,
+        'rows_total': job.rows_total,
+        'mode': job.mode,
+        'created': job.created,
+        'updated': job.updated,
+        'unchanged': job.unchanged,
+        'duplicates': job.duplicates,
+        'rejected': job.rejected,
+        'rejected_rows': job.rejected_rows.splitlines(),
+        'changes': job.changes.splitlines(),
+        'rows_per_second': round(job.rows / elapsed) if elapsed else None,
+        'eta_seconds': import_eta_seconds(job),
+        'error': job.error,
+    })
+
 
 from collections import defaultdict
-def serialize_timetable(queryset):
+def serialize_timetable(entries):
     timetable = {}
-    for entry in queryset:
+    for entry in entries:
         day = entry.day
         slot = entry.slot
-        course_name = entry.main_id.course.name
-        course_code = entry.main_id.course.code
-        venue = entry.main_id.venue
+        course_name = entry.course_name
+        course_code = entry.course_code
+        venue = entry.venue
         
         if day not in timetable:
             timetable[day] = {}
@@ -432,7 +388,12 @@ def view_timetable(request):
                 Q(main_id__section_id=section) | Q(main_id__section_id__isnull=True) | Q(main_id__section_id=""),
                 Q(main_id__dept=dept) | Q(main_id__dept__isnull=True) | Q(main_id__dept="")
             )
-    
+
+        # Students and faculty whose every class is final: one indexed read of their projection
+        elif (projection := projections.lookup(user_input, academic_year, semester)) is not None:
+            timetable = None
+            entries = [ProjectedEntry(*row) for row in projection.entries]
+
         # If Student, fetch registered courses
         elif Student.objects.filter(stud_id=user_input).exists():
             registered_courses = Registration.objects.filter(
@@ -473,18 +434,21 @@ def view_timetable(request):
         else:
             return render(request, "view_timetable.html", {"error": "Invalid ID or venue entered.","years": unique_years,"semesters": unique_semesters,"section" : unique_section,'dept' : unique_dept})
 
+        if timetable is not None:
+            entries = [ProjectedEntry(*row) for row in timetable.values_list(*ENTRY_FIELDS).order_by('day', 'slot', 'id')]
+
         structured_timetable = defaultdict(lambda: defaultdict(lambda: None))
         days = set()
         slots = set()
         
-        for entry in timetable:
+        for entry in entries:
             structured_timetable[entry.day][entry.slot] = structured_timetable[entry.day][entry.slot] or []  # Initialize as list if None
             structured_timetable[entry.day][entry.slot].append(entry)
             days.add(entry.day)
             slots.add(entry.slot)
             
         request.session['timetable_data'] = {
-            "filtered_timetable": serialize_timetable(timetable),
+            "filtered_timetable": serialize_timetable(entries),
             "days": list(days),
             "slots": list(slots)
         }
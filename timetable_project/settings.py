@@ -144,4 +144,33 @@ LOGGING = {
             'propagate': True,
         },
     },
-}
\ No newline at end of file
+}
+
+# Timetable solver
+# Worker processes run_ga_logic uses to breed children (1 = inside the calling process)
+GA_WORKERS = 1
+# Island-model runs: populations (one process each), generations between migrations, elites sent per migration
+GA_ISLANDS = 1
+GA_MIGRATION_INTERVAL = 5
+GA_MIGRANTS = 2
+# In-process restarts when the best solution breaks a rule or misses a course's hours
+GA_MAX_RESTARTS = 5
+# Default engine for solves: "ga" or "backtracking" (exact search, falls back to the GA after GA_BACKTRACK_NODE_LIMIT nodes)
+GA_ENGINE = 'ga'
+GA_BACKTRACK_NODE_LIMIT = 5000
+# Seed part of the initial population from the previous academic year and the last run's best
+GA_WARM_START = True
+# Memetic step: elites polished by a short tabu search every generation (0 = off)
+GA_LOCAL_SEARCH = 0
+# Record time, calls and queries per solver phase and validator rule in the solving process (not its worker
+# processes), and log the report after each solve
+GA_PROFILE = False
+# A running solve or import whose row the worker has not updated for this many seconds is taken as
+# crashed: it is failed (an import's spooled file is removed), and the section can be queued again
+JOB_HEARTBEAT_TIMEOUT = 15 * 60
+
+# Data imports
+# Uploads are spooled here and ingested by the worker (manage.py run_solver_worker)
+IMPORT_SPOOL_DIR = BASE_DIR / 'import_spool'
+# Uploads at least this large always go to the worker, whatever the form says
+IMPORT_BACKGROUND_BYTES = 20 * 1024 * 1024
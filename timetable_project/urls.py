@@ -11,6 +11,7 @@ urlpatterns = [
     path('upload-course/', views.upload_course, name='upload_course'),
     path('upload-student/', views.upload_student, name='upload_student'),
     path('upload-registration/', views.upload_registration, name='upload_registration'),
+    path('import-jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     
     path('select_year_semester/', views.select_year_semester, name='select_year_semester'),
     path('add_timetable/', views.add_timetable, name='add_timetable'),
@@ -20,4 +21,5 @@ urlpatterns = [
     path('add-class/', views.add_class, name='add_class'),
     path('run_ga_logic/', run_ga_logic, name='run_ga_logic'),
     path('run_genetic_algorithm/', views.run_genetic_algorithm, name='run_genetic_algorithm'),
+    path('solver-jobs/<int:job_id>/', views.solver_job_status, name='solver_job_status'),
 ]